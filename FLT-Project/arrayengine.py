@@ -0,0 +1,138 @@
+"""
+Sorted-Array Engine
+===================
+Optional NumPy engine for bulk two-set operations on large integer sets.
+
+Each set is converted once (lazily) into a sorted int64 array and cached under
+its name; union / intersection / difference / symmetric difference then run as
+vectorized merges and subset tests as a single searchsorted pass. Sets that are
+not pure int64 are marked ineligible and handled by the regular set backend.
+NumPy is optional: without it ArrayEngine.available is False.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from array import array
+
+from bitmap import ARRAY_MAX, CHUNK_BITS, LOW_MASK, CompactIntSet
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+_INELIGIBLE = object()
+
+
+def _sorted_int64(values) -> Optional[Any]:
+    """Sorted int64 array of values, or None if any member is not an int64"""
+    # np.fromiter would silently truncate floats and accept bools
+    if not isinstance(values, CompactIntSet) and any(type(v) is not int for v in values):
+        return None
+    try:
+        arr = np.fromiter(values, dtype=np.int64, count=len(values))
+    except (OverflowError, ValueError, TypeError):
+        return None
+    arr.sort()
+    return arr
+
+
+def _union(a, b):
+    # np.union1d re-runs np.unique; a stable sort of two sorted runs is a merge
+    merged = np.concatenate((a, b))
+    merged.sort(kind="stable")
+    if merged.size < 2:
+        return merged
+    keep = np.empty(merged.size, dtype=bool)
+    keep[0] = True
+    np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+    return merged[keep]
+
+
+def _to_compact(arr) -> CompactIntSet:
+    """Build a CompactIntSet from a sorted unique int64 array without a Python loop per member"""
+    keys = arr >> CHUNK_BITS
+    lows = (arr & LOW_MASK).astype(np.uint16)
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [arr.size]))
+    chunks = {}
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        chunk = lows[start:stop]
+        if chunk.size <= ARRAY_MAX:
+            chunks[int(keys[start])] = array("H", chunk.tolist())
+        else:
+            bits = np.zeros(1 << CHUNK_BITS, dtype=bool)
+            bits[chunk] = True
+            chunks[int(keys[start])] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+    return CompactIntSet.from_containers(chunks)
+
+
+def _is_subset(a, b) -> bool:
+    if a.size > b.size:
+        return False
+    if a.size == 0:
+        return True
+    idx = np.searchsorted(b, a)
+    idx[idx == b.size] = 0
+    return bool(np.all(b[idx] == a))
+
+
+# Inputs are sorted and unique, so assume_unique skips the internal np.unique
+_OPERATIONS: Dict[str, Callable] = {} if np is None else {
+    "union": _union,
+    "intersection": lambda a, b: np.intersect1d(a, b, assume_unique=True),
+    "difference": lambda a, b: np.setdiff1d(a, b, assume_unique=True),
+    "symmetric": lambda a, b: np.setxor1d(a, b, assume_unique=True),
+    "subset": _is_subset,
+    "equal": lambda a, b: bool(np.array_equal(a, b)),
+}
+
+
+class ArrayEngine:
+    """Per-set cache of sorted int64 arrays plus vectorized set operations"""
+
+    def __init__(self):
+        # name -> (set object the array was built from, array or _INELIGIBLE)
+        self._arrays: Dict[str, Tuple[Any, Any]] = {}
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def supports(self, op: str) -> bool:
+        return op in _OPERATIONS
+
+    def invalidate(self, name: str) -> None:
+        """Drop the cached array of a set after it has been modified"""
+        self._arrays.pop(name, None)
+
+    def array_of(self, name: str, values) -> Optional[Any]:
+        """Cached sorted array for a named set (None when ineligible)"""
+        entry = self._arrays.get(name)
+        if entry is not None and entry[0] is values:
+            arr = entry[1]
+        else:
+            arr = _sorted_int64(values)
+            if arr is None:
+                arr = _INELIGIBLE
+            self._arrays[name] = (values, arr)
+        return None if arr is _INELIGIBLE else arr
+
+    def compute(self, op: str, x: str, a, y: str, b) -> Optional[Any]:
+        """Run op on sets x and y; None when either set is not int64.
+
+        Set-valued results compare equal to what the regular backend
+        produces: small ones come back as plain sets, large ones as a
+        CompactIntSet built straight from the result array.
+        """
+        left = self.array_of(x, a)
+        right = self.array_of(y, b)
+        if left is None or right is None:
+            return None
+        result = _OPERATIONS[op](left, right)
+        if isinstance(result, bool):
+            return result
+        if result.size > ARRAY_MAX:
+            return _to_compact(result)
+        return set(result.tolist())
@@ -0,0 +1,446 @@
+"""
+Batch Execution Mode
+====================
+Runs set commands non-interactively from a file or stdin, for pipelines,
+cron jobs and ETL steps:
+
+    set1 print                 set1 set2 union
+    set1 add 5 6 7             set1 set2 set3 cartesian
+    set1 remove 5              evens create 2 4 6
+    expr big = (set1 ∪ set2) ∩ set3
+    set1..set40 intersection   set* union
+    set1 supersets             set1 sharing 2
+    contains 42                contains 1 2
+    set* jaccard               set1..set40 near 0.9
+    set1..set40 count
+    set1 addfile ids.txt.gz    set1 removefile ids.csv user_id
+    big create @ids.bin
+    set1 unrank 37             set1 rank 1 5 9
+    set1 choose 3 colex 0 10   set1 sample 100 3 seed=7
+    set1 set2 sample 10000 seed=7 unique
+    view active = signups − churned   view active
+    view drop active                  view check
+    lattice                           lattice dot lattice.dot
+    export varint out/ gz             export lines out/ set1 set2
+    # comments and blank lines are ignored
+
+Each command goes through SetOperations (compute / add_elements / ...), the same
+code paths the interactive menu uses, without prompts or sleeps. Results are
+written in one of several output modes and a timing summary per operation is
+reported at the end. With allow_files=False (the server) the commands that
+read or write files (addfile, removefile, create @file, lattice FORMAT PATH
+and export) are refused.
+"""
+
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from combinatorics import (K_SUBSET_ORDERS, POWER_SET_ORDERS, SAMPLE_OPERATION, CartesianProduct, KSubsets,
+                           PowerSet, canonical_order)
+from export import EXPORT_FORMATS as SET_EXPORT_FORMATS
+from hyperloglog import COUNT_OPERATION
+from journal import ADD, REMOVE
+from lattice import EXPORT_FORMATS, LATTICE_COMMAND
+from minhash import SIMILARITY_OPERATIONS
+from parallel import NWAY_OPERATIONS, expand_set_names
+
+OUTPUT_MODES = ("text", "quiet", "jsonl", "counts")
+SINGLE_SET_COMMANDS = ("print", "add", "remove", "cardinal", "power", "create",
+                       "supersets", "subsets", "sharing", "addfile", "removefile",
+                       "unrank", "rank", "choose")
+TWO_SET_COMMANDS = ("equal", "cartesian", "difference", "union", "intersection", "symmetric", "subset")
+EXPRESSION_COMMAND = "expr"
+CONTAINS_COMMAND = "contains"
+VIEW_COMMAND = "view"
+EXPORT_COMMAND = "export"
+
+
+class BatchError(Exception):
+    """A single batch command could not be executed"""
+
+
+class OperationStats:
+    """Count and timing of one operation type"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float, ok: bool):
+        self.count += 1
+        self.errors += 0 if ok else 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class BatchRunner:
+    """Executes batch commands against a SetOperations instance"""
+
+    def __init__(self, set_ops, output: str = "text", out: TextIO = sys.stdout,
+                 result_limit: int = 1000, allow_files: bool = True):
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode '{output}' (use one of: {', '.join(OUTPUT_MODES)})")
+        self.set_ops = set_ops
+        self.output = output
+        self.out = out
+        self.result_limit = result_limit
+        self.allow_files = allow_files
+        self.stats: Dict[str, OperationStats] = {}
+        self.commands = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    # --- command execution ------------------------------------------------
+    def _get(self, name: str):
+        if name not in self.set_ops.sets:
+            raise BatchError(f"Invalid set name '{name}'")
+        return self.set_ops.sets[name]
+
+    def _file_access(self, op: str) -> None:
+        if not self.allow_files:
+            raise BatchError(f"'{op}' is not available here: commands cannot read or write files")
+
+    @staticmethod
+    def _values(tokens: List[str]) -> List[int]:
+        values = []
+        for token in tokens:
+            for part in token.split(','):
+                if part:
+                    try:
+                        values.append(int(part))
+                    except ValueError:
+                        raise BatchError(f"Invalid integer '{part}'") from None
+        if not values:
+            raise BatchError("Expected at least one value")
+        return values
+
+    @staticmethod
+    def classify(tokens: List[str]) -> Optional[str]:
+        """Operation named by a tokenized command, or None if it is not a command"""
+        if len(tokens) >= 2 and tokens[0] in (EXPRESSION_COMMAND, CONTAINS_COMMAND, VIEW_COMMAND, EXPORT_COMMAND):
+            return tokens[0]
+        if tokens[:1] == [LATTICE_COMMAND]:
+            return LATTICE_COMMAND
+        if SAMPLE_OPERATION in tokens[1:]:
+            return SAMPLE_OPERATION
+        if len(tokens) >= 2 and tokens[1] in SINGLE_SET_COMMANDS:
+            return tokens[1]
+        if len(tokens) >= 3 and tokens[-1] in TWO_SET_COMMANDS:
+            return tokens[-1]
+        if len(tokens) == 2 and tokens[-1] in NWAY_OPERATIONS:
+            return tokens[-1]  # a single range or pattern
+        if len(tokens) >= 2 and tokens[-1] in SIMILARITY_OPERATIONS + (COUNT_OPERATION,):
+            return tokens[-1]
+        if len(tokens) >= 3 and tokens[-2] == "near":
+            return "near"  # with an explicit threshold
+        return None
+
+    def execute(self, tokens: List[str]):
+        """Run one tokenized command; returns (operation, result)"""
+        op = self.classify(tokens)
+        if op == EXPRESSION_COMMAND:
+            _, _, result = self.set_ops.evaluate(" ".join(tokens[1:]))
+            return op, result
+        if op == CONTAINS_COMMAND:
+            return op, self.set_ops.containing(self._values(tokens[1:]))
+        if op == VIEW_COMMAND:
+            return op, self._view(tokens[1:])
+        if op == LATTICE_COMMAND:
+            return op, self._lattice(tokens[1:])
+        if op == EXPORT_COMMAND:
+            self._file_access(op)
+            return op, self._export(tokens[1:])
+        if op == SAMPLE_OPERATION:
+            return op, self._sample(tokens)
+        if op in SINGLE_SET_COMMANDS:
+            name, args = tokens[0], tokens[2:]
+            if op == "create":
+                if name in self.set_ops.sets:
+                    raise BatchError(f"Set '{name}' already exists")
+                if len(args) == 1 and args[0].startswith("@"):
+                    self._file_access("create @file")
+                    return op, self._import(ADD, name, args[0][1:], [])
+                elements = set(self._values(args)) if args else set()
+                return op, self.set_ops.replace_set(name, elements)
+            if op in ("add", "remove"):
+                self._get(name)
+                values = self._values(args)
+                if op == "add":
+                    return op, self.set_ops.add_elements(name, values)
+                return op, self.set_ops.remove_elements(name, values)
+            if op in ("addfile", "removefile"):
+                self._file_access(op)
+                self._get(name)
+                if not 1 <= len(args) <= 2:
+                    raise BatchError(f"'{op}' takes a file path and an optional CSV column")
+                return op, self._import(ADD if op == "addfile" else REMOVE, name, args[0], args[1:])
+            if op in ("unrank", "rank", "choose"):
+                return op, self._rank(op, self._get(name), args)
+            if op == "sharing":
+                self._get(name)
+                if len(args) != 1:
+                    raise BatchError("'sharing' takes one argument k")
+                return op, set(self.set_ops.sharing(name, self._values(args)[0]))
+            if args:
+                raise BatchError(f"'{op}' takes no arguments")
+            if op == "print":
+                return op, self._get(name)
+            if op == "cardinal":
+                return op, len(self._get(name))
+            if op == "supersets":
+                self._get(name)
+                return op, self.set_ops.supersets(name)
+            if op == "subsets":
+                self._get(name)
+                return op, self.set_ops.subsets(name)
+            return op, 2 ** len(self._get(name))  # power: size only, never materialized
+        if op in TWO_SET_COMMANDS:
+            names = tokens[:-1]
+            if op in NWAY_OPERATIONS and (len(names) != 2 or not all(n in self.set_ops.sets for n in names)):
+                return op, self.set_ops.compute_nway(op, expand_set_names(names, self.set_ops.sets))
+            for name in names:
+                self._get(name)
+            if op == "cartesian":
+                return op, CartesianProduct(*(self.set_ops.sets[name] for name in names))
+            if len(names) != 2:
+                raise BatchError(f"'{op}' needs exactly two sets")
+            return op, self.set_ops.compute(op, names[0], names[1])
+        if op in SIMILARITY_OPERATIONS:
+            return op, self._similarity(op, tokens)
+        if op == COUNT_OPERATION:
+            value, _ = self.set_ops.union_cardinality(expand_set_names(tokens[:-1], self.set_ops.sets))
+            return op, round(value)
+        raise BatchError("Unknown command (use: setName operation [values], "
+                         "setName addfile|removefile path [column], "
+                         "setName unrank|rank|choose ..., setNames sample count [k] [seed=S] [unique], "
+                         "setName1 setName2 operation, setNames jaccard|near [t] / count, "
+                         "contains values, expr [newSet =] expression, view name [= expression] "
+                         "lattice [list|dot PATH] or export FORMAT DIR [gz] [setNames])")
+
+    def _view(self, args: List[str]):
+        """Materialized views: define (name = expr), read (name), drop name, or
+        check (names of the views that disagree with a full recompute)"""
+        if args == ["check"]:
+            return set(self.set_ops.check_views())
+        if len(args) == 1:
+            return self.set_ops.view(args[0])
+        try:
+            if len(args) == 2 and args[0] == "drop":
+                self.set_ops.drop_view(args[1])
+                return True
+            return self.set_ops.view(self.set_ops.define_view(" ".join(args)).name)
+        except OSError as e:
+            raise BatchError(f"Cannot save the view definitions: {e.strerror or e}") from None
+
+    def _lattice(self, args: List[str]):
+        """Hasse diagram edges {(subset, covering superset)} of all sets, or the
+        number of edges after writing `lattice list|dot PATH`"""
+        if not args:
+            return set(self.set_ops.lattice().edges())
+        if len(args) != 2 or args[0] not in EXPORT_FORMATS:
+            raise BatchError(f"Use: lattice [{'|'.join(EXPORT_FORMATS)} PATH]")
+        self._file_access(f"lattice {args[0]}")
+        lattice = self.set_ops.lattice()
+        try:
+            with open(args[1], "w", encoding="utf-8") as f:
+                f.write(lattice.export(args[0]))
+        except OSError as e:
+            raise BatchError(f"Cannot write {args[1]}: {e.strerror or e}") from None
+        return len(lattice.edges())
+
+    @staticmethod
+    def _option(args: List[str], choices: tuple) -> Optional[str]:
+        """Remove and return a trailing keyword argument out of `choices`"""
+        return args.pop() if args and args[-1] in choices else None
+
+    def _rank(self, op: str, members, args: List[str]):
+        """Power set ranking (`unrank INDEX` → subset, `rank v ...` → index;
+        Gray-code order unless `binary` is given last) or a page of k-subsets
+        (`choose K [lex|colex] [OFFSET [LIMIT]]` → subsets as sorted tuples)"""
+        args = list(args)
+        if op == "choose":
+            order = None
+            if len(args) >= 2 and args[1] in K_SUBSET_ORDERS:
+                order = args.pop(1)
+            if not 1 <= len(args) <= 3:
+                raise BatchError("Use: setName choose K [lex|colex] [OFFSET [LIMIT]]")
+            k, offset, limit = (self._values(args) + [0, self.result_limit])[:3]
+            subsets = KSubsets(members, k, order or "lex")
+            return [tuple(canonical_order(s)) for s in subsets.iter_range(offset, offset + limit)]
+        subsets = PowerSet(members, self._option(args, POWER_SET_ORDERS) or "gray")
+        if op == "rank":
+            return subsets.index_of(self._values(args) if args else [])
+        if len(args) != 1:
+            raise BatchError("'unrank' takes one index")
+        try:
+            return subsets.subset_at(self._values(args)[0])
+        except IndexError as e:
+            raise BatchError(str(e)) from None
+
+    def _sample(self, tokens: List[str]):
+        """Uniformly random subsets of one set (`set1 sample COUNT [K]`) or tuples
+        of the product of several (`set1 set2 sample COUNT`); `seed=S` makes the
+        draw reproducible and `unique` draws without replacement"""
+        position = tokens.index(SAMPLE_OPERATION, 1)
+        names, args = tokens[:position], tokens[position + 1:]
+        unique = self._option(args, ("unique",)) is not None
+        seed = None
+        if args and args[-1].startswith("seed="):
+            seed = self._values([args.pop()[len("seed="):]])[0]
+        sizes = self._values(args) if args else []
+        if not 1 <= len(sizes) <= (2 if len(names) == 1 else 1):
+            raise BatchError("Use: setName sample COUNT [K] [seed=S] [unique] "
+                             "or setName1 setName2 ... sample COUNT [seed=S] [unique]")
+        sets = [self._get(name) for name in names]
+        if len(sets) > 1:
+            return CartesianProduct(*sets).sample(sizes[0], seed, unique)
+        subsets = KSubsets(sets[0], sizes[1]) if len(sizes) == 2 else PowerSet(sets[0])
+        return [tuple(canonical_order(s)) for s in subsets.sample(sizes[0], seed, unique)]
+
+    def _export(self, args: List[str]):
+        """Write sets (all, or the given names, ranges and patterns) to DIR as
+        FORMAT files with a manifest each; returns the exported set names"""
+        if len(args) < 2 or args[0] not in SET_EXPORT_FORMATS:
+            raise BatchError(f"Use: export {'|'.join(SET_EXPORT_FORMATS)} DIR [gz] [setNames]")
+        fmt, directory, names = args[0], args[1], args[2:]
+        compress = names[:1] == ["gz"]
+        if compress:
+            names = names[1:]
+        try:
+            manifests = self.set_ops.export_sets(names, directory, fmt, compress)
+        except OSError as e:
+            raise BatchError(f"Cannot write to {directory}: {e.strerror or e}") from None
+        return {manifest["set"] for manifest in manifests}
+
+    def _import(self, op: str, name: str, path: str, column: List[str]):
+        """Stream a member file into (or out of) a set"""
+        column = column[0] if column else "0"
+        try:
+            result, _ = self.set_ops.import_file(op, name, path, int(column) if column.isdigit() else column)
+        except OSError as e:
+            raise BatchError(f"Cannot read {path}: {e.strerror or e}") from None
+        return result
+
+    def _similarity(self, op: str, tokens: List[str]):
+        """Estimated Jaccard similarity of pairs: {(name1, name2): estimate}"""
+        specs, args = (tokens[:-1], []) if tokens[-1] == op else (tokens[:-2], tokens[-1:])
+        names = expand_set_names(specs, self.set_ops.sets)
+        if len(names) < 2:
+            raise BatchError(f"'{op}' needs at least two sets")
+        if op == "jaccard":
+            return self.set_ops.jaccard_estimates(names)
+        try:
+            threshold = float(args[0]) if args else None
+            if threshold is not None and not 0 <= threshold <= 1:
+                raise ValueError(threshold)
+        except ValueError:
+            raise BatchError(f"Invalid threshold '{args[0]}' (use a number between 0 and 1)") from None
+        return self.set_ops.near_duplicates(names, threshold)
+
+    def execute_line(self, command: str):
+        """Run one command line and record its timing.
+        Returns (operation, result, seconds, error message or None)."""
+        tokens = command.split()
+        t0 = time.perf_counter()
+        op = self.classify(tokens) or "invalid"
+        result, error = None, None
+        try:
+            op, result = self.execute(tokens)
+        except (BatchError, TypeError, ValueError) as e:
+            error = str(e)
+            self.errors += 1
+        seconds = time.perf_counter() - t0
+        self.stats.setdefault(op, OperationStats()).add(seconds, error is None)
+        self.commands += 1
+        return op, result, seconds, error
+
+    # --- output -----------------------------------------------------------
+    def _emit(self, line_no: int, command: str, op: str, result: Any, seconds: float,
+              error: Optional[str] = None):
+        if self.output == "quiet":
+            return
+        if error is not None:
+            if self.output == "jsonl":
+                self.out.write(json.dumps({"line": line_no, "command": command, "ok": False,
+                                           "error": error}, ensure_ascii=False) + "\n")
+            else:
+                self.out.write(f"{line_no}\terror\t{error}\n" if self.output == "counts"
+                               else f"❌ line {line_no}: {command} → {error}\n")
+            return
+        size = result.size if isinstance(result, CartesianProduct) else None
+        if size is None and not isinstance(result, (bool, int)):
+            size = len(result)
+        value = result if isinstance(result, (bool, int)) else size
+        if self.output == "counts":
+            self.out.write(f"{line_no}\t{op}\t{value}\n")
+        elif self.output == "jsonl":
+            record = {"line": line_no, "command": command}
+            record.update(result_record(op, result, self.result_limit))
+            record["ms"] = round(seconds * 1000, 3)
+            self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            shown = result if size is None or size <= self.result_limit else f"<{size} elements>"
+            if isinstance(result, CartesianProduct):
+                shown = f"<{size} tuples>"
+            self.out.write(f"{command} → {shown}\n")
+
+    # --- driver -----------------------------------------------------------
+    def run(self, lines: Iterable[str]) -> bool:
+        """Execute every command; returns True when none failed"""
+        started = time.perf_counter()
+        for line_no, line in enumerate(lines, 1):
+            command = line.strip()
+            if not command or command.startswith('#'):
+                continue
+            op, result, seconds, error = self.execute_line(command)
+            self._emit(line_no, command, op, result, seconds, error=error)
+        self.out.flush()
+        self.elapsed = time.perf_counter() - started
+        return self.errors == 0
+
+    def summary(self, title: str = "Batch summary") -> str:
+        """Throughput and per-operation timing table"""
+        rate = self.commands / self.elapsed if self.elapsed else 0.0
+        lines = [f"📊 {title}: {self.commands} commands, {self.errors} errors, "
+                 f"{self.elapsed:.3f}s ({rate:,.0f} commands/s)",
+                 f"  {'operation':<14}{'count':>8}{'errors':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+        for op, stats in sorted(self.stats.items()):
+            lines.append(f"  {op:<14}{stats.count:>8}{stats.errors:>8}{stats.total * 1000:>12.3f}"
+                         f"{stats.total * 1000 / stats.count:>10.3f}{stats.max * 1000:>10.3f}")
+        return "\n".join(lines)
+
+
+def result_record(op: str, result: Any, result_limit: int) -> Dict[str, Any]:
+    """JSON-ready description of a successful command's result.
+    Sets larger than result_limit (and every Cartesian product) are reported
+    by size only; similarity results as [name1, name2, estimate] rows."""
+    record: Dict[str, Any] = {"op": op, "ok": True}
+    if isinstance(result, (bool, int)):
+        record["result"] = result
+        return record
+    size = result.size if isinstance(result, CartesianProduct) else len(result)
+    record["size"] = size
+    if isinstance(result, dict):
+        # Similarity pairs, most similar first
+        if size <= result_limit:
+            record["result"] = [[x, y, value] for (x, y), value in
+                                sorted(result.items(), key=lambda item: (-item[1], item[0]))]
+        return record
+    if not isinstance(result, CartesianProduct) and size <= result_limit:
+        record["result"] = _json_elements(result)
+    return record
+
+
+def _json_elements(result) -> list:
+    """JSON-friendly, deterministic list of set members (lists, such as
+    samples, keep their order)"""
+    if isinstance(result, list):
+        return result
+    try:
+        return sorted(result)
+    except TypeError:
+        return [str(x) for x in result]
@@ -0,0 +1,277 @@
+"""
+Benchmark Suite
+===============
+Reproducible timings of the set operations, power set and Cartesian product
+streaming, and loading/saving sets, on synthetic data from 10 to 10^7
+elements.
+
+Datasets (seeded, so every run sees the same members):
+    dense   - two integer ranges overlapping by half (stored as CompactIntSet)
+    sparse  - two random samples from a range 1000× their size (little overlap)
+    skewed  - a large set and one a tenth of its size, 90% inside the large one
+
+Every benchmark runs `warmup` untimed rounds, then `repeat` timed rounds, then
+one more round under tracemalloc for the peak memory it allocates. Results are
+written as JSON; `--baseline` compares them with an earlier results file and
+exits with status 1 when a benchmark is slower (or uses more memory) than the
+baseline by more than `--tolerance`. Both runs need at least
+MIN_COMPARE_REPEAT timed rounds: the median of one or two rounds is mostly
+noise.
+
+    python bench.py                                  # quick: 10 … 10^5
+    python bench.py --profile full --output base.json
+    python bench.py --baseline base.json --tolerance 0.25
+
+Two-set operations run like SetOperations.compute() without its result cache,
+with main.py's own operations, settings and make_set() (importing main loads
+no sets): sets are stored with the backend make_set() picks, and large integer
+inputs use the NumPy engine when it is installed (its per-set arrays are built
+during warm-up, as after the first query of a session).
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from arrayengine import ArrayEngine
+from combinatorics import CartesianProduct, stream_power_set
+from main import SET_OPERATIONS, load_settings, make_set
+from setfile import iter_set_file_path, write_set_file
+from snapshot import SnapshotReader, write_snapshot
+
+PROFILES = {
+    "quick": [10, 1000, 100000],
+    "full": [10, 1000, 100000, 1000000, 10000000],
+}
+DATASETS = ("dense", "sparse", "skewed")
+BENCHMARKS = tuple(SET_OPERATIONS) + ("power_set", "cartesian", "save_text", "load_text",
+                                          "save_binary", "load_binary")
+# Power sets double with every element: n is capped whatever the dataset size
+POWER_SET_MAX_ELEMENTS = 16
+# Differences below this are timer noise, never regressions
+MIN_REGRESSION_SECONDS = 0.0005
+# Fewer timed rounds than this cannot tell a regression from noise
+MIN_COMPARE_REPEAT = 5
+# Settings that change what is measured, recorded with the results
+BENCH_SETTINGS = ("compact_min_size", "compact_min_chunk_fill", "array_engine_min_size")
+
+
+# --- datasets ----------------------------------------------------------------
+def generate(dataset: str, size: int, seed: int = 42) -> Tuple[set, set]:
+    """Two input sets of the given shape; A has `size` members"""
+    rng = random.Random(f"{dataset}/{size}/{seed}")
+    if dataset == "dense":
+        half = size // 2
+        return set(range(size)), set(range(half, half + size))
+    if dataset == "sparse":
+        universe = range(size * 1000)
+        return set(rng.sample(universe, size)), set(rng.sample(universe, size))
+    if dataset == "skewed":
+        a = rng.sample(range(size * 10), size)
+        small = max(1, size // 10)
+        inside = rng.sample(a, small * 9 // 10)
+        outside = rng.sample(range(size * 10, size * 20), small - len(inside))
+        return set(a), set(inside + outside)
+    raise ValueError(f"Unknown dataset '{dataset}'")
+
+
+# --- measurement -------------------------------------------------------------
+def measure(run: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    """Time run() `repeat` times after `warmup` rounds, then trace its peak memory"""
+    for _ in range(warmup):
+        run()
+    times = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_s": statistics.median(times), "min_s": min(times),
+            "mean_s": statistics.mean(times), "repeat": len(times), "peak_bytes": peak}
+
+
+def _two_set(op: str, a, b, settings: Dict[str, Any]) -> Callable[[], Any]:
+    engine = ArrayEngine()
+    use_engine = (engine.available and engine.supports(op)
+                  and len(a) + len(b) >= settings["array_engine_min_size"])
+
+    def run():
+        result = engine.compute(op, "A", a, "B", b) if use_engine else None
+        if result is None:
+            result = SET_OPERATIONS[op](a, b)
+        return result
+    return run
+
+
+def cases(benchmark: str, dataset: str, size: int, a, b, settings: Dict[str, Any],
+          workdir: str) -> Iterable[Tuple[str, Callable[[], Any]]]:
+    """(name, callable) pairs for one benchmark on the stored inputs of one dataset size"""
+    if benchmark in SET_OPERATIONS:
+        yield f"{benchmark}/{dataset}/{size}", _two_set(benchmark, a, b, settings)
+    elif benchmark == "power_set":
+        n = min(size, POWER_SET_MAX_ELEMENTS)
+        elements = sorted(a)[:n]
+
+        def run():
+            with open(os.devnull, "w") as sink:
+                stream_power_set(elements, out=sink)
+        yield f"power_set/{dataset}/{n}", run
+    elif benchmark == "cartesian":
+        # |A × B| ≈ size tuples
+        side = max(1, math.isqrt(size) if hasattr(math, "isqrt") else int(size ** 0.5))
+        product = CartesianProduct(sorted(a)[:side], sorted(b)[:side])
+
+        def run():
+            with open(os.devnull, "w") as sink:
+                product.stream(out=sink)
+        yield f"cartesian/{dataset}/{product.size}", run
+    else:
+        sets = {"A": a, "B": b}
+        binary = benchmark.endswith("_binary")
+        path = os.path.join(workdir, "a.snap" if binary else "a.txt")
+        write = write_snapshot if binary else write_set_file
+        if benchmark.startswith("save"):
+            yield f"{benchmark}/{dataset}/{size}", lambda: write(path, sets)
+        else:
+            write(path, sets)
+
+            def load_text():
+                return {name: make_set(value, settings) for name, value in iter_set_file_path(path)}
+
+            def load_binary():
+                reader = SnapshotReader(path)
+                try:
+                    return {name: make_set(reader.load(name), settings) for name in reader.entries}
+                finally:
+                    reader.close()
+            yield f"{benchmark}/{dataset}/{size}", load_binary if binary else load_text
+
+
+def run_suite(sizes: List[int], datasets: Iterable[str] = DATASETS,
+              benchmarks: Iterable[str] = BENCHMARKS, repeat: int = 5, warmup: int = 1,
+              progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Run every benchmark on every dataset and size; returns the results document"""
+    settings = load_settings()
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            for dataset in datasets:
+                a, b = (make_set(values, settings) for values in generate(dataset, size))
+                for benchmark in benchmarks:
+                    for name, run in cases(benchmark, dataset, size, a, b, settings, workdir):
+                        if name in results:
+                            continue  # e.g. power sets capped to the same n
+                        results[name] = measure(run, repeat, warmup)
+                        if progress is not None:
+                            progress(name, results[name])
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": ArrayEngine().available,
+            "repeat": repeat,
+            "warmup": warmup,
+            "settings": {key: settings[key] for key in BENCH_SETTINGS},
+        },
+        "results": results,
+    }
+
+
+# --- baseline comparison -----------------------------------------------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = 0.25) -> List[Tuple[str, str, float, float]]:
+    """Regressions as (benchmark, metric, baseline, current) for benchmarks in both runs;
+    ValueError when either run has fewer than MIN_COMPARE_REPEAT timed rounds"""
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        rounds = min(now.get("repeat", 0), before.get("repeat", 0))
+        if rounds < MIN_COMPARE_REPEAT:
+            raise ValueError(f"{name} has {rounds} timed rounds; comparing needs at least {MIN_COMPARE_REPEAT}")
+        if (now["median_s"] > before["median_s"] * (1 + tolerance)
+                and now["median_s"] - before["median_s"] > MIN_REGRESSION_SECONDS):
+            regressions.append((name, "median_s", before["median_s"], now["median_s"]))
+        if now["peak_bytes"] > before["peak_bytes"] * (1 + tolerance) + 4096:
+            regressions.append((name, "peak_bytes", before["peak_bytes"], now["peak_bytes"]))
+    return regressions
+
+
+def print_result(name: str, result: Dict[str, Any]) -> None:
+    print(f"  {name:<32} {result['median_s'] * 1000:>11.3f} ms {result['min_s'] * 1000:>11.3f} ms "
+          f"{result['peak_bytes'] / 1024:>12,.1f} KiB", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Set Operations benchmark suite")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick",
+                        help="dataset sizes: quick (10 … 10^5) or full (10 … 10^7)")
+    parser.add_argument("--sizes", help="comma-separated sizes, overrides --profile")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help="comma-separated datasets")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help="comma-separated benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed rounds per benchmark")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="fail on regressions against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown/memory growth over the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else PROFILES[args.profile]
+    datasets = [d for d in args.datasets.split(",") if d]
+    benchmarks = [b for b in args.benchmarks.split(",") if b]
+    unknown = [d for d in datasets if d not in DATASETS] + [b for b in benchmarks if b not in BENCHMARKS]
+    if unknown:
+        print(f"❌ ERROR: Unknown dataset/benchmark: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.baseline and args.repeat < MIN_COMPARE_REPEAT:
+        print(f"❌ ERROR: --baseline needs --repeat {MIN_COMPARE_REPEAT} or more", file=sys.stderr)
+        return 2
+
+    print(f"⏱ BENCHMARKS (sizes {', '.join(map(str, sizes))}; {args.warmup} warm-up, {args.repeat} timed)")
+    print(f"  {'benchmark':<32} {'median':>14} {'min':>14} {'peak memory':>16}")
+    report = run_suite(sizes, datasets, benchmarks, args.repeat, args.warmup, progress=print_result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(report, baseline, args.tolerance)
+        except ValueError as e:
+            print(f"❌ ERROR: {e} (rerun {args.baseline} with --repeat {MIN_COMPARE_REPEAT} or more)",
+                  file=sys.stderr)
+            return 2
+        for name, metric, before, now in regressions:
+            print(f"❌ {name}: {metric} {before:.6g} → {now:.6g} ({(now / before - 1) * 100 if before else math.inf:+.0f}%)")
+        if regressions:
+            print(f"📊 {len(regressions)} regressions against {args.baseline}")
+            return 1
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""
+Compact Integer Set Backend
+===========================
+A roaring-style compressed bitmap for sets of integers.
+
+Members are split into chunks by their high bits (x >> 16). Each chunk holds
+its low 16 bits either in a sorted array('H') container (sparse chunks, 2 bytes
+per member) or in a 65536-bit bitmap container stored as a Python int (dense
+chunks), so bulk boolean operations between dense chunks run as word-level
+big-integer operations in C.
+
+Containers are never modified in place, so sets share them: copy() and the
+bulk operations copy only the chunk table (one entry per 65536 values) and
+build new containers for the chunks they change. add() and discard() replace
+one container of at most ARRAY_MAX members or one bitmap.
+
+CompactIntSet behaves like a built-in set for everything the tool uses
+(union, intersection, difference, symmetric difference, subset, equality,
+membership, add/remove, iteration) and mixes freely with plain sets.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableSet
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+BITMAP_BYTES = CHUNK_SIZE // 8
+# Above this many members a bitmap container (8 KiB) is smaller than an array
+ARRAY_MAX = 4096
+
+Container = Union[array, int]
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+# Bit offsets set in each possible byte value, used to decode bitmaps quickly
+_BYTE_BITS = [tuple(i for i in range(8) if b >> i & 1) for b in range(256)]
+
+
+def _bits_of_array(values: Iterable[int]) -> int:
+    """Build a bitmap container from low 16-bit values"""
+    buf = bytearray(BITMAP_BYTES)
+    for v in values:
+        buf[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _array_of_bits(bits: int) -> array:
+    """Decode a bitmap container into a sorted array container"""
+    out = array("H")
+    raw = bits.to_bytes(BITMAP_BYTES, "little")
+    for i, byte in enumerate(raw):
+        if byte:
+            base = i << 3
+            out.extend(base + offset for offset in _BYTE_BITS[byte])
+    return out
+
+
+def _as_bits(container: Container) -> int:
+    return container if isinstance(container, int) else _bits_of_array(container)
+
+
+def _cardinality(container: Container) -> int:
+    return _popcount(container) if isinstance(container, int) else len(container)
+
+
+def _normalize(container: Container) -> Optional[Container]:
+    """Pick the smaller container kind for the content; None when empty"""
+    if isinstance(container, int):
+        count = _popcount(container)
+        if count == 0:
+            return None
+        return container if count > ARRAY_MAX else _array_of_bits(container)
+    if not container:
+        return None
+    return container if len(container) <= ARRAY_MAX else _bits_of_array(container)
+
+
+def _filter_array(values: array, other: Container, keep: bool) -> array:
+    """Members of an array container that are (keep=True) or are not in other"""
+    if isinstance(other, int):
+        raw = other.to_bytes(BITMAP_BYTES, "little")
+        return array("H", (v for v in values if bool(raw[v >> 3] >> (v & 7) & 1) == keep))
+    lookup = set(other)
+    return array("H", (v for v in values if (v in lookup) == keep))
+
+
+def _union(a: Container, b: Container) -> Container:
+    if isinstance(a, array) and isinstance(b, array) and len(a) + len(b) <= ARRAY_MAX:
+        return array("H", sorted(set(a).union(b)))
+    return _as_bits(a) | _as_bits(b)
+
+
+def _intersection(a: Container, b: Container) -> Container:
+    if isinstance(a, int) and isinstance(b, int):
+        return a & b
+    if isinstance(a, int):
+        a, b = b, a
+    return _filter_array(a, b, keep=True)
+
+
+def _difference(a: Container, b: Container) -> Container:
+    if isinstance(a, array):
+        return _filter_array(a, b, keep=False)
+    return a & ~_as_bits(b)
+
+
+def _symmetric_difference(a: Container, b: Container) -> Container:
+    if isinstance(a, array) and isinstance(b, array):
+        return array("H", sorted(set(a).symmetric_difference(b)))
+    return _as_bits(a) ^ _as_bits(b)
+
+
+def _is_subset(a: Container, b: Container) -> bool:
+    if _cardinality(a) > _cardinality(b):
+        return False
+    if isinstance(a, array):
+        return len(_filter_array(a, b, keep=False)) == 0
+    return a & ~_as_bits(b) == 0
+
+
+def is_int_member(x) -> bool:
+    """Only genuine ints (not bools) can live in a CompactIntSet"""
+    return type(x) is int
+
+
+class CompactIntSet(MutableSet):
+    """Set of integers stored as chunked array/bitmap containers"""
+
+    __slots__ = ("_chunks", "_len")
+    __hash__ = None
+
+    def __init__(self, iterable: Iterable[int] = ()):
+        self._chunks: Dict[int, Container] = {}
+        self._len = 0
+        if isinstance(iterable, CompactIntSet):
+            self._chunks = dict(iterable._chunks)
+            self._len = iterable._len
+            return
+        groups: Dict[int, list] = {}
+        for x in iterable:
+            if not is_int_member(x):
+                raise TypeError(f"CompactIntSet only stores int, got {type(x).__name__}")
+            groups.setdefault(x >> CHUNK_BITS, []).append(x & LOW_MASK)
+        for key, lows in groups.items():
+            unique = sorted(set(lows))
+            container = array("H", unique) if len(unique) <= ARRAY_MAX else _bits_of_array(unique)
+            self._chunks[key] = container
+            self._len += len(unique)
+
+    @classmethod
+    def from_containers(cls, chunks: Dict[int, Container]) -> "CompactIntSet":
+        """Build a set from ready-made containers keyed by chunk (x >> 16).
+        Each container is an array('H') of sorted low bits or an int bitmap."""
+        return cls._from_chunks(chunks)
+
+    @classmethod
+    def _from_chunks(cls, chunks: Dict[int, Container]) -> "CompactIntSet":
+        result = cls()
+        for key, container in chunks.items():
+            container = _normalize(container)
+            if container is not None:
+                result._chunks[key] = container
+                result._len += _cardinality(container)
+        return result
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Used by the MutableSet mixins; fall back to set for non-int results
+        items = list(iterable)
+        if all(is_int_member(x) for x in items):
+            return cls(items)
+        return set(items)
+
+    # --- basic protocol ---------------------------------------------------
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, x) -> bool:
+        if not is_int_member(x):
+            return False
+        container = self._chunks.get(x >> CHUNK_BITS)
+        if container is None:
+            return False
+        low = x & LOW_MASK
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        i = bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self._chunks):
+            base = key << CHUNK_BITS
+            container = self._chunks[key]
+            if isinstance(container, int):
+                container = _array_of_bits(container)
+            for low in container:
+                yield base | low
+
+    def __repr__(self) -> str:
+        if not self._len:
+            return "set()"
+        return "{" + ", ".join(map(str, self)) + "}"
+
+    def copy(self) -> "CompactIntSet":
+        return CompactIntSet(self)
+
+    def to_set(self) -> set:
+        return set(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate payload size of all containers, in bytes"""
+        return sum(BITMAP_BYTES if isinstance(c, int) else 2 * len(c)
+                   for c in self._chunks.values())
+
+    # --- mutation ---------------------------------------------------------
+    def add(self, x: int) -> None:
+        if not is_int_member(x):
+            raise TypeError(f"CompactIntSet only stores int, got {type(x).__name__}")
+        key, low = x >> CHUNK_BITS, x & LOW_MASK
+        container = self._chunks.get(key)
+        if container is None:
+            self._chunks[key] = array("H", [low])
+        elif isinstance(container, int):
+            if container >> low & 1:
+                return
+            self._chunks[key] = container | (1 << low)
+        else:
+            i = bisect_left(container, low)
+            if i < len(container) and container[i] == low:
+                return
+            container = container[:i] + array("H", (low,)) + container[i:]
+            self._chunks[key] = container if len(container) <= ARRAY_MAX else _bits_of_array(container)
+        self._len += 1
+
+    def discard(self, x: int) -> None:
+        if x not in self:
+            return
+        key, low = x >> CHUNK_BITS, x & LOW_MASK
+        container = self._chunks[key]
+        if isinstance(container, int):
+            container = _normalize(container & ~(1 << low))
+        else:
+            i = bisect_left(container, low)
+            container = _normalize(container[:i] + container[i + 1:])
+        if container is None:
+            del self._chunks[key]
+        else:
+            self._chunks[key] = container
+        self._len -= 1
+
+    def remove(self, x: int) -> None:
+        if x not in self:
+            raise KeyError(x)
+        self.discard(x)
+
+    def update(self, *others: Iterable) -> None:
+        for other in others:
+            merged = self.union(other)
+            if not isinstance(merged, CompactIntSet):
+                raise TypeError("CompactIntSet only stores int")
+            self._chunks, self._len = merged._chunks, merged._len
+
+    def difference_update(self, *others: Iterable) -> None:
+        for other in others:
+            remaining = self.difference(other)
+            self._chunks, self._len = remaining._chunks, remaining._len
+
+    # --- bulk operations --------------------------------------------------
+    @staticmethod
+    def _coerce(other) -> Optional["CompactIntSet"]:
+        """Convert an operand to CompactIntSet, or None if it holds non-ints"""
+        if isinstance(other, CompactIntSet):
+            return other
+        items = other if isinstance(other, (set, frozenset)) else set(other)
+        if all(is_int_member(x) for x in items):
+            return CompactIntSet(items)
+        return None
+
+    def union(self, *others: Iterable):
+        result: Union[CompactIntSet, set] = self
+        for other in others:
+            rhs = self._coerce(other)
+            if rhs is None or not isinstance(result, CompactIntSet):
+                result = set(result).union(other)
+                continue
+            chunks = dict(result._chunks)
+            for key, container in rhs._chunks.items():
+                mine = chunks.get(key)
+                chunks[key] = container if mine is None else _union(mine, container)
+            result = CompactIntSet._from_chunks(chunks)
+        return result.copy() if result is self else result
+
+    def intersection(self, *others: Iterable) -> "CompactIntSet":
+        result = self
+        for other in others:
+            rhs = self._coerce(other)
+            if rhs is None:
+                # Only int members of other can match; drop the rest
+                rhs = CompactIntSet(x for x in other if is_int_member(x))
+            if len(rhs._chunks) < len(result._chunks):
+                pairs = ((k, result._chunks.get(k), c) for k, c in rhs._chunks.items())
+                chunks = {k: _intersection(mine, c) for k, mine, c in pairs if mine is not None}
+            else:
+                chunks = {k: _intersection(c, rhs._chunks[k])
+                          for k, c in result._chunks.items() if k in rhs._chunks}
+            result = CompactIntSet._from_chunks(chunks)
+        return result.copy() if result is self else result
+
+    def difference(self, *others: Iterable) -> "CompactIntSet":
+        result = self
+        for other in others:
+            rhs = self._coerce(other)
+            if rhs is None:
+                rhs = CompactIntSet(x for x in other if is_int_member(x))
+            chunks = {}
+            for key, container in result._chunks.items():
+                theirs = rhs._chunks.get(key)
+                chunks[key] = container if theirs is None else _difference(container, theirs)
+            result = CompactIntSet._from_chunks(chunks)
+        return result.copy() if result is self else result
+
+    def symmetric_difference(self, other: Iterable):
+        rhs = self._coerce(other)
+        if rhs is None:
+            return set(self).symmetric_difference(other)
+        chunks = dict(self._chunks)
+        for key, container in rhs._chunks.items():
+            mine = chunks.get(key)
+            chunks[key] = container if mine is None else _symmetric_difference(mine, container)
+        return CompactIntSet._from_chunks(chunks)
+
+    def issubset(self, other: Iterable) -> bool:
+        rhs = self._coerce(other)
+        if rhs is None:
+            rhs = CompactIntSet(x for x in other if is_int_member(x))
+        if self._len > rhs._len:
+            return False
+        for key, container in self._chunks.items():
+            theirs = rhs._chunks.get(key)
+            if theirs is None or not _is_subset(container, theirs):
+                return False
+        return True
+
+    def issuperset(self, other: Iterable) -> bool:
+        rhs = self._coerce(other)
+        if rhs is None:
+            return False
+        return rhs.issubset(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CompactIntSet):
+            if self._len != other._len or self._chunks.keys() != other._chunks.keys():
+                return False
+            # Containers are always normalized, so equal content means equal form
+            return all(self._chunks[k] == other._chunks[k] for k in self._chunks)
+        if isinstance(other, (set, frozenset)):
+            return self._len == len(other) and all(x in self for x in other)
+        return NotImplemented
+
+    def __le__(self, other) -> bool:
+        if not isinstance(other, (CompactIntSet, set, frozenset)):
+            return NotImplemented
+        return self.issubset(other)
+
+    def __ge__(self, other) -> bool:
+        if not isinstance(other, (CompactIntSet, set, frozenset)):
+            return NotImplemented
+        return self.issuperset(other)
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __xor__(self, other):
+        return self.symmetric_difference(other)
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __rsub__(self, other):
+        rhs = self._coerce(other)
+        if rhs is None:
+            return set(other).difference(self)
+        return rhs.difference(self)
+
+
+def prefers_compact(elements: Iterable, min_size: int, min_chunk_fill: int) -> bool:
+    """Decide by size and density whether a set should use CompactIntSet.
+
+    Requires all members to be ints, at least `min_size` of them, and on
+    average `min_chunk_fill` members per occupied 2^16-wide chunk (below that
+    the per-chunk overhead outweighs the saving over a hash set).
+    """
+    if isinstance(elements, CompactIntSet):
+        return True
+    if len(elements) < min_size:
+        return False
+    keys = set()
+    for x in elements:
+        if not is_int_member(x):
+            return False
+        keys.add(x >> CHUNK_BITS)
+    return len(elements) >= min_chunk_fill * len(keys)
@@ -0,0 +1,359 @@
+"""
+Bulk Import
+===========
+Streaming readers for large files of members: integers, or (jsonl only)
+any JSON scalar or array.
+
+Formats (picked from the file name unless given):
+
+    lines   one integer per line, or any whitespace between them (default)
+    csv     one column of a CSV file (.csv; .tsv is tab-separated), chosen by
+            0-based index or header name; a first row that is not an
+            integer is skipped as a header
+    int64   raw little-endian int64 values (.bin, .i64, .int64)
+    jsonl   JSON Lines, each line a member or an array of members (.jsonl,
+            .ndjson); members are numbers, strings, booleans, null or
+            arrays, which become tuples (the export of a product)
+    varint  the export module's delta-plus-varint encoding (.vint): a magic
+            string, then self-contained blocks of sorted members
+
+A manifest written by the export module (name.manifest.json) can be given
+instead of its data file: the file's SHA-256 checksum is verified before
+anything is read, and the number of members read must match its cardinality.
+
+gzip-compressed files are recognized by their magic bytes and decompressed
+on the fly. Files are read in blocks of `chunk_bytes`. read_members() yields
+the members of each block as one list, so memory stays bounded by one block
+and one chunk however large the file is. With NumPy a block of text is
+parsed in one vectorized call. If that fails, or a value may not fit in 64
+bits, the block is parsed again with int() to get exact values or the exact
+offending token.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+FORMATS = ("lines", "csv", "int64", "jsonl", "varint")
+DEFAULT_CHUNK_BYTES = 1 << 20
+GZIP_MAGIC = b"\x1f\x8b"
+MANIFEST_SUFFIX = ".manifest.json"
+_INT64_EXTREMES = (-(1 << 63), (1 << 63) - 1)
+_BINARY_SUFFIXES = (".bin", ".i64", ".int64")
+_JSONL_SUFFIXES = (".jsonl", ".ndjson")
+_VARINT_SUFFIX = ".vint"
+
+# varint files: VARINT_MAGIC, then blocks of VARINT_BLOCK (payload bytes,
+# member count, flags) followed by the payload. A payload holds the zigzag of
+# the block's first member, then each gap to the next member minus one, as
+# unsigned LEB128 varints. VARINT_WIDE marks blocks with members outside int64.
+VARINT_MAGIC = b"FLTVINT1"
+VARINT_BLOCK = struct.Struct("<IIB")
+VARINT_WIDE = 1
+
+ProgressCallback = Callable[[int, int, int], None]
+
+
+class BulkImportError(ValueError):
+    """A member file could not be parsed"""
+
+
+def _uncompressed_name(path: str) -> str:
+    name = path.lower()
+    return name[:-3] if name.endswith(".gz") else name
+
+
+def detect_format(path: str) -> str:
+    """Format implied by the file name (a trailing .gz is ignored); "manifest"
+    for an export manifest, whose data file may have any format"""
+    if path.lower().endswith(MANIFEST_SUFFIX):
+        return "manifest"
+    name = _uncompressed_name(path)
+    if name.endswith((".csv", ".tsv")):
+        return "csv"
+    if name.endswith(_BINARY_SUFFIXES):
+        return "int64"
+    if name.endswith(_JSONL_SUFFIXES):
+        return "jsonl"
+    if name.endswith(_VARINT_SUFFIX):
+        return "varint"
+    return "lines"
+
+
+def file_checksum(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> str:
+    """SHA-256 of a file's bytes, as hex"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_bytes), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_manifest(path: str) -> Tuple[str, str, int]:
+    """(data file, format, cardinality) of an export manifest, once the data
+    file's checksum has been verified"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        data_path = os.path.join(os.path.dirname(path), manifest["file"])
+        fmt, cardinality, checksum = manifest["format"], manifest["cardinality"], manifest["sha256"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise BulkImportError(f"invalid manifest {os.path.basename(path)}: {e}") from None
+    if file_checksum(data_path) != checksum:
+        raise BulkImportError(f"checksum mismatch: {manifest['file']} does not match its manifest")
+    return data_path, fmt, cardinality
+
+
+def parse_integers(data: bytes, first_line: int = 1) -> List[int]:
+    """Whitespace-separated integers of a text block; errors give the line
+    and column only, never the offending text (it may come from any file)"""
+    if np is not None:
+        try:
+            values = np.fromstring(data, dtype=np.int64, sep="\n")
+        except ValueError:
+            pass
+        else:
+            # NumPy saturates out-of-range values instead of failing
+            if not values.size or (values.min() > _INT64_EXTREMES[0] and values.max() < _INT64_EXTREMES[1]):
+                return values.tolist()
+    try:
+        return [int(token) for token in data.split()]
+    except ValueError:
+        pass
+    for line_no, line in enumerate(data.split(b"\n"), first_line):
+        for token in re.finditer(rb"\S+", line):
+            try:
+                int(token.group())
+            except ValueError:
+                raise BulkImportError(f"line {line_no}, column {token.start() + 1}: not an integer") from None
+    raise BulkImportError(f"invalid data after line {first_line}")
+
+
+def _blocks(stream, chunk_bytes: int) -> Iterator[bytes]:
+    """Blocks of about chunk_bytes that end at a line break (or at EOF)"""
+    carry = b""
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            if carry:
+                yield carry
+            return
+        block = carry + block
+        cut = block.rfind(b"\n") + 1
+        if cut == 0:
+            carry = block  # one very long line: keep reading
+            continue
+        carry = block[cut:]
+        yield block[:cut]
+
+
+def _lines(stream, chunk_bytes: int) -> Iterator[List[int]]:
+    line_no = 1
+    for block in _blocks(stream, chunk_bytes):
+        yield parse_integers(block, line_no)
+        line_no += block.count(b"\n")
+
+
+def _csv(stream, chunk_bytes: int, column: Union[int, str], delimiter: str) -> Iterator[List[int]]:
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    rows = csv.reader(text, delimiter=delimiter)
+    index = column if isinstance(column, int) else None
+    cells: List[str] = []
+    size = 0
+    row_no = 0
+    first = True
+    for row_no, row in enumerate(rows, 1):
+        if not row:
+            continue
+        if first:
+            first = False
+            if index is None:
+                try:
+                    index = row.index(column)
+                except ValueError:
+                    raise BulkImportError(f"no column named '{column}' in the header") from None
+                continue
+            if index < len(row) and not row[index].strip().lstrip("+-").isdigit():
+                continue  # a header
+        try:
+            cell = row[index]
+        except IndexError:
+            raise BulkImportError(f"row {row_no}: no column {index}") from None
+        cells.append(cell)
+        size += len(cell) + 1
+        if size >= chunk_bytes:
+            yield parse_integers("\n".join(cells).encode("utf-8"), row_no - len(cells) + 1)
+            cells, size = [], 0
+    if cells:
+        yield parse_integers("\n".join(cells).encode("utf-8"), row_no - len(cells) + 1)
+
+
+def _int64(stream, chunk_bytes: int) -> Iterator[List[int]]:
+    chunk_bytes -= chunk_bytes % 8
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            return
+        if len(block) % 8:
+            # A short read is not the end of a compressed stream: top it up
+            rest = stream.read(8 - len(block) % 8)
+            block += rest
+            if len(block) % 8:
+                raise BulkImportError("file size is not a multiple of 8 bytes (int64)")
+        if np is not None:
+            yield np.frombuffer(block, dtype="<i8").tolist()
+        else:
+            values = array("q", block)
+            if sys.byteorder == "big":
+                values.byteswap()
+            yield values.tolist()
+
+
+def json_member(value):
+    """A set member decoded from JSON: arrays become (nested) tuples"""
+    if isinstance(value, list):
+        return tuple(json_member(x) for x in value)
+    if isinstance(value, dict):
+        raise TypeError("JSON objects cannot be set members")
+    return value
+
+
+def _jsonl(stream, chunk_bytes: int) -> Iterator[List]:
+    line_no = 0
+    for block in _blocks(stream, chunk_bytes):
+        lines = block.split(b"\n")
+        if not lines[-1]:
+            lines.pop()
+        values: List = []
+        for line_no, line in enumerate(lines, line_no + 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                raise BulkImportError(f"line {line_no}: invalid JSON") from None
+            row = row if isinstance(row, list) else [row]
+            if all(type(value) is int for value in row):
+                values.extend(row)
+                continue
+            try:
+                values.extend(json_member(value) for value in row)
+            except TypeError:
+                raise BulkImportError(f"line {line_no}: members cannot be JSON objects") from None
+        yield values
+
+
+def _read_exactly(stream, size: int) -> bytes:
+    data = stream.read(size)
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            raise BulkImportError("truncated varint file")
+        data += more
+    return data
+
+
+def decode_varints(payload: bytes, count: int, wide: bool = False) -> List[int]:
+    """Members of one varint block (see VARINT_BLOCK)"""
+    if np is not None and not wide and payload:
+        data = np.frombuffer(payload, dtype=np.uint8)
+        ends = np.flatnonzero(data < 0x80)
+        if len(ends) != count or ends[-1] != len(data) - 1:
+            raise BulkImportError("corrupt varint block")
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        positions = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+        parts = (data & 0x7F).astype(np.uint64) << (positions * 7).astype(np.uint64)
+        gaps = np.add.reduceat(parts, starts)
+        first = int(gaps[0])
+        gaps[0] = (first >> 1) ^ -(first & 1) & 0xFFFFFFFFFFFFFFFF
+        gaps[1:] += np.uint64(1)
+        # Wrapping uint64 sums are exact int64 members once reinterpreted
+        return np.cumsum(gaps, dtype=np.uint64).view(np.int64).tolist()
+    values: List[int] = []
+    current, shift, previous = 0, 0, None
+    for byte in payload:
+        current |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            if previous is None:
+                previous = (current >> 1) ^ -(current & 1)
+            else:
+                previous += current + 1
+            values.append(previous)
+            current, shift = 0, 0
+    if shift or len(values) != count:
+        raise BulkImportError("corrupt varint block")
+    return values
+
+
+def _varint(stream) -> Iterator[List[int]]:
+    if stream.read(len(VARINT_MAGIC)) != VARINT_MAGIC:
+        raise BulkImportError("not a varint member file")
+    while True:
+        header = stream.read(VARINT_BLOCK.size)
+        if not header:
+            return
+        if len(header) < VARINT_BLOCK.size:
+            header += _read_exactly(stream, VARINT_BLOCK.size - len(header))
+        length, count, flags = VARINT_BLOCK.unpack(header)
+        yield decode_varints(_read_exactly(stream, length), count, bool(flags & VARINT_WIDE))
+
+
+def read_members(path: str, fmt: Optional[str] = None, column: Union[int, str] = 0,
+                 chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                 progress: Optional[ProgressCallback] = None) -> Iterator[List[int]]:
+    """Members of a file (or of an export manifest's data file), one list per
+    block read. progress(bytes read, file size, members so far) is called
+    after every chunk. A missing file, an unknown format or a manifest whose
+    checksum does not match fail here, before anything is read."""
+    expected = None
+    if path.lower().endswith(MANIFEST_SUFFIX):
+        path, fmt, expected = resolve_manifest(path)
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise BulkImportError(f"unknown format '{fmt}' (use one of: {', '.join(FORMATS)})")
+    return _read(path, fmt, column, chunk_bytes, progress, os.path.getsize(path), expected)
+
+
+def _read(path: str, fmt: str, column: Union[int, str], chunk_bytes: int,
+          progress: Optional[ProgressCallback], total: int, expected: Optional[int]) -> Iterator[List[int]]:
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == GZIP_MAGIC
+        raw.seek(0)
+        stream = gzip.GzipFile(fileobj=raw, mode="rb") if compressed else raw
+        if fmt == "lines":
+            chunks = _lines(stream, chunk_bytes)
+        elif fmt == "csv":
+            delimiter = "\t" if _uncompressed_name(path).endswith(".tsv") else ","
+            chunks = _csv(stream, chunk_bytes, column, delimiter)
+        elif fmt == "jsonl":
+            chunks = _jsonl(stream, chunk_bytes)
+        elif fmt == "varint":
+            chunks = _varint(stream)
+        else:
+            chunks = _int64(stream, chunk_bytes)
+        members = 0
+        try:
+            for chunk in chunks:
+                members += len(chunk)
+                yield chunk
+                if progress is not None:
+                    progress(raw.tell(), total, members)
+        except (OSError, EOFError, UnicodeDecodeError) as e:
+            raise BulkImportError(f"cannot read {os.path.basename(path)}: {e}") from None
+        if expected is not None and members != expected:
+            raise BulkImportError(f"{os.path.basename(path)} holds {members} members, "
+                                  f"its manifest says {expected}")
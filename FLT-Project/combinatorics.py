@@ -0,0 +1,485 @@
+"""
+Combinatorics Engine
+====================
+Lazy generators for combinatorial constructions over sets (power sets,
+k-subsets and Cartesian products). Nothing here materializes the full result;
+members are produced one at a time and can be streamed to any text stream or
+file.
+
+Every construction is indexed over the canonical order of its sets'
+elements, so the i-th member can be computed directly and mapped back to
+its index (ranking and unranking):
+
+    PowerSet     subset i is a bit pattern of i (Gray code or plain binary)
+    KSubsets     k-subset r in lexicographic or colexicographic order, via the
+                 combinatorial number system (binomial coefficients)
+    CartesianProduct   tuple i has the mixed-radix digits of i
+
+Each costs a polynomial number of steps in |A| however large the index is.
+Uniform random samples draw indices directly, with replacement or without
+(unique=True), from a random.Random that a seed makes reproducible.
+"""
+
+import random
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+
+try:
+    from math import comb as binomial
+except ImportError:  # Python 3.7
+    def binomial(n: int, k: int) -> int:
+        """Number of k-element subsets of an n-element set"""
+        if k < 0 or k > n:
+            return 0
+        k = min(k, n - k)
+        result = 1
+        for i in range(1, k + 1):
+            result = result * (n - k + i) // i
+        return result
+
+DEFAULT_CHUNK_SIZE = 256
+SAMPLE_OPERATION = "sample"
+POWER_SET_ORDERS = ("gray", "binary")
+K_SUBSET_ORDERS = ("lex", "colex")
+
+Seed = Union[None, int, str, random.Random]
+
+
+def canonical_order(A: Iterable) -> List:
+    """Return the elements of A in a fixed order (sorted when comparable)"""
+    elements = list(A)
+    try:
+        return sorted(elements)
+    except TypeError:
+        return elements
+
+
+def gray_code(i: int) -> int:
+    """Return the i-th reflected binary Gray code"""
+    return i ^ (i >> 1)
+
+
+def gray_rank(code: int) -> int:
+    """Inverse of gray_code(): the index i with gray_code(i) == code"""
+    i = code
+    code >>= 1
+    while code:
+        i ^= code
+        code >>= 1
+    return i
+
+
+def sample_indices(total: int, count: int, seed: Seed = None, unique: bool = False) -> List[int]:
+    """`count` uniformly random indices in [0, total), drawn directly rather
+    than by enumerating anything; unique=True draws without replacement.
+    `seed` is a seed for a new random.Random or an existing generator."""
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+    if count < 0:
+        raise ValueError("The sample size cannot be negative")
+    if unique:
+        if count > total:
+            raise ValueError(f"Cannot draw {count} distinct items from {total}")
+        if total <= sys.maxsize:
+            return rng.sample(range(total), count)
+        # Too large for range(): count ≪ total, so repeats are rare
+        chosen: Dict[int, None] = {}
+        while len(chosen) < count:
+            chosen.setdefault(rng.randrange(total), None)
+        return list(chosen)
+    if count and not total:
+        raise ValueError("Cannot sample from an empty collection")
+    return [rng.randrange(total) for _ in range(count)]
+
+
+def power_set_size(A: Iterable) -> int:
+    """Number of subsets of A, without generating any of them"""
+    return 1 << len(A)
+
+
+def iter_power_set(A: Iterable, order: str = "gray", start: int = 0,
+                   stop: Optional[int] = None) -> Iterator[Set]:
+    """Lazily yield the subsets of A with indices in [start, stop).
+
+    order="gray"   -> consecutive subsets differ by exactly one element
+    order="binary" -> subset i contains element j when bit (n-1-j) of i is set
+                      (the ordering used by the original power_set())
+    """
+    elements = list(A)
+    n = len(elements)
+    total = 1 << n
+    stop = total if stop is None else min(stop, total)
+    if start < 0 or start >= stop:
+        return
+
+    if order == "binary":
+        for i in range(start, stop):
+            subset = set()
+            mask = i
+            j = n - 1
+            while mask:
+                if mask & 1:
+                    subset.add(elements[j])
+                mask >>= 1
+                j -= 1
+            yield subset
+    elif order == "gray":
+        # Jump straight to the requested page: the subset at index i is the
+        # bit pattern gray_code(i), after which each step toggles one element.
+        mask = gray_code(start)
+        current = {elements[j] for j in range(n) if mask >> j & 1}
+        yield set(current)
+        for i in range(start + 1, stop):
+            j = (i & -i).bit_length() - 1
+            element = elements[j]
+            if element in current:
+                current.remove(element)
+            else:
+                current.add(element)
+            yield set(current)
+    else:
+        raise ValueError(f"Unknown power set order: {order}")
+
+
+class PowerSet:
+    """Random access to the subsets of A in an iter_power_set() order.
+
+    subset_at(i) and index_of(subset) convert between a subset and its index
+    in O(|A|) steps, so any of the 2^|A| subsets can be reached, or drawn at
+    random, without generating the ones before it.
+    """
+
+    def __init__(self, A: Iterable, order: str = "gray"):
+        if order not in POWER_SET_ORDERS:
+            raise ValueError(f"Unknown power set order: {order}")
+        self.elements: List = canonical_order(A)
+        self.order = order
+        self._positions: Optional[Dict] = None
+
+    @property
+    def size(self) -> int:
+        """2^|A| (may exceed sys.maxsize, unlike len())"""
+        return 1 << len(self.elements)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Set]:
+        return self.iter_range(0)
+
+    def __getitem__(self, index: int) -> Set:
+        return self.subset_at(index)
+
+    def _bit(self, j: int) -> int:
+        """Bit of the index pattern that stands for element j"""
+        return j if self.order == "gray" else len(self.elements) - 1 - j
+
+    def subset_at(self, index: int) -> Set:
+        """The subset with the given index (negative indices count from the end)"""
+        total = self.size
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError("Power set index out of range")
+        mask = gray_code(index) if self.order == "gray" else index
+        subset = set()
+        while mask:
+            low = mask & -mask
+            subset.add(self.elements[self._bit(low.bit_length() - 1)])
+            mask ^= low
+        return subset
+
+    def index_of(self, subset: Iterable) -> int:
+        """Index of a subset of A (the inverse of subset_at)"""
+        if self._positions is None:
+            self._positions = {x: j for j, x in enumerate(self.elements)}
+        mask = 0
+        for x in subset:
+            j = self._positions.get(x)
+            if j is None:
+                raise ValueError(f"{x!r} is not an element of the set")
+            mask |= 1 << self._bit(j)
+        return gray_rank(mask) if self.order == "gray" else mask
+
+    def iter_range(self, start: int, stop: Optional[int] = None) -> Iterator[Set]:
+        """Yield the subsets with indices in [start, stop)"""
+        return iter_power_set(self.elements, order=self.order, start=start, stop=stop)
+
+    def sample(self, count: int, seed: Seed = None, unique: bool = False) -> List[Set]:
+        """`count` uniformly random subsets (each element in or out with p = ½)"""
+        return [self.subset_at(i) for i in sample_indices(self.size, count, seed, unique)]
+
+
+class KSubsets:
+    """The k-element subsets of A, ranked by the positions of their elements
+    in the canonical order.
+
+    order="lex"    -> {a0, a1}, {a0, a2}, {a0, a3}, {a1, a2}, ... (compared
+                      by their smallest position first)
+    order="colex"  -> {a0, a1}, {a0, a2}, {a1, a2}, {a0, a3}, ... (compared
+                      by their largest position first, so the first C(m, k)
+                      subsets use only a0..a(m-1))
+
+    In colex order the rank of positions c1 < c2 < ... < ck is
+    C(c1, 1) + C(c2, 2) + ... + C(ck, k); lex order is colex order of the
+    mirrored positions, reversed. Ranking and unranking cost O(k log |A|)
+    binomial coefficients.
+    """
+
+    def __init__(self, A: Iterable, k: int, order: str = "lex"):
+        if order not in K_SUBSET_ORDERS:
+            raise ValueError(f"Unknown k-subset order: {order}")
+        if k < 0:
+            raise ValueError("k cannot be negative")
+        self.elements: List = canonical_order(A)
+        self.k = k
+        self.order = order
+        self._positions: Optional[Dict] = None
+
+    @property
+    def size(self) -> int:
+        """C(|A|, k) (may exceed sys.maxsize, unlike len())"""
+        return binomial(len(self.elements), self.k)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Set]:
+        return self.iter_range(0)
+
+    def __getitem__(self, rank: int) -> Set:
+        return self.subset_at(rank)
+
+    def _colex_positions(self, rank: int) -> List[int]:
+        """Positions of the colex rank-th k-subset, in increasing order"""
+        positions = []
+        high = len(self.elements)
+        for i in range(self.k, 0, -1):
+            # Largest c below the previous position with C(c, i) ≤ rank
+            low, top = i - 1, high - 1
+            while low < top:
+                middle = (low + top + 1) // 2
+                if binomial(middle, i) <= rank:
+                    low = middle
+                else:
+                    top = middle - 1
+            positions.append(low)
+            rank -= binomial(low, i)
+            high = low
+        positions.reverse()
+        return positions
+
+    @staticmethod
+    def _colex_rank(positions: List[int]) -> int:
+        return sum(binomial(c, i) for i, c in enumerate(positions, 1))
+
+    def positions_at(self, rank: int) -> List[int]:
+        """Element positions of the subset with the given rank, increasing"""
+        total = self.size
+        if rank < 0:
+            rank += total
+        if not 0 <= rank < total:
+            raise IndexError("k-subset rank out of range")
+        if self.order == "colex":
+            return self._colex_positions(rank)
+        last = len(self.elements) - 1
+        return [last - c for c in reversed(self._colex_positions(total - 1 - rank))]
+
+    def subset_at(self, rank: int) -> Set:
+        """The k-subset with the given rank"""
+        return {self.elements[c] for c in self.positions_at(rank)}
+
+    def index_of(self, subset: Iterable) -> int:
+        """Rank of a k-element subset of A (the inverse of subset_at)"""
+        if self._positions is None:
+            self._positions = {x: j for j, x in enumerate(self.elements)}
+        positions = set()
+        for x in subset:
+            j = self._positions.get(x)
+            if j is None:
+                raise ValueError(f"{x!r} is not an element of the set")
+            positions.add(j)
+        if len(positions) != self.k:
+            raise ValueError(f"Expected a subset of {self.k} elements, got {len(positions)}")
+        if self.order == "colex":
+            return self._colex_rank(sorted(positions))
+        last = len(self.elements) - 1
+        return self.size - 1 - self._colex_rank(sorted(last - c for c in positions))
+
+    def _advance(self, positions: List[int]) -> None:
+        """Step positions in place to the next subset of the order"""
+        k, n = self.k, len(self.elements)
+        if self.order == "lex":
+            # Bump the rightmost position that can still move, then pack the rest after it
+            i = k - 1
+            while positions[i] == n - k + i:
+                i -= 1
+            positions[i] += 1
+            for j in range(i + 1, k):
+                positions[j] = positions[j - 1] + 1
+        else:
+            # Bump the leftmost position that can move without a collision, reset those below it
+            i = 0
+            while i < k - 1 and positions[i] + 1 == positions[i + 1]:
+                i += 1
+            positions[i] += 1
+            for j in range(i):
+                positions[j] = j
+
+    def iter_range(self, start: int, stop: Optional[int] = None) -> Iterator[Set]:
+        """Yield the k-subsets with ranks in [start, stop)"""
+        total = self.size
+        stop = total if stop is None else min(stop, total)
+        if start < 0 or start >= stop:
+            return
+        positions = self.positions_at(start)
+        for rank in range(start, stop):
+            yield {self.elements[c] for c in positions}
+            if rank + 1 < stop:
+                self._advance(positions)
+
+    def sample(self, count: int, seed: Seed = None, unique: bool = False) -> List[Set]:
+        """`count` uniformly random k-subsets"""
+        return [self.subset_at(r) for r in sample_indices(self.size, count, seed, unique)]
+
+
+def format_subset(subset: Set) -> str:
+    """Render a subset the way Python prints sets, with {} for the empty set"""
+    return str(subset) if subset else "{}"
+
+
+def stream_power_set(A: Iterable, out: Optional[TextIO] = None, order: str = "gray",
+                     offset: int = 0, limit: Optional[int] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write subsets of A to `out` in chunks as they are produced.
+
+    At most `limit` subsets starting at index `offset` are written; only one
+    chunk of formatted text is held in memory at a time. `out` defaults to
+    the current sys.stdout. Returns the number of subsets written.
+    """
+    out = out or sys.stdout
+    stop = None if limit is None else offset + limit
+    written = 0
+    chunk: List[str] = []
+    for subset in iter_power_set(A, order=order, start=offset, stop=stop):
+        chunk.append(format_subset(subset))
+        written += 1
+        if len(chunk) >= chunk_size:
+            out.write("\n".join(chunk) + "\n")
+            chunk.clear()
+    if chunk:
+        out.write("\n".join(chunk) + "\n")
+    out.flush()
+    return written
+
+
+class CartesianProduct:
+    """Lazy n-ary Cartesian product A1 × A2 × ... × An.
+
+    The size is known without building anything, tuples are produced in
+    lexicographic order of the factors' canonical element order, and any
+    index range can be iterated directly (mixed-radix unranking).
+    """
+
+    def __init__(self, *factors: Iterable):
+        self.factors: List[List] = [canonical_order(f) for f in factors]
+        self._positions: Optional[List[Dict]] = None
+
+    @property
+    def size(self) -> int:
+        """|A1| · |A2| · ... · |An| (may exceed sys.maxsize, unlike len())"""
+        total = 1
+        for factor in self.factors:
+            total *= len(factor)
+        return total
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return self.iter_range(0)
+
+    def __getitem__(self, index: int) -> Tuple:
+        total = self.size
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError("Cartesian product index out of range")
+        return tuple(f[d] for f, d in zip(self.factors, self._digits(index)))
+
+    def index_of(self, item: Tuple) -> int:
+        """Index of a tuple of the product (the inverse of product[index])"""
+        if self._positions is None:
+            self._positions = [{x: j for j, x in enumerate(f)} for f in self.factors]
+        if len(item) != len(self.factors):
+            raise ValueError(f"Expected a tuple of {len(self.factors)} elements")
+        index = 0
+        for positions, x in zip(self._positions, item):
+            j = positions.get(x)
+            if j is None:
+                raise ValueError(f"{x!r} is not an element of its factor")
+            index = index * len(positions) + j
+        return index
+
+    def sample(self, count: int, seed: Seed = None, unique: bool = False) -> List[Tuple]:
+        """`count` uniformly random tuples"""
+        return [self[i] for i in sample_indices(self.size, count, seed, unique)]
+
+    def _digits(self, index: int) -> List[int]:
+        """Mixed-radix digits of index, most significant factor first"""
+        digits = []
+        for factor in reversed(self.factors):
+            index, digit = divmod(index, len(factor))
+            digits.append(digit)
+        digits.reverse()
+        return digits
+
+    def iter_range(self, start: int, stop: Optional[int] = None) -> Iterator[Tuple]:
+        """Yield the tuples with indices in [start, stop)"""
+        total = self.size
+        stop = total if stop is None else min(stop, total)
+        if start < 0 or start >= stop or not self.factors:
+            return
+        digits = self._digits(start)
+        radices = [len(f) for f in self.factors]
+        current = [f[d] for f, d in zip(self.factors, digits)]
+        for _ in range(stop - start):
+            yield tuple(current)
+            # Odometer increment: bump the last digit, carrying leftwards
+            k = len(digits) - 1
+            while k >= 0:
+                digits[k] += 1
+                if digits[k] < radices[k]:
+                    current[k] = self.factors[k][digits[k]]
+                    break
+                digits[k] = 0
+                current[k] = self.factors[k][0]
+                k -= 1
+
+    def page(self, offset: int, limit: int) -> List[Tuple]:
+        """Materialize a single page of at most `limit` tuples"""
+        return list(self.iter_range(offset, offset + limit))
+
+    def stream(self, out: Optional[TextIO] = None, offset: int = 0,
+               limit: Optional[int] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Write tuples to `out` (default: the current sys.stdout), one per
+        line, in bounded chunks. Returns the number of tuples written."""
+        out = out or sys.stdout
+        stop = None if limit is None else offset + limit
+        written = 0
+        chunk: List[str] = []
+        for item in self.iter_range(offset, stop):
+            chunk.append(str(item))
+            written += 1
+            if len(chunk) >= chunk_size:
+                out.write("\n".join(chunk) + "\n")
+                chunk.clear()
+        if chunk:
+            out.write("\n".join(chunk) + "\n")
+        out.flush()
+        return written
+
+    def write_to_file(self, file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Stream the whole product to a text file. Returns tuples written."""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            return self.stream(out=f, chunk_size=chunk_size)
@@ -0,0 +1,380 @@
+"""
+Set Algebra Expressions
+=======================
+Parser, planner and evaluator for nested set algebra such as
+
+    (set1 ∪ set2) ∩ (set3 − set4)        result = (set1 | set2) & (set3 - set4)
+
+Operators accept both the symbols the UI prints and ASCII forms. Precedence
+follows Python's set operators, from tightest to loosest:
+
+    ×  *      Cartesian product
+    −  -  \\   difference
+    ∩  &      intersection
+    ⊕  ^      symmetric difference
+    ∪  |      union
+
+∅ (or {}) is the empty set. Before evaluation the operator tree is optimized:
+associative operators are flattened, known-empty operands short-circuit,
+intersections run from the smallest operand to the largest, differences are
+pushed into the smallest intersection operand, and composite operands of
+intersections/differences are applied as membership filters over the current
+candidates instead of being materialized.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from combinatorics import CartesianProduct
+
+UNION = "union"
+INTERSECTION = "intersection"
+DIFFERENCE = "difference"
+SYMMETRIC = "symmetric"
+CARTESIAN = "cartesian"
+
+SYMBOLS = {UNION: "∪", INTERSECTION: "∩", DIFFERENCE: "−", SYMMETRIC: "⊕", CARTESIAN: "×"}
+_OPERATOR_TOKENS = {
+    "∪": UNION, "|": UNION,
+    "⊕": SYMMETRIC, "^": SYMMETRIC,
+    "∩": INTERSECTION, "&": INTERSECTION,
+    "−": DIFFERENCE, "-": DIFFERENCE, "\\": DIFFERENCE,
+    "×": CARTESIAN, "*": CARTESIAN,
+}
+# Loosest binding first
+_PRECEDENCE = [UNION, SYMMETRIC, INTERSECTION, DIFFERENCE, CARTESIAN]
+
+_TOKEN_RE = re.compile(r"\s*(?:([A-Za-z_]\w*)|(∅|\{\s*\})|([∪|⊕^∩&−\-\\×*()=]))")
+
+
+class ExpressionError(ValueError):
+    """Syntax or name error in a set expression"""
+
+    def __init__(self, message: str, position: Optional[int] = None):
+        if position is not None:
+            message = f"{message} (at position {position + 1})"
+        super().__init__(message)
+        self.position = position
+
+
+class Node:
+    """Operator tree node"""
+    __slots__ = ()
+
+
+class SetRef(Node):
+    """A named set"""
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, SetRef) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class Empty(Node):
+    """The empty set"""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return isinstance(other, Empty)
+
+    def __hash__(self):
+        return 0
+
+
+class Operation(Node):
+    """An operator applied to its operands.
+
+    union / intersection / symmetric / cartesian are n-ary; difference is
+    children[0] − children[1] − ... − children[n-1].
+    """
+    __slots__ = ("op", "children")
+
+    def __init__(self, op: str, children: List[Node]):
+        self.op = op
+        self.children = children
+
+    def __eq__(self, other):
+        return isinstance(other, Operation) and other.op == self.op and other.children == self.children
+
+    def __hash__(self):
+        return hash((self.op, tuple(self.children)))
+
+
+# --- parsing ----------------------------------------------------------------
+
+def _tokenize(text: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ExpressionError(f"Unexpected character {text[pos:].lstrip()[:1]!r}",
+                                  len(text) - len(text[pos:].lstrip()))
+        name, empty, symbol = match.groups()
+        start = match.start(match.lastindex)
+        if name:
+            tokens.append(("name", name, start))
+        elif empty:
+            tokens.append(("empty", empty, start))
+        else:
+            tokens.append(("symbol", symbol, start))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.i = 0
+
+    def peek(self) -> Optional[Tuple[str, str, int]]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def expect_end(self):
+        token = self.peek()
+        if token is not None:
+            raise ExpressionError(f"Unexpected {token[1]!r}", token[2])
+
+    def parse(self, level: int = 0) -> Node:
+        if level == len(_PRECEDENCE):
+            return self.atom()
+        op = _PRECEDENCE[level]
+        children = [self.parse(level + 1)]
+        while True:
+            token = self.peek()
+            if token is None or token[0] != "symbol" or _OPERATOR_TOKENS.get(token[1]) != op:
+                break
+            self.i += 1
+            children.append(self.parse(level + 1))
+        return children[0] if len(children) == 1 else Operation(op, children)
+
+    def atom(self) -> Node:
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Unexpected end of expression")
+        kind, value, position = token
+        self.i += 1
+        if kind == "name":
+            return SetRef(value)
+        if kind == "empty":
+            return Empty()
+        if value == "(":
+            node = self.parse()
+            closing = self.peek()
+            if closing is None or closing[1] != ")":
+                raise ExpressionError("Missing ')'", position)
+            self.i += 1
+            return node
+        raise ExpressionError(f"Unexpected {value!r}", position)
+
+
+def parse(text: str) -> Node:
+    """Parse an expression into an operator tree"""
+    parser = _Parser(text)
+    node = parser.parse()
+    parser.expect_end()
+    return node
+
+
+def parse_statement(text: str) -> Tuple[Optional[str], Node]:
+    """Parse `[name =] expression`; returns (target name or None, tree)"""
+    match = re.match(r"\s*([A-Za-z_]\w*)\s*=(?!=)", text)
+    if match:
+        return match.group(1), parse(text[match.end():])
+    return None, parse(text)
+
+
+def format_node(node: Node) -> str:
+    """Render a tree with the UI's operator symbols"""
+    if isinstance(node, SetRef):
+        return node.name
+    if isinstance(node, Empty):
+        return "∅"
+    parts = [p if isinstance(c, (SetRef, Empty)) else f"({p})"
+             for c, p in ((c, format_node(c)) for c in node.children)]
+    return f" {SYMBOLS[node.op]} ".join(parts)
+
+
+def names_in(node: Node) -> List[str]:
+    """Set names referenced by a tree, in first-use order"""
+    if isinstance(node, SetRef):
+        return [node.name]
+    if isinstance(node, Operation):
+        seen: Dict[str, None] = {}
+        for child in node.children:
+            seen.update(dict.fromkeys(names_in(child)))
+        return list(seen)
+    return []
+
+
+# --- planning ---------------------------------------------------------------
+
+SizeOf = Callable[[str], int]
+
+
+def estimate(node: Node, size_of: SizeOf) -> int:
+    """Upper bound on the cardinality of a tree's result"""
+    if isinstance(node, SetRef):
+        return size_of(node.name)
+    if isinstance(node, Empty):
+        return 0
+    sizes = [estimate(c, size_of) for c in node.children]
+    if node.op == INTERSECTION:
+        return min(sizes)
+    if node.op == DIFFERENCE:
+        return sizes[0]
+    if node.op == CARTESIAN:
+        total = 1
+        for size in sizes:
+            total *= size
+        return total
+    return sum(sizes)
+
+
+def optimize(node: Node, size_of: SizeOf) -> Node:
+    """Rewrite a tree into an equivalent, cheaper one"""
+    if isinstance(node, SetRef):
+        return Empty() if size_of(node.name) == 0 else node
+    if isinstance(node, Empty):
+        return node
+    children = [optimize(c, size_of) for c in node.children]
+    op = node.op
+
+    if op in (UNION, INTERSECTION, SYMMETRIC):
+        flat: List[Node] = []
+        for child in children:
+            if isinstance(child, Operation) and child.op == op:
+                flat.extend(child.children)
+            else:
+                flat.append(child)
+        children = flat
+
+    if op == UNION:
+        children = list(dict.fromkeys(c for c in children if not isinstance(c, Empty)))
+        if not children:
+            return Empty()
+        children.sort(key=lambda c: -estimate(c, size_of))
+    elif op == INTERSECTION:
+        if any(isinstance(c, Empty) for c in children):
+            return Empty()
+        children = list(dict.fromkeys(children))
+        children.sort(key=lambda c: estimate(c, size_of))
+    elif op == SYMMETRIC:
+        # X ⊕ X = ∅, so operands occurring an even number of times cancel out
+        counts: Dict[Node, int] = {}
+        for child in children:
+            if not isinstance(child, Empty):
+                counts[child] = counts.get(child, 0) + 1
+        children = [c for c, n in counts.items() if n % 2]
+        if not children:
+            return Empty()
+    elif op == DIFFERENCE:
+        left, rights = children[0], children[1:]
+        # (A − B) − C  →  A − B − C
+        if isinstance(left, Operation) and left.op == DIFFERENCE:
+            left, rights = left.children[0], left.children[1:] + rights
+        if isinstance(left, Empty) or left in rights:
+            return Empty()
+        rights = list(dict.fromkeys(r for r in rights if not isinstance(r, Empty)))
+        if not rights:
+            return left
+        # (A ∩ B) − C  →  (A − C) ∩ B with A the smallest operand
+        if isinstance(left, Operation) and left.op == INTERSECTION:
+            smallest, others = left.children[0], left.children[1:]
+            return Operation(INTERSECTION, [Operation(DIFFERENCE, [smallest] + rights)] + others)
+        rights.sort(key=lambda c: -estimate(c, size_of))
+        children = [left] + rights
+    elif op == CARTESIAN:
+        if any(isinstance(c, Empty) for c in children):
+            return Empty()
+
+    return children[0] if len(children) == 1 else Operation(op, children)
+
+
+# --- evaluation -------------------------------------------------------------
+
+Lookup = Callable[[str], object]
+
+
+def contains(node: Node, x, lookup: Lookup) -> bool:
+    """Membership test against a tree, without evaluating it"""
+    if isinstance(node, SetRef):
+        return x in lookup(node.name)
+    if isinstance(node, Empty):
+        return False
+    op, children = node.op, node.children
+    if op == UNION:
+        return any(contains(c, x, lookup) for c in children)
+    if op == INTERSECTION:
+        return all(contains(c, x, lookup) for c in children)
+    if op == DIFFERENCE:
+        return contains(children[0], x, lookup) and not any(contains(c, x, lookup) for c in children[1:])
+    if op == SYMMETRIC:
+        return sum(1 for c in children if contains(c, x, lookup)) % 2 == 1
+    return (isinstance(x, tuple) and len(x) == len(children)
+            and all(contains(c, v, lookup) for c, v in zip(children, x)))
+
+
+def evaluate(node: Node, lookup: Lookup, lazy_product: bool = False):
+    """Evaluate an (optimized) tree.
+
+    The result may be one of the input sets itself: copy it before mutating.
+    With lazy_product=True a top-level × returns a CartesianProduct instead
+    of materializing every tuple.
+    """
+    if isinstance(node, SetRef):
+        return lookup(node.name)
+    if isinstance(node, Empty):
+        return set()
+    op, children = node.op, node.children
+
+    if op == INTERSECTION:
+        result = evaluate(children[0], lookup)
+        for child in children[1:]:
+            if not result:
+                return set()
+            if isinstance(child, SetRef):
+                result = result.intersection(lookup(child.name))
+            else:
+                result = {x for x in result if contains(child, x, lookup)}
+        return result
+    if op == DIFFERENCE:
+        result = evaluate(children[0], lookup)
+        for child in children[1:]:
+            if not result:
+                return set()
+            if isinstance(child, SetRef):
+                result = result - lookup(child.name)
+            else:
+                result = {x for x in result if not contains(child, x, lookup)}
+        return result
+    if op == UNION:
+        parts = [evaluate(c, lookup) for c in children]
+        return parts[0].union(*parts[1:])
+    if op == SYMMETRIC:
+        result = evaluate(children[0], lookup)
+        for child in children[1:]:
+            result = result.symmetric_difference(evaluate(child, lookup))
+        return result
+    product = CartesianProduct(*(evaluate(c, lookup) for c in children))
+    return product if lazy_product else set(product)
+
+
+def run(text: str, lookup: Lookup, size_of: SizeOf, exists: Callable[[str], bool]):
+    """Parse, check, optimize and evaluate a statement.
+
+    Returns (target name or None, optimized plan, result).
+    """
+    target, tree = parse_statement(text)
+    for name in names_in(tree):
+        if not exists(name):
+            raise ExpressionError(f"Invalid set name '{name}'")
+    plan = optimize(tree, size_of)
+    return target, plan, evaluate(plan, lookup, lazy_product=True)
@@ -0,0 +1,138 @@
+"""
+Operation History
+=================
+Bounded record of the operations performed in a session.
+
+Entries live in a fixed-capacity ring buffer (the last `history_limit`
+operations). An entry never holds the result itself, only its size and a few
+sample members, taken in O(1) whatever the result's size; it is formatted
+only when the history is displayed. Each entry also records how long the
+operation took and the sizes of its input sets.
+
+Optionally every entry is appended as one JSON line to a log file that is
+rotated once it reaches `max_bytes` (history.log → history.log.1 → … up to
+`backups` old files), so the full history of long sessions survives without
+growing memory or disk without bound.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Iterator, NamedTuple, Optional, Tuple
+
+from render import format_members
+
+# Characters kept of a text result (messages such as "Size: 12")
+TEXT_LIMIT = 100
+
+
+class ResultSummary(NamedTuple):
+    """Size and leading members of a result, or its text for scalar results"""
+    size: Optional[int]
+    sample: Tuple
+    text: Optional[str] = None
+
+    def format(self) -> str:
+        if self.text is not None:
+            return self.text
+        return format_members(self.sample, len(self.sample) if self.size is None else self.size)
+
+
+class HistoryEntry(NamedTuple):
+    timestamp: float
+    operation: str
+    result: ResultSummary
+    seconds: Optional[float]
+    inputs: Tuple[Tuple[str, int], ...]
+
+    def to_record(self) -> dict:
+        """JSON-serializable form written to the history log"""
+        return {"time": self.timestamp, "operation": self.operation,
+                "seconds": self.seconds, "inputs": dict(self.inputs),
+                "size": self.result.size, "sample": list(self.result.sample),
+                "text": self.result.text}
+
+
+def summarize(result: Any, samples: int = 5) -> ResultSummary:
+    """Cheap summary of a result: never renders or copies a large collection"""
+    if result is None or isinstance(result, (str, bool, int, float)):
+        text = "" if result is None else str(result)
+        return ResultSummary(None, (), text[:TEXT_LIMIT])
+    try:
+        size = len(result)
+    except TypeError:
+        return ResultSummary(None, (), f"<{type(result).__name__}>")
+    return ResultSummary(size, tuple(islice(iter(result), samples)))
+
+
+class HistoryLog:
+    """Append-only JSON-lines file with size-based rotation"""
+
+    def __init__(self, path: str, max_bytes: int = 1 << 20, backups: int = 3):
+        self.path = path
+        self.max_bytes = max(1, max_bytes)
+        self.backups = max(0, backups)
+        self._file = None
+
+    def _rotate(self) -> None:
+        self.close()
+        if self.backups == 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def append(self, record: dict) -> None:
+        line = (json.dumps(record, ensure_ascii=False, default=repr) + "\n").encode("utf-8")
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        if self._file.tell() and self._file.tell() + len(line) > self.max_bytes:
+            self._rotate()
+            self._file = open(self.path, "ab")
+        self._file.write(line)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class OperationHistory:
+    """Ring buffer of the last `limit` operations, optionally spilled to a log"""
+
+    def __init__(self, limit: int = 10, samples: int = 5, log: Optional[HistoryLog] = None):
+        self.entries: Deque[HistoryEntry] = deque(maxlen=max(1, limit))
+        self.samples = samples
+        self.log = log
+        self.total = 0
+
+    def record(self, operation: str, result: Any = "", seconds: Optional[float] = None,
+               inputs: Tuple[Tuple[str, int], ...] = ()) -> HistoryEntry:
+        entry = HistoryEntry(time.time(), operation, summarize(result, self.samples),
+                             seconds, tuple(inputs))
+        self.entries.append(entry)
+        self.total += 1
+        if self.log is not None:
+            self.log.append(entry.to_record())
+        return entry
+
+    @property
+    def dropped(self) -> int:
+        """Entries that no longer fit in the ring buffer"""
+        return self.total - len(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        return iter(self.entries)
+
+    def close(self) -> None:
+        if self.log is not None:
+            self.log.close()
@@ -0,0 +1,220 @@
+"""
+HyperLogLog Sketches
+====================
+Mergeable cardinality sketches for estimating |A ∪ B ∪ … ∪ Z| without
+building the union.
+
+A sketch has m = 2^precision one-byte registers. Every member is hashed to
+64 bits (minhash.hash64, so estimates do not depend on the process). The
+first `precision` bits pick a register, which keeps the largest "position of
+the first 1 bit" seen among the remaining bits. The sketch of a union is the
+register-wise maximum of the sketches of its sets. Estimating any union
+therefore needs m bytes, however many sets and members it covers.
+
+Estimates use Ertl's improved estimator ("New cardinality estimation
+algorithms for HyperLogLog sketches", 2017). It needs no bias tables or
+range switches and keeps a relative standard error of about 1.04 / √m over
+the whole range: 1.6% at precision 12, 0.81% at 14 and 0.41% at 16.
+
+Sketches of several sets are stored in one file next to the snapshot:
+
+    header   b"SETHLL01", u8 precision, 3 pad bytes, u32 set count
+    entries  per set: u16 name length, name (UTF-8), u64 cardinality,
+             2^precision register bytes
+"""
+
+import math
+import os
+import struct
+from typing import Dict, Iterable, Mapping, Tuple
+
+from minhash import hash64, hash64_array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+COUNT_OPERATION = "count"
+DEFAULT_PRECISION = 14
+MIN_PRECISION, MAX_PRECISION = 4, 18
+MAGIC = b"SETHLL01"
+_HEADER = struct.Struct("<8sB3xI")
+_NAME_LEN = struct.Struct("<H")
+_CARDINALITY = struct.Struct("<Q")
+# Members ranked per vectorized block
+BLOCK_MEMBERS = 1 << 20
+ALPHA_INF = 1 / (2 * math.log(2))
+
+
+class SketchError(ValueError):
+    """The file is not a valid sketch file"""
+
+
+def relative_error(precision: int) -> float:
+    """Relative standard error of a sketch's estimates"""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """Cardinality sketch with 2^precision registers"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = np.zeros(self.m, dtype=np.uint8) if np is not None else bytearray(self.m)
+        self.registers = registers
+
+    @classmethod
+    def of(cls, values: Iterable, precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        """Sketch of a collection of members"""
+        sketch = cls(precision)
+        sketch.update(values)
+        return sketch
+
+    def copy(self) -> "HyperLogLog":
+        return HyperLogLog(self.precision, self.registers.copy())
+
+    @property
+    def relative_error(self) -> float:
+        return relative_error(self.precision)
+
+    def update(self, values: Iterable) -> None:
+        """Add members to the sketch"""
+        bits = 64 - self.precision
+        low = (1 << bits) - 1
+        registers = self.registers
+        if np is None:
+            for x in values:
+                h = hash64(x)
+                rank = bits - (h & low).bit_length() + 1
+                if rank > registers[h >> bits]:
+                    registers[h >> bits] = rank
+            return
+        if not hasattr(values, "__len__"):
+            values = list(values)
+        hashes = hash64_array(values)
+        for start in range(0, hashes.size, BLOCK_MEMBERS):
+            block = hashes[start:start + BLOCK_MEMBERS]
+            index = (block >> np.uint64(bits)).astype(np.intp)
+            # frexp's exponent is the bit length (0 for 0); exact below 2^53,
+            # and off by one at most once in 2^53 above it
+            _, length = np.frexp((block & np.uint64(low)).astype(np.float64))
+            np.maximum.at(registers, index, (bits + 1 - length).astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch in: this becomes the sketch of the union"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        if np is not None:
+            np.maximum(self.registers, other.registers, out=self.registers)
+        else:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> float:
+        """Estimated number of distinct members added"""
+        m, q = self.m, 64 - self.precision
+        if np is not None:
+            counts = np.bincount(self.registers, minlength=q + 2).tolist()
+        else:
+            counts = [0] * (q + 2)
+            for register in self.registers:
+                counts[register] += 1
+        z = m * _tau(1.0 - counts[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + counts[k])
+        z += m * _sigma(counts[0] / m)
+        return ALPHA_INF * m * m / z
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, precision: int, data: bytes) -> "HyperLogLog":
+        if len(data) != 1 << precision:
+            raise SketchError("Register block does not match the precision")
+        registers = np.frombuffer(data, dtype=np.uint8).copy() if np is not None else bytearray(data)
+        return cls(precision, registers)
+
+
+def union_sketch(sketches: Iterable[HyperLogLog], precision: int = DEFAULT_PRECISION) -> HyperLogLog:
+    """Sketch of the union of the sketched sets (one sketch of memory)"""
+    union = HyperLogLog(precision)
+    for sketch in sketches:
+        union.merge(sketch)
+    return union
+
+
+def write_sketches(path: str, sketches: Mapping[str, Tuple[int, HyperLogLog]],
+                   precision: int = DEFAULT_PRECISION) -> None:
+    """Atomically write name → (cardinality, sketch) to path"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, precision, len(sketches)))
+        for name, (cardinality, sketch) in sketches.items():
+            if sketch.precision != precision:
+                raise ValueError(f"Sketch of '{name}' has precision {sketch.precision}, not {precision}")
+            encoded = name.encode("utf-8")
+            f.write(_NAME_LEN.pack(len(encoded)))
+            f.write(encoded)
+            f.write(_CARDINALITY.pack(cardinality))
+            f.write(sketch.to_bytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_sketches(path: str) -> Dict[str, Tuple[int, HyperLogLog]]:
+    """name → (cardinality when sketched, sketch) from a sketch file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise SketchError(f"{path} is too small to be a sketch file")
+    magic, precision, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise SketchError(f"{path} is not a set sketch file")
+    m = 1 << precision
+    sketches = {}
+    pos = _HEADER.size
+    try:
+        for _ in range(count):
+            (name_len,) = _NAME_LEN.unpack_from(data, pos)
+            pos += _NAME_LEN.size
+            name = data[pos:pos + name_len].decode("utf-8")
+            pos += name_len
+            (cardinality,) = _CARDINALITY.unpack_from(data, pos)
+            pos += _CARDINALITY.size
+            sketches[name] = (cardinality, HyperLogLog.from_bytes(precision, data[pos:pos + m]))
+            pos += m
+    except (struct.error, UnicodeDecodeError) as e:
+        raise SketchError(f"{path} is truncated or corrupt: {e}") from None
+    return sketches
@@ -0,0 +1,154 @@
+"""
+Inverted Set Index
+==================
+Element → names of the sets containing it, for membership and containment
+queries that do not scan the whole store.
+
+    containing([42])     sets that contain 42                 O(matches)
+    supersets(A)         sets B ⊇ A: intersect the posting lists of A's
+                         members, starting from the rarest
+    subsets(A)           sets B ⊆ A: count how many of A's members each set
+                         holds; B qualifies when the count reaches |B|
+    sharing(A, k)        sets with at least k members in common with A
+
+subsets() and sharing() visit the posting lists of A's members only, so they
+cost O(|A| + overlaps): sets that share nothing with A are never touched
+(empty sets are tracked separately, being subsets of everything).
+
+A posting list of a single set is stored as the bare name, which is the
+common case and avoids one set object per element. The index is updated
+with deltas: add() and discard() take only members that were really added
+to or removed from a set.
+"""
+
+from collections import Counter
+from typing import Dict, Hashable, Iterable, Mapping, Set, Union
+
+Posting = Union[str, Set[str]]
+
+
+class SetIndex:
+    """Inverted index from elements to set names, maintained incrementally"""
+
+    def __init__(self):
+        self._postings: Dict[Hashable, Posting] = {}
+        self._sizes: Dict[str, int] = {}
+        self._empty: Set[str] = set()
+
+    @classmethod
+    def build(cls, sets: Mapping[str, Iterable]) -> "SetIndex":
+        index = cls()
+        for name in sets:
+            index.add(name, sets[name])
+        return index
+
+    # --- maintenance --------------------------------------------------------
+    def add(self, name: str, elements: Iterable) -> None:
+        """Record members newly added to a set (creates the set if unknown)"""
+        postings = self._postings
+        added = 0
+        for x in elements:
+            owners = postings.get(x)
+            if owners is None:
+                postings[x] = name
+            elif isinstance(owners, str):
+                if owners == name:
+                    continue
+                postings[x] = {owners, name}
+            elif name not in owners:
+                owners.add(name)
+            else:
+                continue
+            added += 1
+        self._sizes[name] = self._sizes.get(name, 0) + added
+        if self._sizes[name]:
+            self._empty.discard(name)
+        else:
+            self._empty.add(name)
+
+    def discard(self, name: str, elements: Iterable) -> None:
+        """Record members removed from a set"""
+        postings = self._postings
+        removed = 0
+        for x in elements:
+            owners = postings.get(x)
+            if owners == name:
+                del postings[x]
+            elif isinstance(owners, set) and name in owners:
+                owners.discard(name)
+                if len(owners) == 1:
+                    postings[x] = next(iter(owners))
+            else:
+                continue
+            removed += 1
+        self._sizes[name] = self._sizes.get(name, 0) - removed
+        if not self._sizes[name]:
+            self._empty.add(name)
+
+    def replace(self, name: str, old: Iterable, new: Iterable) -> None:
+        """A set's contents were replaced wholesale"""
+        self.discard(name, old)
+        self.add(name, new)
+
+    # --- queries --------------------------------------------------------------
+    def _owners(self, x) -> Posting:
+        return self._postings.get(x, ())
+
+    def containing(self, values: Iterable) -> Set[str]:
+        """Sets containing every one of the given values"""
+        postings = [self._owners(x) for x in values]
+        if not postings:
+            return set(self._sizes)
+        postings.sort(key=_count)  # rarest first: candidates only shrink from there
+        result = _as_set(postings[0])
+        for owners in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(_as_set(owners) if isinstance(owners, str) else owners)
+        return result
+
+    def supersets(self, name: str, elements: Iterable) -> Set[str]:
+        """Other sets containing every member of `elements` (the members of `name`)"""
+        result = self.containing(elements)
+        result.discard(name)
+        return result
+
+    def _overlaps(self, elements: Iterable) -> Counter:
+        counts: Counter = Counter()
+        for x in elements:
+            owners = self._owners(x)
+            if isinstance(owners, str):
+                counts[owners] += 1
+            else:
+                counts.update(owners)
+        return counts
+
+    def subsets(self, name: str, elements: Iterable) -> Set[str]:
+        """Other sets whose every member is in `elements`"""
+        sizes = self._sizes
+        result = {other for other, shared in self._overlaps(elements).items() if shared == sizes[other]}
+        result |= self._empty
+        result.discard(name)
+        return result
+
+    def sharing(self, name: str, elements: Iterable, k: int) -> Dict[str, int]:
+        """Other sets with at least k members in `elements` → number shared"""
+        if k <= 0:
+            shared = dict.fromkeys(self._sizes, 0)
+            shared.update(self._overlaps(elements))
+        else:
+            shared = {other: n for other, n in self._overlaps(elements).items() if n >= k}
+        shared.pop(name, None)
+        return shared
+
+    def __len__(self) -> int:
+        """Number of distinct elements indexed"""
+        return len(self._postings)
+
+
+def _count(owners: Posting) -> int:
+    return 1 if isinstance(owners, str) else len(owners)
+
+
+def _as_set(owners: Posting) -> Set[str]:
+    return {owners} if isinstance(owners, str) else set(owners)
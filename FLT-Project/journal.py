@@ -0,0 +1,159 @@
+"""
+Operation Journal
+=================
+Append-only write-ahead journal for set mutations.
+
+Every change is appended as one compact JSON line, ["op", "set name", [elements]],
+and flushed immediately, so a process crash never loses it; fsync is issued in
+batches. On startup the journal is replayed on top of the last snapshot
+(a.txt). Compaction rotates the journal to <journal>.old, writes a fresh
+snapshot and then deletes the rotated file; if that is interrupted, the
+rotated journal is simply replayed again (replaying records over a newer
+snapshot yields the same state).
+
+A journal starts with a header record, ["base", "snapshot file", []], naming
+the snapshot its records apply to (`base`). replay() refuses a journal
+written against a different snapshot file instead of applying its changes
+to the wrong sets.
+"""
+
+import json
+import os
+from typing import Callable, Iterable
+
+# Record operations
+CREATE = "create"   # replace the set with exactly these elements
+ADD = "add"         # add elements
+REMOVE = "remove"   # remove elements
+BASE = "base"       # header: the snapshot file the records apply to
+
+ApplyCallback = Callable[[str, str, list], None]
+
+
+class JournalError(ValueError):
+    """The journal was written against another snapshot file"""
+
+
+class Journal:
+    """Append-only journal file with batched fsync"""
+
+    def __init__(self, path: str, fsync_batch: int = 32, base: str = ""):
+        self.path = path
+        self.base = base
+        self.rotated_path = path + ".old"
+        self.fsync_batch = max(1, fsync_batch)
+        self._file = None
+        self._pending = 0
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self.base and self._file.tell() == 0:
+                self._file.write(json.dumps([BASE, self.base, []], separators=(",", ":")) + "\n")
+        return self._file
+
+    def replay(self, apply: ApplyCallback, base: str = "") -> int:
+        """Re-apply every journaled record (rotated file first). Returns the count.
+
+        A torn last line (crash in the middle of a write) is ignored. With
+        `base`, a journal whose header names another snapshot file raises
+        JournalError before anything is applied; while a rotation is pending
+        the live journal belongs to the unfinished snapshot and is not checked.
+        """
+        if base:
+            live, rotated = self._header(self.path), self._header(self.rotated_path)
+            if self.rotation_pending:
+                # The live journal continues the unfinished snapshot; the rotated
+                # one also replays safely onto that snapshot once it exists
+                path, written_for = self.rotated_path, rotated
+                matches = rotated in ("", base) or live == base
+            else:
+                path, written_for = self.path, live
+                matches = live in ("", base)
+            if not matches:
+                raise JournalError(f"{os.path.basename(path)} holds changes to {written_for}, not to {base}")
+        count = 0
+        for path in (self.rotated_path, self.path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.endswith("\n"):
+                            break
+                        op, name, elements = json.loads(line)
+                        if op == BASE:
+                            continue
+                        apply(op, name, elements)
+                        count += 1
+            except FileNotFoundError:
+                continue
+        return count
+
+    @staticmethod
+    def _header(path: str) -> str:
+        """The snapshot file named by a journal's header ('' if it has none)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                line = f.readline()
+        except FileNotFoundError:
+            return ""
+        try:
+            op, name, _ = json.loads(line)
+        except (TypeError, ValueError):
+            return ""
+        return name if op == BASE else ""
+
+    def append(self, op: str, name: str, elements: Iterable) -> None:
+        """Append one record; it reaches the OS immediately and disk per batch"""
+        f = self._open()
+        f.write(json.dumps([op, name, list(elements)], separators=(",", ":")) + "\n")
+        f.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_batch:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force pending records to disk"""
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+
+    @property
+    def size(self) -> int:
+        """Current journal size in bytes"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    @property
+    def rotation_pending(self) -> bool:
+        return os.path.exists(self.rotated_path)
+
+    def rotate(self) -> None:
+        """Move the live journal aside so a snapshot can absorb it"""
+        self.close()
+        if os.path.exists(self.path):
+            os.replace(self.path, self.rotated_path)
+
+    def discard_rotated(self) -> None:
+        """Delete the rotated journal once its snapshot is durable"""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+    def reset(self) -> None:
+        """Drop every record (after a full snapshot of the current state)"""
+        self.close()
+        for path in (self.path, self.rotated_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,246 @@
+"""
+Subset Lattice
+==============
+Every containment relation among the stored sets, and its Hasse diagram.
+
+Testing all N² ordered pairs with issubset() costs O(N² · |S|). Instead:
+
+    1. Sets are ordered by cardinality: A ⊆ B needs |A| ≤ |B|, so only one
+       direction of each pair is ever tested (sets of equal size are equal
+       when one contains the other).
+    2. Each set has a signature mask: bit hash(x) mod `mask_bits` is set for
+       every member x. A ⊆ B implies mask(A) ⊆ mask(B), so any pair with
+       mask(A) & ~mask(B) ≠ 0 is dropped without touching the members. With
+       NumPy the masks of all larger sets are tested in one vectorized step.
+       A mask only prunes while it is far from full, so by default it has
+       about twice as many bits as the largest set has members (between
+       MIN_MASK_BITS and MAX_MASK_BITS).
+    3. The remaining pairs get an exact check through a `check` callback,
+       which SetOperations runs on the worker processes for large inputs.
+
+Equal sets form one node of the lattice. The Hasse diagram keeps only the
+covering pairs A ⊂ B, those with no C such that A ⊂ C ⊂ B. It is derived
+from the relation when asked for and exported as an adjacency list or DOT.
+
+When a set changes it is marked stale. refresh() re-tests the stale sets
+against all others (N mask tests, and exact checks for the survivors)
+instead of rebuilding the whole relation.
+"""
+
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from minhash import hash64, hash64_array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+LATTICE_COMMAND = "lattice"
+EXPORT_FORMATS = ("list", "dot")
+MIN_MASK_BITS, MAX_MASK_BITS = 256, 1 << 18
+
+Pair = Tuple[str, str]
+SubsetCheck = Callable[[List[Pair]], List[bool]]
+
+
+def mask_bits_for(largest: int) -> int:
+    """Mask size for sets of up to `largest` members: a power of two ≥ 2 · largest"""
+    bits = MIN_MASK_BITS
+    while bits < 2 * largest and bits < MAX_MASK_BITS:
+        bits *= 2
+    return bits
+
+
+def signature_mask(values, bits: int = MIN_MASK_BITS) -> int:
+    """Bit hash64(x) mod bits set for every member x (bits: a multiple of 64)"""
+    if np is not None:
+        flags = np.zeros(bits, dtype=np.bool_)
+        flags[(hash64_array(values) % np.uint64(bits)).astype(np.intp)] = True
+        return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+    mask = bytearray(bits // 8)
+    for x in values:
+        position = hash64(x) % bits
+        mask[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(mask, "little")
+
+
+def is_subset(a, b) -> bool:
+    """a ⊆ b for any pair of set backends, never converting b"""
+    if len(a) > len(b):
+        return False
+    if type(a) is type(b) and hasattr(a, "issubset"):
+        return a.issubset(b)
+    return all(x in b for x in a)
+
+
+class SubsetLattice:
+    """The subset relation over named sets, maintained per changed set"""
+
+    def __init__(self, mask_bits: int = MIN_MASK_BITS):
+        self.mask_bits = mask_bits
+        self._sizes: Dict[str, int] = {}
+        self._masks: Dict[str, int] = {}
+        # name → the other sets containing it (equal sets included) and the inverse
+        self._up: Dict[str, Set[str]] = {}
+        self._down: Dict[str, Set[str]] = {}
+        # Sets changed since the relation was computed
+        self.stale: Set[str] = set()
+        self.stats: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, sets: Mapping[str, object], check: Optional[SubsetCheck] = None,
+              mask_bits: int = 0) -> "SubsetLattice":
+        """The relation over every set of `sets` (name → members); mask_bits=0
+        sizes the masks from the largest set"""
+        lattice = cls(mask_bits or mask_bits_for(max(map(len, sets.values()), default=0)))
+        check = check or (lambda pairs: [is_subset(sets[a], sets[b]) for a, b in pairs])
+        for name in sets:
+            lattice._describe(name, sets[name])
+        order = sorted(lattice._sizes, key=lambda name: (lattice._sizes[name], name))
+        n = len(order)
+        masks = lattice._masks
+        matrix = lattice._mask_matrix(order) if np is not None and n >= 64 else None
+        pairs = []
+        for i, name in enumerate(order[:-1]):
+            # Only larger (or equal-sized, later) sets can contain it
+            if matrix is not None:
+                clash = (matrix[i] & ~matrix[i + 1:]).any(axis=1)
+                above = (np.flatnonzero(~clash) + i + 1).tolist()
+            else:
+                mask = masks[name]
+                above = [j for j in range(i + 1, n) if not mask & ~masks[order[j]]]
+            pairs.extend((name, order[j]) for j in above)
+        lattice._record(pairs, check(pairs))
+        lattice.stats = {"sets": n, "ordered_pairs": n * (n - 1), "skipped_by_size": n * (n - 1) // 2,
+                         "skipped_by_mask": n * (n - 1) // 2 - len(pairs), "exact_checks": len(pairs),
+                         "relations": sum(map(len, lattice._up.values()))}
+        return lattice
+
+    # --- maintenance --------------------------------------------------------
+    def _describe(self, name: str, values) -> None:
+        self._sizes[name] = len(values)
+        self._masks[name] = signature_mask(values, self.mask_bits)
+        self._up.setdefault(name, set())
+        self._down.setdefault(name, set())
+
+    def _mask_matrix(self, names: List[str]):
+        """Masks as rows of uint64 words"""
+        size = self.mask_bits // 8
+        return np.frombuffer(b"".join(self._masks[name].to_bytes(size, "little") for name in names),
+                             dtype="<u8").reshape(len(names), size // 8)
+
+    def _record(self, pairs: List[Pair], results: List[bool]) -> None:
+        for (a, b), contained in zip(pairs, results):
+            if contained:
+                self._up[a].add(b)
+                self._down[b].add(a)
+                if self._sizes[a] == self._sizes[b]:
+                    self._up[b].add(a)
+                    self._down[a].add(b)
+
+    def remove(self, name: str) -> None:
+        """Forget a set and its relations"""
+        for other in self._up.pop(name, ()):
+            self._down[other].discard(name)
+        for other in self._down.pop(name, ()):
+            self._up[other].discard(name)
+        self._sizes.pop(name, None)
+        self._masks.pop(name, None)
+
+    def refresh(self, sets: Mapping[str, object], check: Optional[SubsetCheck] = None) -> None:
+        """Re-test the stale sets (and add new ones) against every other set"""
+        check = check or (lambda pairs: [is_subset(sets[a], sets[b]) for a, b in pairs])
+        stale, self.stale = self.stale, set()
+        pairs: List[Pair] = []
+        for name in stale:
+            self.remove(name)
+            if name in sets:
+                self._describe(name, sets[name])
+        masks, sizes = self._masks, self._sizes
+        for name in stale:
+            if name not in sets:
+                continue
+            for other in sizes:
+                if other == name or (other in stale and other < name):
+                    continue  # each stale pair once
+                small, large = (name, other) if (sizes[name], name) <= (sizes[other], other) else (other, name)
+                if not masks[small] & ~masks[large]:
+                    pairs.append((small, large))
+        self._record(pairs, check(pairs))
+        self.stats = {"sets": len(sizes), "updated": len(stale), "exact_checks": len(pairs),
+                      "relations": sum(map(len, self._up.values()))}
+
+    # --- queries --------------------------------------------------------------
+    def supersets(self, name: str) -> Set[str]:
+        """Other sets containing `name` (equal sets included)"""
+        return set(self._up[name])
+
+    def relation(self) -> List[Pair]:
+        """Every (A, B) with A ⊆ B, A ≠ B by name"""
+        return sorted((a, b) for a, ups in self._up.items() for b in ups)
+
+    def classes(self) -> Dict[str, List[str]]:
+        """Representative → names of the equal sets it stands for (itself first)"""
+        classes: Dict[str, List[str]] = {}
+        seen: Set[str] = set()
+        for name in sorted(self._sizes, key=lambda n: (self._sizes[n], n)):
+            if name not in seen:
+                equal = sorted(self._up[name] & self._down[name])
+                classes[name] = [name] + equal
+                seen.update(classes[name])
+        return classes
+
+    def hasse(self) -> Dict[str, List[str]]:
+        """Transitive reduction over the classes: representative → the
+        representatives directly above it (smallest first)"""
+        classes = self.classes()
+        representative = {name: rep for rep, names in classes.items() for name in names}
+        above = {rep: {representative[b] for b in self._up[rep]} - {rep} for rep in classes}
+        order = lambda rep: (self._sizes[rep], rep)
+        covers = {}
+        for rep, ups in above.items():
+            indirect = set().union(*(above[b] for b in ups)) if ups else set()
+            covers[rep] = sorted(ups - indirect, key=order)
+        return covers
+
+    def edges(self) -> List[Pair]:
+        """Hasse diagram edges (subset, covering superset) by representative"""
+        return [(a, b) for a, ups in self.hasse().items() for b in ups]
+
+    # --- export ---------------------------------------------------------------
+    def _label(self, names: List[str]) -> str:
+        return " = ".join(names)
+
+    def to_adjacency_list(self) -> str:
+        """One line per class: `set1 = set4 (|3|): set2 set3` lists the sets
+        directly above it"""
+        classes, covers = self.classes(), self.hasse()
+        lines = [f"# subset lattice: {len(self._sizes)} sets, {len(classes)} distinct, "
+                 f"{sum(map(len, covers.values()))} Hasse edges"]
+        for rep, names in classes.items():
+            lines.append(f"{self._label(names)} (|{self._sizes[rep]}|): {' '.join(covers[rep])}".rstrip())
+        return "\n".join(lines) + "\n"
+
+    def to_dot(self) -> str:
+        """Graphviz DOT of the Hasse diagram, subsets at the bottom"""
+        classes, covers = self.classes(), self.hasse()
+        lines = ["digraph lattice {", "  rankdir=BT;", "  node [shape=box];"]
+        for rep, names in classes.items():
+            lines.append(f"  {_quote(rep)} [label={_quote(self._label(names) + f' |{self._sizes[rep]}|')}];")
+        for rep, ups in covers.items():
+            lines.extend(f"  {_quote(rep)} -> {_quote(up)};" for up in ups)
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, fmt: str) -> str:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown lattice format '{fmt}' (use one of: {', '.join(EXPORT_FORMATS)})")
+        return self.to_dot() if fmt == "dot" else self.to_adjacency_list()
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
@@ -13,86 +13,719 @@ Contact: https://www.linkedin.com/in/oguzhanberkeozdil/
 """
 
 import os
+import sys
 import json
 import time
+import asyncio
+import argparse
+import threading
+from contextlib import contextmanager, redirect_stdout
 from datetime import datetime
-from typing import Dict, Set, List, Any
+from functools import lru_cache
+from typing import Dict, Set, List, Any, Optional, Tuple
+
+from arrayengine import ArrayEngine
+from batch import OUTPUT_MODES, BatchRunner
+from bitmap import CompactIntSet, prefers_compact
+from bulkimport import BulkImportError, detect_format, json_member, read_members
+from combinatorics import (K_SUBSET_ORDERS, SAMPLE_OPERATION, CartesianProduct, KSubsets, PowerSet,
+                           canonical_order, format_subset, iter_power_set, power_set_size, stream_power_set)
+from export import EXPORT_FORMATS as SET_EXPORT_FORMATS, ExportError, export_sets
+from expression import ExpressionError, format_node, names_in, run as run_expression
+from history import HistoryLog, OperationHistory
+from hyperloglog import (COUNT_OPERATION, HyperLogLog, SketchError, read_sketches, relative_error,
+                         union_sketch, write_sketches)
+from index import SetIndex
+from lattice import EXPORT_FORMATS, LATTICE_COMMAND, SubsetLattice, is_subset
+from journal import ADD, CREATE, REMOVE, Journal
+from metrics import Metrics
+from minhash import SIMILARITY_OPERATIONS, MinHasher
+from parallel import NWAY_OPERATIONS, ShardedExecutor, combine, expand_set_names, sorted_int64_block
+from render import page_members, preview
+from resultcache import ResultCache
+from server import SetServer
+from setfile import iter_set_file_path, write_set_file
+from snapshot import KIND_INT64, LazySets, SnapshotEntry, SnapshotReader, write_snapshot
+from store import VersionedSets
+from views import ViewRegistry
 
 # Get the directory where the script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+DEFAULT_SETTINGS = {
+    "power_set_page_size": 64,
+    "product_page_size": 64,
+    "stream_chunk_size": 256,
+    "compact_min_size": 1024,
+    "compact_min_chunk_fill": 32,
+    "array_engine_min_size": 100000,
+    "load_progress_min_bytes": 16777216,
+    "journal_file": "a.journal",
+    "journal_fsync_batch": 32,
+    "journal_compact_bytes": 4194304,
+    "snapshot_format": "binary",
+    "snapshot_file": "a.snap",
+    "result_cache_bytes": 67108864,
+    "parallel_workers": 0,
+    "parallel_shards": 0,
+    "parallel_min_size": 1000000,
+    "server_host": "127.0.0.1",
+    "server_port": 8765,
+    "server_pipeline_depth": 32,
+    "server_write_chunk": 65536,
+    "server_result_limit": 100000,
+    "server_max_request_bytes": 1048576,
+    "history_limit": 10,
+    "history_samples": 5,
+    "history_file": "",
+    "history_file_bytes": 1048576,
+    "history_file_backups": 3,
+    "display_limit": 20,
+    "display_sorted": False,
+    "display_page_size": 200,
+    "metrics_trace_memory": False,
+    "metrics_file": "metrics.json",
+    "profile_dir": "profiles",
+    "profile_top": 15,
+    "minhash_permutations": 128,
+    "minhash_seed": 1,
+    "lsh_threshold": 0.8,
+    "lsh_bands": 0,
+    "hll_precision": 14,
+    "hll_exact_max": 100000,
+    "sketch_file": "a.hll",
+    "import_chunk_bytes": 1048576,
+    "views_file": "a.views",
+    "lattice_mask_bits": 256,
+    "export_dir": "export",
+    "export_format": "lines",
+    "export_compress": False,
+    "export_compress_level": 1,
+    "export_chunk_size": 65536,
+    "export_workers": 4
+}
+
+def load_settings() -> Dict[str, Any]:
+    """Load the 'settings' section of config.json, falling back to defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(os.path.join(SCRIPT_DIR, 'config.json'), 'r', encoding='utf-8') as f:
+            settings.update(json.load(f).get("settings", {}))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+SETTINGS = load_settings()
+
+def display(values) -> str:
+    """Bounded preview of a set for terminal output (display_limit, display_sorted)"""
+    return preview(values, SETTINGS["display_limit"], SETTINGS["display_sorted"])
+
+# Pure-Python implementations of the two-set operations dispatched by two()
+SET_OPERATIONS = {
+    "union": lambda a, b: a.union(b),
+    "intersection": lambda a, b: a.intersection(b),
+    "difference": lambda a, b: a - b,
+    "symmetric": lambda a, b: a.symmetric_difference(b),
+    "subset": lambda a, b: a.issubset(b),
+    "equal": lambda a, b: a == b
+}
+
+def make_set(elements, settings: Optional[Dict[str, Any]] = None) -> Set:
+    """Pick the storage backend for a set: compact bitmap for dense ints, else set"""
+    settings = SETTINGS if settings is None else settings
+    if prefers_compact(elements, settings["compact_min_size"], settings["compact_min_chunk_fill"]):
+        return CompactIntSet(elements)
+    return elements if isinstance(elements, set) else set(elements)
+
 class SetOperations:
     """Main class for handling set operations and management"""
     
     def __init__(self):
         self.sets: Dict[str, Set] = {}
-        self.operation_history: List[Dict] = []
+        self.metrics = Metrics(SETTINGS["metrics_trace_memory"],
+                               os.path.join(SCRIPT_DIR, SETTINGS["profile_dir"]), SETTINGS["profile_top"])
+        history_file = SETTINGS["history_file"]
+        self.history = OperationHistory(
+            SETTINGS["history_limit"], SETTINGS["history_samples"],
+            HistoryLog(os.path.join(SCRIPT_DIR, history_file), SETTINGS["history_file_bytes"],
+                       SETTINGS["history_file_backups"]) if history_file else None)
+        self.array_engine = ArrayEngine()
+        self.result_cache = ResultCache(SETTINGS["result_cache_bytes"])
+        self.sharded = ShardedExecutor(SETTINGS["parallel_workers"], SETTINGS["parallel_shards"])
+        self._blocks: Dict[str, Any] = {}
+        self._index: Optional[SetIndex] = None
+        self._lattice: Optional[SubsetLattice] = None
+        self.minhash = MinHasher(SETTINGS["minhash_permutations"], SETTINGS["minhash_seed"])
+        self._signatures: Dict[str, Any] = {}
+        self._sketches: Dict[str, HyperLogLog] = {}
+        self._sketches_dirty = True
+        self.views = self._load_views()
+        self.journal = Journal(os.path.join(SCRIPT_DIR, SETTINGS["journal_file"]),
+                               fsync_batch=SETTINGS["journal_fsync_batch"])
+        self._compaction = None
         self.load_sets_from_file()
     
     def load_sets_from_file(self):
-        """Load sets from a.txt file"""
+        """Load sets from the snapshot (or a.txt), then replay the change journal on top"""
+        with self.metrics.track("load"):
+            try:
+                file_path = os.path.join(SCRIPT_DIR, 'a.txt')
+                snapshot_path = os.path.join(SCRIPT_DIR, SETTINGS["snapshot_file"])
+                base_path = self._base_path(snapshot_path, file_path)
+                if base_path == snapshot_path:
+                    # Only the index is read here; each set loads on first access
+                    self.sets = LazySets(SnapshotReader(snapshot_path), self.make_set)
+                    print(f"✓ Opened snapshot with {len(self.sets)} sets (loaded on first use)")
+                else:
+                    # Parsed incrementally; the file is never executed as code
+                    for name, value in iter_set_file_path(file_path, progress=self._report_load_progress):
+                        if not name.startswith('_'):
+                            self.sets[name] = self.make_set(value)
+                    print(f"✓ Loaded {len(self.sets)} sets from configuration file")
+                interrupted = self.journal.rotation_pending
+                # Changes are only ever replayed onto the file they were made against
+                self.journal.base = os.path.basename(base_path)
+                replayed = self.journal.replay(self._apply_change, self.journal.base)
+                if replayed:
+                    print(f"✓ Replayed {replayed} journaled changes")
+                # From here on sets are copy-on-write: readers never see a set change
+                self.sets = VersionedSets(self.sets)
+                self._load_sketches(base_path)
+                if interrupted:
+                    # A previous compaction did not finish: fold everything now
+                    self.save_sets_to_file()
+            except FileNotFoundError:
+                print("⚠ Configuration file not found. Creating default sets...")
+                self.create_default_sets()
+            except Exception as e:
+                # Never fall back to the default sets here: saving them would
+                # overwrite a.txt and reset the journal, losing the user's data
+                print(f"❌ ERROR: Could not load the sets: {e}")
+                print("⚠ Nothing was changed on disk. Fix or move the file and start again.")
+                raise SystemExit(1)
+            self.metrics.note(output=sum(self.cardinality(name) for name in self.sets))
+    
+    def _load_sketches(self, source_path: str):
+        """Adopt the saved cardinality sketches of the sets just loaded from
+        source_path and the journal. save_sketches() runs after the journal is
+        closed, so a sketch file older than either is out of date."""
+        if not SETTINGS["sketch_file"]:
+            return
+        path = os.path.join(SCRIPT_DIR, SETTINGS["sketch_file"])
         try:
-            file_path = os.path.join(SCRIPT_DIR, 'a.txt')
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                # Execute the file content to load sets
-                local_vars = {}
-                exec(content, {}, local_vars)
-                # Get all sets from local variables
-                for name, value in local_vars.items():
-                    if isinstance(value, set) and not name.startswith('_'):
-                        self.sets[name] = value
-                print(f"✓ Loaded {len(self.sets)} sets from configuration file")
-        except FileNotFoundError:
-            print("⚠ Configuration file not found. Creating default sets...")
-            self.create_default_sets()
-        except Exception as e:
-            print(f"⚠ Error loading configuration: {e}")
-            self.create_default_sets()
+            written = os.path.getmtime(path)
+            sources = (source_path, self.journal.path, self.journal.rotated_path)
+            if any(os.path.exists(p) and os.path.getmtime(p) > written for p in sources):
+                return
+            saved = read_sketches(path)
+        except (OSError, SketchError):
+            return
+        for name, (cardinality, sketch) in saved.items():
+            if (name in self.sets and sketch.precision == SETTINGS["hll_precision"]
+                    and self.cardinality(name) == cardinality):
+                self._sketches[name] = sketch
+        self._sketches_dirty = len(self._sketches) < len(self.sets)
+        if self._sketches:
+            print(f"✓ Loaded {len(self._sketches)} cardinality sketches")
+    
+    @staticmethod
+    def _load_views() -> ViewRegistry:
+        """View definitions from views_file; each view is built on first read"""
+        path = os.path.join(SCRIPT_DIR, SETTINGS["views_file"]) if SETTINGS["views_file"] else None
+        try:
+            return ViewRegistry(path)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not load materialized views: {e}")
+            return ViewRegistry()
+    
+    @staticmethod
+    def _base_path(snapshot_path: str, file_path: str) -> str:
+        """The file to load: with binary snapshots, the snapshot whenever it
+        exists. a.txt is never rewritten then, so an a.txt changed after the
+        snapshot was written is refused rather than guessed about."""
+        if SETTINGS["snapshot_format"] != "binary" or not os.path.exists(snapshot_path):
+            return file_path
+        if os.path.exists(file_path) and os.path.getmtime(file_path) > os.path.getmtime(snapshot_path):
+            snapshot, journal = os.path.basename(snapshot_path), SETTINGS["journal_file"]
+            raise ValueError(f"a.txt was changed after {snapshot} was written, and with binary snapshots "
+                             f"a.txt is not kept up to date. Move a.txt away to keep the sets in {snapshot}, "
+                             f"or delete {snapshot} and {journal} (losing the changes since) to load a.txt")
+        return snapshot_path
+    
+    @staticmethod
+    def _snapshot_path() -> str:
+        """The file a snapshot is written to: snapshot_file, or a.txt in text mode"""
+        if SETTINGS["snapshot_format"] == "binary":
+            return os.path.join(SCRIPT_DIR, SETTINGS["snapshot_file"])
+        return os.path.join(SCRIPT_DIR, 'a.txt')
+    
+    @staticmethod
+    def _report_load_progress(done: int, total: int):
+        """Show a progress line while loading large set files"""
+        if total >= SETTINGS["load_progress_min_bytes"]:
+            end = "\n" if done >= total else ""
+            print(f"\r⏳ Loading sets... {done * 100 // total}%", end=end, flush=True)
     
     def create_default_sets(self):
         """Create default sets if file doesn't exist"""
-        self.sets = {
+        self.sets = VersionedSets({
             'set1': {1, 2, 3},
             'set2': {1, 2, 41},
             'set3': {1, 2, 42525}
-        }
+        })
         self.save_sets_to_file()
     
-    def save_sets_to_file(self):
-        """Save current sets to a.txt file"""
+    def make_set(self, elements) -> Set:
+        """Pick the storage backend for a set: compact bitmap for dense ints, else set"""
+        return make_set(elements)
+    
+    def mark_changed(self, name: str):
+        """Record that a set was created or replaced by a new version"""
+        self.array_engine.invalidate(name)
+        self.result_cache.bump(name)
+        self._blocks.pop(name, None)
+        self._signatures.pop(name, None)
+        self._sketches.pop(name, None)
+        self._sketches_dirty = True
+        if self._lattice is not None:
+            self._lattice.stale.add(name)
+    
+    def record_change(self, op: str, name: str, elements):
+        """Journal a mutation that has already been committed to self.sets
+        (call it while holding self.sets.write_lock, so journal order is commit order)"""
+        self.mark_changed(name)
         try:
-            file_path = os.path.join(SCRIPT_DIR, 'a.txt')
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write("#Define your sets like this --> set1 = {1, 2, 3}, set2 = {99, 22, 12125}, ...\n\n")
-                for name, set_data in self.sets.items():
-                    file.write(f"{name} = {set_data}\n")
-            print("✓ Current sets saved to file")
-        except Exception as e:
-            print(f"❌ Error saving sets: {e}")
-    
-    def log_operation(self, operation: str, result: str = ""):
-        """Log operations for history"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.operation_history.append({
-            'timestamp': timestamp,
-            'operation': operation,
-            'result': str(result)[:100]  # Limit result length
-        })
+            self.journal.append(op, name, elements)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠ Could not journal change to '{name}': {e}")
+            return
+        if self.journal.size >= SETTINGS["journal_compact_bytes"]:
+            self.compact_in_background()
+    
+    def add_elements(self, name: str, values) -> Set:
+        """Add members to a set (copy-on-write) and journal it; returns the new set"""
+        values = list(values)
+        with self.sets.write_lock:
+            added = None
+            if self._index is not None or self.views.watching(name):
+                old = self.sets[name]
+                added = [v for v in dict.fromkeys(values) if v not in old]
+            if self._index is not None:
+                self._index.add(name, added)
+            signature = self._signatures.get(name)
+            sketch = self._sketches.get(name)
+            updated = self.sets.modify(name, lambda s: s.update(values))
+            self.record_change(ADD, name, values)
+            if signature is not None:
+                self._signatures[name] = self.minhash.merge(signature, values)
+            if sketch is not None:
+                sketch.update(values)
+                self._sketches[name] = sketch
+            if added:
+                self.views.changed(name, added, (), self.sets.__getitem__)
+        return updated
+    
+    def remove_elements(self, name: str, values) -> Set:
+        """Remove members from a set (copy-on-write) and journal it; returns the new set"""
+        values = list(values)
+        with self.sets.write_lock:
+            removed = None
+            if self._index is not None or self.views.watching(name):
+                old = self.sets[name]
+                removed = [v for v in dict.fromkeys(values) if v in old]
+            if self._index is not None:
+                self._index.discard(name, removed)
+            updated = self.sets.modify(name, lambda s: s.difference_update(values))
+            self.record_change(REMOVE, name, values)
+            if removed:
+                self.views.changed(name, (), removed, self.sets.__getitem__)
+        return updated
+    
+    def replace_set(self, name: str, elements) -> Set:
+        """Create a set, or replace its contents, and journal it; returns the stored set"""
+        stored = self.make_set(elements)
+        with self.sets.write_lock:
+            old = self.sets[name] if name in self.sets else ()
+            if self._index is not None:
+                self._index.replace(name, old, stored)
+            self.sets[name] = stored
+            self.record_change(CREATE, name, stored)
+            if self.views.watching(name):
+                self.views.changed(name, [v for v in stored if v not in old],
+                                   [v for v in old if v not in stored], self.sets.__getitem__)
+        return stored
+    
+    def bulk_apply(self, op: str, name: str, chunks) -> tuple:
+        """Add (ADD) or remove (REMOVE) chunks of members, e.g. read_members()
+        of a large file, creating the set if needed. Returns (set, members read).
+        The set is copied and published once; each chunk is applied with one
+        update/difference_update call and journaled as it goes, so if reading
+        fails part way the chunks applied so far are kept."""
+        read = 0
+        with self.sets.write_lock:
+            exists = name in self.sets
+            updated = self.sets[name].copy() if exists else set()
+            signature, sketch = self._signatures.get(name), self._sketches.get(name)
+            if not exists:
+                self.journal.append(CREATE, name, [])
+                if self._index is not None:
+                    self._index.add(name, [])
+            watched = self._index is not None or self.views.watching(name)
+            lookup = lambda n: updated if n == name else self.sets[n]
+            try:
+                for chunk in chunks:
+                    if op == ADD:
+                        added = [v for v in dict.fromkeys(chunk) if v not in updated] if watched else ()
+                        if self._index is not None:
+                            self._index.add(name, added)
+                        updated.update(chunk)
+                        self.views.changed(name, added, (), lookup)
+                        if signature is not None:
+                            signature = self.minhash.merge(signature, chunk)
+                        if sketch is not None:
+                            sketch.update(chunk)
+                    else:
+                        removed = [v for v in dict.fromkeys(chunk) if v in updated] if watched else ()
+                        if self._index is not None:
+                            self._index.discard(name, removed)
+                        updated.difference_update(chunk)
+                        self.views.changed(name, (), removed, lookup)
+                    self.journal.append(op, name, chunk)
+                    read += len(chunk)
+            finally:
+                stored = updated if exists else self.make_set(updated)
+                self.sets[name] = stored
+                self.mark_changed(name)
+                if op == ADD and signature is not None:
+                    self._signatures[name] = signature
+                if op == ADD and sketch is not None:
+                    self._sketches[name] = sketch
+                if self.journal.size >= SETTINGS["journal_compact_bytes"]:
+                    self.compact_in_background()
+        return stored, read
+    
+    def import_file(self, op: str, name: str, path: str, column=0, progress=None) -> tuple:
+        """bulk_apply() of the members of a file (see bulkimport.read_members)"""
+        return self.bulk_apply(op, name, read_members(path, None, column, SETTINGS["import_chunk_bytes"], progress))
+    
+    def export_sets(self, names: List[str], directory: str, fmt: str, compress: bool,
+                    progress=None) -> List[Dict]:
+        """Write sets (all when names is empty; ranges and patterns allowed) in
+        chunks to `directory`, one data file and manifest each, on the export
+        worker threads. Reads one committed version, so concurrent writes are
+        not seen half-way."""
+        view = self.sets.snapshot()
+        names = expand_set_names(names, view) if names else list(view)
+        sets = {name: view[name] for name in names}
+        return export_sets(sets, directory, fmt, compress, SETTINGS["export_chunk_size"],
+                           SETTINGS["export_workers"], SETTINGS["export_compress_level"], progress)
+    
+    def define_view(self, statement: str):
+        """Create (or redefine) a materialized view from `name = expression`"""
+        with self.sets.write_lock:
+            return self.views.define(statement, self.sets.__getitem__, self.sets.__contains__)
+    
+    def view(self, name: str) -> set:
+        """A view's current result: O(1) once built. Never mutate it."""
+        with self.sets.write_lock:
+            return self.views.read(name, self.sets.__getitem__, self.sets.__contains__)
+    
+    def drop_view(self, name: str):
+        with self.sets.write_lock:
+            self.views.drop(name)
+    
+    def check_views(self) -> Dict[str, List[str]]:
+        """Problems of the built views that disagree with a full recompute"""
+        with self.sets.write_lock:
+            return self.views.check(self.sets.__getitem__)
+    
+    @property
+    def index(self) -> SetIndex:
+        """Inverted element → sets index, built on first use (this loads every
+        set) and then kept current by add_elements/remove_elements/replace_set"""
+        with self.sets.write_lock:
+            if self._index is None:
+                self._index = SetIndex.build(self.sets.snapshot())
+            return self._index
+    
+    def containing(self, values) -> Set[str]:
+        """Names of the sets containing every one of the values"""
+        with self.sets.write_lock:
+            return self.index.containing(values)
+    
+    def supersets(self, name: str) -> Set[str]:
+        """Names of the other sets that contain every member of `name`"""
+        with self.sets.write_lock:
+            return self.index.supersets(name, self.sets[name])
+    
+    def subsets(self, name: str) -> Set[str]:
+        """Names of the other sets whose members all belong to `name`"""
+        with self.sets.write_lock:
+            return self.index.subsets(name, self.sets[name])
+    
+    def sharing(self, name: str, k: int) -> Dict[str, int]:
+        """Other sets with at least k members in common with `name` → shared count"""
+        with self.sets.write_lock:
+            return self.index.sharing(name, self.sets[name], k)
+    
+    def lattice(self) -> SubsetLattice:
+        """Subset lattice of all sets, computed on first use (this loads every
+        set); afterwards only the sets changed since the last call are re-tested"""
+        with self.sets.write_lock:
+            view = self.sets.snapshot()
+            if self._lattice is None:
+                self._lattice = SubsetLattice.build(view, self._subset_checks, SETTINGS["lattice_mask_bits"])
+            elif self._lattice.stale:
+                self._lattice.refresh(view, self._subset_checks)
+            return self._lattice
+    
+    def _subset_checks(self, pairs: List[tuple]) -> List[bool]:
+        """Exact A ⊆ B for each (A, B): on the worker processes when the
+        subsets hold at least parallel_min_size members and all are int64"""
+        view = self.sets.snapshot()
+        if (self.sharded.available and len(pairs) > 1
+                and sum(self.cardinality(a) for a, _ in pairs) >= SETTINGS["parallel_min_size"]):
+            names = list(dict.fromkeys(name for pair in pairs for name in pair))
+            blocks = [self.sorted_block(name, view) for name in names]
+            if all(block is not None for block in blocks):
+                position = {name: i for i, name in enumerate(names)}
+                return self.sharded.check_subsets(blocks, [(position[a], position[b]) for a, b in pairs])
+        return [is_subset(view[a], view[b]) for a, b in pairs]
+    
+    def signatures(self, names: List[str]) -> Dict[str, Any]:
+        """MinHash signatures of the named sets, computing the missing ones
+        (kept until the set changes; additions are merged in)"""
+        with self.sets.write_lock:
+            view = self.sets.snapshot()
+            for name in names:
+                if name not in self._signatures:
+                    self._signatures[name] = self.minhash.signature(view[name])
+            return {name: self._signatures[name] for name in names}
+    
+    def jaccard_estimates(self, names: List[str]) -> Dict[tuple, float]:
+        """Estimated Jaccard similarity of every pair of the named sets"""
+        return self.minhash.all_pairs(self.signatures(names))
+    
+    def near_duplicates(self, names: List[str], threshold: Optional[float] = None) -> Dict[tuple, float]:
+        """Pairs of the named sets whose estimated Jaccard similarity is ≥ threshold
+        (LSH; lsh_threshold by default)"""
+        if threshold is None:
+            threshold = SETTINGS["lsh_threshold"]
+        return self.minhash.near_duplicates(self.signatures(names), threshold, SETTINGS["lsh_bands"])
+    
+    def exact_jaccard(self, x: str, y: str) -> float:
+        """|x ∩ y| / |x ∪ y| through the (cached) intersection operation"""
+        shared = len(self.compute("intersection", x, y))
+        union = self.cardinality(x) + self.cardinality(y) - shared
+        return shared / union if union else 1.0
+    
+    def sketch(self, name: str) -> HyperLogLog:
+        """HyperLogLog sketch of a set, built on first use unless it was saved"""
+        with self.sets.write_lock:
+            sketch = self._sketches.get(name)
+            if sketch is None:
+                sketch = self._sketches[name] = HyperLogLog.of(self.sets[name], SETTINGS["hll_precision"])
+            return sketch
+    
+    def union_cardinality(self, names: List[str]):
+        """|name1 ∪ name2 ∪ …| as (value, exact): computed exactly when the
+        inputs hold at most hll_exact_max members, else estimated by merging
+        the sets' sketches in constant memory"""
+        if len(names) == 1:
+            return self.cardinality(names[0]), True
+        if sum(self.cardinality(name) for name in names) <= SETTINGS["hll_exact_max"]:
+            return len(self.compute_nway("union", names)), True
+        union = union_sketch((self.sketch(name) for name in names), SETTINGS["hll_precision"])
+        return union.estimate(), False
+    
+    def _apply_change(self, op: str, name: str, elements: list):
+        """Re-apply one journal record during startup (in place, before
+        the sets are wrapped in the copy-on-write store)"""
+        # JSON turns tuple members (stored products, also nested) into lists
+        elements = [json_member(e) if isinstance(e, list) else e for e in elements]
+        if op == CREATE:
+            self.sets[name] = self.make_set(set(elements))
+        elif op == ADD:
+            self.sets.setdefault(name, set()).update(elements)
+        elif op == REMOVE and name in self.sets:
+            self.sets[name].difference_update(elements)
+        self.mark_changed(name)
+    
+    def cardinality(self, name: str) -> int:
+        """|name|, read from the snapshot index when the set is not loaded"""
+        return self.sets.cardinality(name)
+    
+    def _snapshot_items(self) -> Dict[str, Any]:
+        """The current version's sets, frozen for a snapshot writer (published sets
+        are never modified). Sets never loaded from a binary snapshot are passed
+        through as index entries."""
+        if SETTINGS["snapshot_format"] == "binary":
+            return self.sets.snapshot_items()
+        return dict(self.sets.snapshot().items())
+    
+    def _write_snapshot(self, items: Dict[str, Any]):
+        """Write a snapshot in the configured format"""
+        if SETTINGS["snapshot_format"] == "binary":
+            write_snapshot(self._snapshot_path(), items, self.sets.reader)
+        else:
+            write_set_file(self._snapshot_path(), items)
+    
+    def save_sketches(self):
+        """Write the cardinality sketch of every set to sketch_file, sketching
+        the sets that have none (never-loaded sets straight from the snapshot)"""
+        if not SETTINGS["sketch_file"] or not self._sketches_dirty:
+            return
+        precision = SETTINGS["hll_precision"]
+        try:
+            with self.sets.write_lock:
+                saved = {}
+                for name, value in self._snapshot_items().items():
+                    entry = isinstance(value, SnapshotEntry)
+                    sketch = self._sketches.get(name)
+                    if sketch is None:
+                        sketch = self._sketches[name] = HyperLogLog.of(
+                            self.sets.reader.load(name) if entry else value, precision)
+                    saved[name] = (value.cardinality if entry else len(value), sketch)
+                write_sketches(os.path.join(SCRIPT_DIR, SETTINGS["sketch_file"]), saved, precision)
+                self._sketches_dirty = False
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not save cardinality sketches: {e}")
+    
+    def compact_in_background(self):
+        """Fold the journal into a new snapshot without blocking the caller"""
+        if (self._compaction is not None and self._compaction.is_alive()) or self.journal.rotation_pending:
+            return
+        self.journal.rotate()
+        # Changes from now on apply to the snapshot being written
+        self.journal.base = os.path.basename(self._snapshot_path())
+        # Copies freeze the state the rotated journal describes
+        snapshot = self._snapshot_items()
+        
+        def write():
+            try:
+                self._write_snapshot(snapshot)
+                self.journal.discard_rotated()
+            except OSError as e:
+                print(f"❌ Error compacting journal: {e}")
+        
+        self._compaction = threading.Thread(target=write, name="journal-compaction")
+        self._compaction.start()
+    
+    def close(self):
+        """Wait for compaction and make every journaled change durable"""
+        if self._compaction is not None:
+            self._compaction.join()
+        self.journal.close()
+        # After the journal: a sketch file newer than it describes the saved state
+        self.save_sketches()
+        self.sharded.close()
+        self.history.close()
+    
+    def compute(self, op: str, x: str, y: str):
+        """Compute a two-set operation, using the NumPy engine for large inputs.
+        Results are cached per input version and shared: never mutate them."""
+        key = self.result_cache.key(op, x, y)
+        result = self.result_cache.get(key)
+        if result is not None:
+            return result
+        view = self.sets.snapshot()
+        a, b = view[x], view[y]
+        if (self.array_engine.available and self.array_engine.supports(op)
+                and len(a) + len(b) >= SETTINGS["array_engine_min_size"]):
+            result = self.array_engine.compute(op, x, a, y, b)
+        if result is None:
+            result = SET_OPERATIONS[op](a, b)
+        self.result_cache.put(key, result)
+        return result
+    
+    def sorted_block(self, name: str, view=None):
+        """Sorted int64 members of a set (None if not all int64), cached per set object.
+        Sets still in the binary snapshot are read zero-copy from it."""
+        if view is None:
+            view = self.sets.snapshot()
+        entry = self.sets.unloaded_entry(name, view)
+        if entry is not None and entry.kind == KIND_INT64:
+            return self.sets.reader.block(name)
+        values = view[name]
+        cached = self._blocks.get(name)
+        if cached is None or cached[0] is not values:
+            cached = (values, sorted_int64_block(values))
+            self._blocks[name] = cached
+        return cached[1]
+    
+    def compute_nway(self, op: str, names: List[str]):
+        """Union/intersection of any number of sets; large integer inputs are
+        sharded across worker processes"""
+        view = self.sets.snapshot()
+        if (len(names) > 1 and self.sharded.available
+                and sum(self.cardinality(name) for name in names) >= SETTINGS["parallel_min_size"]):
+            blocks = [self.sorted_block(name, view) for name in names]
+            if all(block is not None for block in blocks):
+                return set(self.sharded.compute(op, blocks))
+        return combine(op, [view[name] for name in names])
+    
+    def evaluate(self, text: str):
+        """Evaluate a set expression; `name = expr` also stores the result.
+        Returns (target name or None, optimized plan, result)."""
+        view = self.sets.snapshot()
+        target, plan, result = run_expression(text, view.__getitem__, self.cardinality,
+                                              view.__contains__)
+        if target in self.views:
+            raise ExpressionError(f"'{target}' is a materialized view; use: view {target} = expression")
+        if target is not None:
+            if isinstance(result, CartesianProduct):
+                result = set(result)
+            result = self.replace_set(target, result)
+        return target, plan, result
+    
+    def save_sets_to_file(self):
+        """Write a full snapshot of the current sets and reset the journal"""
+        with self.metrics.track("save", [self.cardinality(name) for name in self.sets]):
+            try:
+                if self._compaction is not None:
+                    self._compaction.join()
+                self._write_snapshot(self._snapshot_items())
+                self.journal.reset()
+                self.journal.base = os.path.basename(self._snapshot_path())
+                self.save_sketches()
+                print("✓ Current sets saved to file")
+            except Exception as e:
+                print(f"❌ Error saving sets: {e}")
+    
+    def log_operation(self, operation: str, result: Any = "", seconds: Optional[float] = None,
+                      inputs: List[str] = ()):
+        """Log operations for history (O(1): only the result's size and a sample are kept)"""
+        started = time.perf_counter()
+        sizes = tuple((name, self.cardinality(name)) for name in inputs if name in self.sets)
+        entry = self.history.record(operation, result, seconds, sizes)
+        self.metrics.note(entry.result.size, seconds, time.perf_counter() - started)
     
     def show_history(self):
         """Display operation history"""
-        if not self.operation_history:
+        if not self.history:
             print("📜 No operations performed yet")
             return
         
         print("\n📜 Operation History:")
         print("-" * 60)
-        for i, entry in enumerate(self.operation_history[-10:], 1):  # Show last 10
-            print(f"{i:2d}. [{entry['timestamp']}] {entry['operation']}")
-            if entry['result']:
-                print(f"    Result: {entry['result']}")
+        if self.history.dropped:
+            print(f"    … {self.history.dropped} earlier operations not shown")
+        for i, entry in enumerate(self.history, 1):
+            timestamp = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{i:2d}. [{timestamp}] {entry.operation}")
+            details = []
+            if entry.seconds is not None:
+                details.append(f"⏱ {entry.seconds * 1000:.3f} ms")
+            if entry.inputs:
+                details.append("inputs: " + ", ".join(f"|{name}| = {size}" for name, size in entry.inputs))
+            if details:
+                print(f"    {'  '.join(details)}")
+            result = entry.result.format()
+            if result:
+                print(f"    Result: {result}")
         print("-" * 60)
+        print(self.result_cache.summary())
     
     def create_new_set(self):
         """Create a new set interactively"""
@@ -101,12 +734,15 @@ class SetOperations:
             print(f"⚠ Set '{name}' already exists")
             return
         
-        elements_str = input("📝 Enter elements (comma separated): ").strip()
+        elements_str = input("📝 Enter elements (comma separated, or @file to import): ").strip()
+        if elements_str.startswith("@"):
+            importFile(name, ADD, elements_str[1:].strip())
+            return
         try:
             elements = {int(x.strip()) for x in elements_str.split(',') if x.strip()}
-            self.sets[name] = elements
-            print(f"✓ Created set '{name}': {elements}")
-            self.log_operation(f"Create set {name}", elements)
+            self.replace_set(name, elements)
+            print(f"✓ Created set '{name}': {display(elements)}")
+            self.log_operation(f"Create set {name}", elements, inputs=[name])
         except ValueError:
             print("❌ Error: Please enter valid integers")
     
@@ -118,22 +754,37 @@ class SetOperations:
         
         print("\n📊 Current Sets:")
         print("-" * 40)
-        for name, set_data in self.sets.items():
-            cardinality = len(set_data)
-            print(f"  {name}: {set_data} (|{name}| = {cardinality})")
+        for name in self.sets:
+            cardinality = self.cardinality(name)
+            if not self.sets.is_loaded(name):
+                print(f"  {name}: … (|{name}| = {cardinality}, not loaded)")
+                continue
+            print(f"  {name}: {display(self.sets[name])} (|{name}| = {cardinality})")
         print("-" * 40)
 
 
-# Global instance
-set_ops = SetOperations()
+# Global instance used by the menu, batch and server functions; created by
+# start() so that importing this module (bench.py, tests) loads no sets
+set_ops: Optional[SetOperations] = None
+
+def start(status=None) -> SetOperations:
+    """Load the sets into the global instance; status messages go to `status`"""
+    global set_ops
+    with redirect_stdout(status or sys.stdout):
+        set_ops = SetOperations()
+    return set_ops
 
 # Mathematical Operations
 def printSet(x: str):
     """Print a specific set"""
     if x in set_ops.sets:
         anySet = set_ops.sets[x]
-        print(f"📊 Set '{x}': {anySet}")
-        set_ops.log_operation(f"Print set {x}", anySet)
+        print(f"📊 Set '{x}': {display(anySet)}")
+        if len(anySet) > SETTINGS["display_limit"]:
+            # Continue after the preview, page by page
+            page_members(anySet, SETTINGS["display_page_size"], offset=SETTINGS["display_limit"],
+                         sort=SETTINGS["display_sorted"], chunk_size=SETTINGS["stream_chunk_size"])
+        set_ops.log_operation(f"Print set {x}", anySet, inputs=[x])
     else:
         print("❌ ERROR: Invalid set name")
 
@@ -141,12 +792,12 @@ def addSet(x: str):
     """Add an element to a set"""
     if x in set_ops.sets:
         anySet = set_ops.sets[x]
-        print(f"📊 Current set '{x}': {anySet}")
+        print(f"📊 Current set '{x}': {display(anySet)}")
         try:
             y = int(input("➕ Enter the value to add: "))
-            anySet.add(y)
-            print(f"✓ Updated set '{x}': {anySet}")
-            set_ops.log_operation(f"Add {y} to {x}", anySet)
+            anySet = set_ops.add_elements(x, [y])
+            print(f"✓ Updated set '{x}': {display(anySet)}")
+            set_ops.log_operation(f"Add {y} to {x}", anySet, inputs=[x])
         except ValueError:
             print("❌ ERROR: Please enter a valid integer")
     else:
@@ -156,13 +807,13 @@ def removeSet(x: str):
     """Remove an element from a set"""
     if x in set_ops.sets:
         anySet = set_ops.sets[x]
-        print(f"📊 Current set '{x}': {anySet}")
+        print(f"📊 Current set '{x}': {display(anySet)}")
         try:
             y = int(input("➖ Enter the value to remove: "))
             if y in anySet:
-                anySet.remove(y)
-                print(f"✓ Updated set '{x}': {anySet}")
-                set_ops.log_operation(f"Remove {y} from {x}", anySet)
+                anySet = set_ops.remove_elements(x, [y])
+                print(f"✓ Updated set '{x}': {display(anySet)}")
+                set_ops.log_operation(f"Remove {y} from {x}", anySet, inputs=[x])
             else:
                 print(f"⚠ Value {y} not found in set '{x}'")
         except ValueError:
@@ -170,16 +821,60 @@ def removeSet(x: str):
     else:
         print("❌ ERROR: Invalid set name")
 
+def importFile(x: str, op: str, path: str = ""):
+    """Add (or remove) every member listed in a file: one integer per line,
+    a CSV column, raw int64, JSON Lines, varint or an export manifest,
+    optionally gzip-compressed"""
+    verb = "Added" if op == ADD else "Removed"
+    path = path or input("📂 File (one integer per line, .csv column, .bin int64, .jsonl, .vint, "
+                         ".manifest.json; .gz ok): ").strip()
+    if not path:
+        return
+    path = os.path.join(SCRIPT_DIR, os.path.expanduser(path))
+    fmt = detect_format(path)
+    column = 0
+    if fmt == "csv":
+        answer = input("🔢 CSV column (0-based index or header name) [0]: ").strip() or "0"
+        column = int(answer) if answer.isdigit() else answer
+    before = set_ops.cardinality(x) if x in set_ops.sets else 0
+    show_progress = os.path.exists(path) and os.path.getsize(path) >= SETTINGS["load_progress_min_bytes"]
+    started = time.perf_counter()
+    
+    def progress(done: int, total: int, members: int):
+        rate = members / max(time.perf_counter() - started, 1e-9)
+        print(f"\r⏳ {op.capitalize()}ing from file... {done * 100 // max(total, 1)}%  "
+              f"{members:,} members ({rate:,.0f}/s)", end="", flush=True)
+    
+    try:
+        result, read = set_ops.import_file(op, x, path, column, progress if show_progress else None)
+    except (OSError, BulkImportError) as e:
+        if show_progress:
+            print()
+        print(f"❌ ERROR: {e}")
+        if x in set_ops.sets and set_ops.cardinality(x) != before:
+            print(f"⚠ Members read before the error were kept: |{x}| = {set_ops.cardinality(x):,}")
+        return
+    elapsed = time.perf_counter() - started
+    if show_progress:
+        print()
+    changed = abs(len(result) - before)
+    print(f"✓ {verb} {read:,} members from {os.path.basename(path)} ({fmt}) in {elapsed:.2f}s "
+          f"({read / max(elapsed, 1e-9):,.0f} members/s)")
+    print(f"📏 |{x}|: {before:,} → {len(result):,} ({changed:,} {'new' if op == ADD else 'removed'})")
+    set_ops.log_operation(f"{verb} members of {os.path.basename(path)} {'to' if op == ADD else 'from'} {x}",
+                          result, elapsed, [x])
+
 def cardinalitySet(x: str):
     """Calculate cardinality and power set size"""
     if x in set_ops.sets:
         anySet = set_ops.sets[x]
         cardinality = len(anySet)
         power_set_size = 2 ** cardinality
-        print(f"📊 Set '{x}': {anySet}")
+        print(f"📊 Set '{x}': {display(anySet)}")
         print(f"📈 Cardinality |{x}|: {cardinality}")
         print(f"🔢 Power set size 2^|{x}|: {power_set_size}")
-        set_ops.log_operation(f"Cardinality of {x}", f"Card: {cardinality}, PowerSet: {power_set_size}")
+        set_ops.log_operation(f"Cardinality of {x}", f"Card: {cardinality}, PowerSet: {power_set_size}",
+                              inputs=[x])
     else:
         print("❌ ERROR: Invalid set name")
 
@@ -188,41 +883,273 @@ def isEqualSet(x: str, y: str):
     if x in set_ops.sets and y in set_ops.sets:
         anySet1 = set_ops.sets[x]
         anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        if anySet1 == anySet2:
+        print(f"📊 Set '{x}': {display(anySet1)}")
+        print(f"📊 Set '{y}': {display(anySet2)}")
+        started = time.perf_counter()
+        equal = set_ops.compute("equal", x, y)
+        elapsed = time.perf_counter() - started
+        if equal:
             print("✓ Sets are equal")
             result = "Equal"
         else:
             print("❌ Sets are not equal")
             result = "Not equal"
-        set_ops.log_operation(f"Compare {x} and {y}", result)
+        set_ops.log_operation(f"Compare {x} and {y}", result, elapsed, [x, y])
     else:
         print("❌ ERROR: Invalid set name(s)")
 
 def power_set(A: Set) -> List[Set]:
-    """Generate power set of a given set"""
-    length = len(A)
-    l = list(A)
-    ps = []
-    
-    for i in range(2 ** length):
-        selector = f'{i:0{length}b}'
-        subset = {l[j] for j, bit in enumerate(selector) if bit == '1'}
-        ps.append(subset)
-    return ps
-
-def cartesianSet(x: str, y: str):
-    """Calculate cartesian product of two sets"""
-    if x in set_ops.sets and y in set_ops.sets:
-        anySet1 = set_ops.sets[x]
-        anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        result = [(a, b) for a in anySet1 for b in anySet2]
-        print(f"🔗 Cartesian product ({x} × {y}): {result}")
-        print(f"📏 Size: {len(result)}")
-        set_ops.log_operation(f"Cartesian {x} × {y}", f"Size: {len(result)}")
+    """Generate power set of a given set (materialized; prefer iter_power_set)"""
+    return list(iter_power_set(A, order="binary"))
+
+def powerSet(x: str):
+    """Stream the power set of a set page by page"""
+    if x in set_ops.sets:
+        elements = canonical_order(set_ops.sets[x])
+        total = power_set_size(elements)
+        page_size = SETTINGS["power_set_page_size"]
+        print(f"🔢 Power set of '{x}' ({total} subsets, Gray-code order):")
+        offset = 0
+        while offset < total:
+            offset += stream_power_set(elements, offset=offset, limit=page_size,
+                                       chunk_size=SETTINGS["stream_chunk_size"])
+            if offset < total:
+                answer = input(f"➤ Shown {offset}/{total}. Show next {page_size}? (y/N): ").strip().lower()
+                if answer != "y":
+                    break
+        set_ops.log_operation(f"Power set of {x}", f"Size: {total}, shown: {offset}", inputs=[x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def unrankSet(x: str):
+    """Show the subset at a given index of the power set listing"""
+    if x in set_ops.sets:
+        subsets = PowerSet(set_ops.sets[x])
+        try:
+            index = int(input(f"🔢 Subset index (0 to {subsets.size - 1}, Gray-code order): "))
+            subset = subsets.subset_at(index)
+        except ValueError:
+            print("❌ ERROR: Please enter a valid integer")
+            return
+        except IndexError as e:
+            print(f"❌ ERROR: {e}")
+            return
+        print(f"🔢 Subset #{index} of '{x}': {format_subset(subset)}")
+        set_ops.log_operation(f"Subset #{index} of {x}", subset, inputs=[x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def rankSet(x: str):
+    """Show the index of a subset in the power set listing"""
+    if x in set_ops.sets:
+        subsets = PowerSet(set_ops.sets[x])
+        try:
+            subset = {int(token) for token in input("🔢 Subset members (comma-separated): ").replace(",", " ").split()}
+        except ValueError:
+            print("❌ ERROR: Please enter valid integers")
+            return
+        try:
+            index = subsets.index_of(subset)
+        except ValueError as e:
+            print(f"❌ ERROR: {e}")
+            return
+        print(f"🔢 Index of {format_subset(subset)} in the power set of '{x}': {index}")
+        set_ops.log_operation(f"Index of a subset of {x}", index, inputs=[x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def chooseSet(x: str):
+    """Page through the k-element subsets of a set from any rank"""
+    if x in set_ops.sets:
+        try:
+            k = int(input("🔢 Subset size k: "))
+        except ValueError:
+            print("❌ ERROR: Please enter a valid integer")
+            return
+        order = input(f"🔢 Order ({'/'.join(K_SUBSET_ORDERS)}) [lex]: ").strip().lower() or "lex"
+        try:
+            subsets = KSubsets(set_ops.sets[x], k, order)
+        except ValueError as e:
+            print(f"❌ ERROR: {e}")
+            return
+        try:
+            offset = int(input("🔢 Start at rank [0]: ").strip() or 0)
+        except ValueError:
+            print("❌ ERROR: Please enter a valid integer")
+            return
+        total = subsets.size
+        page_size = SETTINGS["power_set_page_size"]
+        print(f"🔢 {k}-subsets of '{x}' ({total} subsets, {order} order):")
+        while offset < total:
+            for rank, subset in enumerate(subsets.iter_range(offset, offset + page_size), offset):
+                print(f"  #{rank}: {format_subset(subset)}")
+            offset = min(offset + page_size, total)
+            if offset < total:
+                answer = input(f"➤ Shown up to {offset}/{total}. Show next {page_size}? (y/N): ").strip().lower()
+                if answer != "y":
+                    break
+        set_ops.log_operation(f"{k}-subsets of {x}", f"Size: {total}", inputs=[x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def read_sample_options() -> Optional[Tuple[int, Optional[int]]]:
+    """Prompt for a sample size and an optional seed"""
+    try:
+        count = int(input("🎲 Number of samples: "))
+        seed = input("🎲 Seed (Enter for a random one): ").strip()
+        return count, int(seed) if seed else None
+    except ValueError:
+        print("❌ ERROR: Please enter a valid integer")
+        return None
+
+def showSamples(samples: List, label: str):
+    """Print the first page of samples and offer to write them all to a file"""
+    page_size = SETTINGS["product_page_size"]
+    for item in samples[:page_size]:
+        print(f"  {format_subset(item) if isinstance(item, set) else item}")
+    if len(samples) > page_size:
+        answer = input(f"➤ Shown {page_size}/{len(samples)}. [w]rite all to file, Enter to stop: ").strip().lower()
+        if answer == "w":
+            file_name = input("📝 Output file [samples.txt]: ").strip() or "samples.txt"
+            with open(os.path.join(SCRIPT_DIR, file_name), "w", encoding="utf-8") as f:
+                for item in samples:
+                    f.write(f"{format_subset(item) if isinstance(item, set) else item}\n")
+            print(f"✓ Wrote {len(samples)} samples to {file_name}")
+    print(f"🎲 {len(samples)} random {label}")
+
+def sampleSet(x: str):
+    """Draw uniformly random subsets (of any size, or of size k) of a set"""
+    if x in set_ops.sets:
+        options = read_sample_options()
+        if options is None:
+            return
+        count, seed = options
+        try:
+            k = input("🔢 Subset size k (Enter for any size): ").strip()
+            k = int(k) if k else None
+        except ValueError:
+            print("❌ ERROR: Please enter a valid integer")
+            return
+        started = time.perf_counter()
+        try:
+            subsets = KSubsets(set_ops.sets[x], k) if k is not None else PowerSet(set_ops.sets[x])
+            samples = subsets.sample(count, seed)
+        except ValueError as e:
+            print(f"❌ ERROR: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        label = f"{k}-subsets of '{x}'" if k is not None else f"subsets of '{x}'"
+        showSamples(samples, label)
+        set_ops.log_operation(f"Sample {count} {label}", f"Samples: {len(samples)}", elapsed, [x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def supersetsSet(x: str):
+    """List the sets that contain every member of a set (inverted index)"""
+    if x in set_ops.sets:
+        started = time.perf_counter()
+        names = set_ops.supersets(x)
+        elapsed = time.perf_counter() - started
+        print(f"⊇ Supersets of '{x}': {display(names)}")
+        set_ops.log_operation(f"Supersets of {x}", names, elapsed, [x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def subsetsSet(x: str):
+    """List the sets whose members all belong to a set (inverted index)"""
+    if x in set_ops.sets:
+        started = time.perf_counter()
+        names = set_ops.subsets(x)
+        elapsed = time.perf_counter() - started
+        print(f"⊆ Subsets of '{x}': {display(names)}")
+        set_ops.log_operation(f"Subsets of {x}", names, elapsed, [x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def sharingSet(x: str):
+    """List the sets sharing at least k members with a set (inverted index)"""
+    if x in set_ops.sets:
+        try:
+            k = int(input("🔢 Minimum number of shared members k: "))
+        except ValueError:
+            print("❌ ERROR: Please enter a valid integer")
+            return
+        started = time.perf_counter()
+        shared = set_ops.sharing(x, k)
+        elapsed = time.perf_counter() - started
+        ranked = sorted(shared.items(), key=lambda item: (-item[1], item[0]))
+        limit = SETTINGS["display_limit"]
+        print(f"🤝 Sets sharing ≥ {k} members with '{x}': {len(ranked)}")
+        for name, count in ranked[:limit]:
+            print(f"  {name}: {count} shared")
+        if len(ranked) > limit:
+            print(f"  … (+{len(ranked) - limit:,} more)")
+        set_ops.log_operation(f"Sets sharing ≥ {k} with {x}", shared, elapsed, [x])
+    else:
+        print("❌ ERROR: Invalid set name")
+
+def containsElement(tokens: List[str]):
+    """List the sets that contain every given element (inverted index)"""
+    try:
+        values = [int(token) for token in tokens]
+    except ValueError:
+        print("❌ ERROR: Please enter valid integers")
+        return
+    if not values:
+        print("❌ Invalid format. Use: contains value [value ...]")
+        return
+    started = time.perf_counter()
+    names = set_ops.containing(values)
+    elapsed = time.perf_counter() - started
+    label = ", ".join(map(str, values))
+    print(f"∋ Sets containing {label}: {display(names)}")
+    set_ops.log_operation(f"Sets containing {label}", names, elapsed)
+
+def cartesianSet(*names: str):
+    """Calculate the cartesian product of two or more sets lazily"""
+    if len(names) >= 2 and all(name in set_ops.sets for name in names):
+        label = " × ".join(names)
+        product = CartesianProduct(*(set_ops.sets[name] for name in names))
+        total = product.size
+        page_size = SETTINGS["product_page_size"]
+        print(f"🔗 Cartesian product ({label}):")
+        offset = product.stream(limit=page_size, chunk_size=SETTINGS["stream_chunk_size"])
+        while offset < total:
+            answer = input(f"➤ Shown {offset}/{total}. [n]ext page, [w]rite all to file, Enter to stop: ").strip().lower()
+            if answer == "n":
+                offset += product.stream(offset=offset, limit=page_size,
+                                         chunk_size=SETTINGS["stream_chunk_size"])
+            elif answer == "w":
+                file_name = input("📝 Output file [cartesian.txt]: ").strip() or "cartesian.txt"
+                written = product.write_to_file(os.path.join(SCRIPT_DIR, file_name),
+                                                chunk_size=SETTINGS["stream_chunk_size"])
+                print(f"✓ Wrote {written} tuples to {file_name}")
+                break
+            else:
+                break
+        print(f"📏 Size: {total}")
+        set_ops.log_operation(f"Cartesian {label}", f"Size: {total}", inputs=names)
+    else:
+        print("❌ ERROR: Invalid set name(s)")
+
+def sampleProduct(*names: str):
+    """Draw uniformly random tuples of the cartesian product of two or more sets"""
+    if len(names) >= 2 and all(name in set_ops.sets for name in names):
+        label = " × ".join(names)
+        options = read_sample_options()
+        if options is None:
+            return
+        count, seed = options
+        product = CartesianProduct(*(set_ops.sets[name] for name in names))
+        started = time.perf_counter()
+        try:
+            samples = product.sample(count, seed)
+        except ValueError as e:
+            print(f"❌ ERROR: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        showSamples(samples, f"tuples of {label} (of {product.size})")
+        set_ops.log_operation(f"Sample {count} of {label}", f"Samples: {len(samples)}", elapsed, names)
     else:
         print("❌ ERROR: Invalid set name(s)")
 
@@ -231,11 +1158,13 @@ def differenceSet(x: str, y: str):
     if x in set_ops.sets and y in set_ops.sets:
         anySet1 = set_ops.sets[x]
         anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        result = anySet1 - anySet2
-        print(f"➖ {x} - {y} = {result}")
-        set_ops.log_operation(f"Difference {x} - {y}", result)
+        print(f"📊 Set '{x}': {display(anySet1)}")
+        print(f"📊 Set '{y}': {display(anySet2)}")
+        started = time.perf_counter()
+        result = set_ops.compute("difference", x, y)
+        elapsed = time.perf_counter() - started
+        print(f"➖ {x} - {y} = {display(result)}")
+        set_ops.log_operation(f"Difference {x} - {y}", result, elapsed, [x, y])
     else:
         print("❌ ERROR: Invalid set name(s)")
 
@@ -244,11 +1173,13 @@ def unionSet(x: str, y: str):
     if x in set_ops.sets and y in set_ops.sets:
         anySet1 = set_ops.sets[x]
         anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        result = anySet1.union(anySet2)
-        print(f"∪ {x} ∪ {y} = {result}")
-        set_ops.log_operation(f"Union {x} ∪ {y}", result)
+        print(f"📊 Set '{x}': {display(anySet1)}")
+        print(f"📊 Set '{y}': {display(anySet2)}")
+        started = time.perf_counter()
+        result = set_ops.compute("union", x, y)
+        elapsed = time.perf_counter() - started
+        print(f"∪ {x} ∪ {y} = {display(result)}")
+        set_ops.log_operation(f"Union {x} ∪ {y}", result, elapsed, [x, y])
     else:
         print("❌ ERROR: Invalid set name(s)")
 
@@ -257,11 +1188,13 @@ def intersectionSet(x: str, y: str):
     if x in set_ops.sets and y in set_ops.sets:
         anySet1 = set_ops.sets[x]
         anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        result = anySet1.intersection(anySet2)
-        print(f"∩ {x} ∩ {y} = {result}")
-        set_ops.log_operation(f"Intersection {x} ∩ {y}", result)
+        print(f"📊 Set '{x}': {display(anySet1)}")
+        print(f"📊 Set '{y}': {display(anySet2)}")
+        started = time.perf_counter()
+        result = set_ops.compute("intersection", x, y)
+        elapsed = time.perf_counter() - started
+        print(f"∩ {x} ∩ {y} = {display(result)}")
+        set_ops.log_operation(f"Intersection {x} ∩ {y}", result, elapsed, [x, y])
     else:
         print("❌ ERROR: Invalid set name(s)")
 
@@ -270,11 +1203,13 @@ def symmetricDifferenceSet(x: str, y: str):
     if x in set_ops.sets and y in set_ops.sets:
         anySet1 = set_ops.sets[x]
         anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        result = anySet1.symmetric_difference(anySet2)
-        print(f"⊕ {x} ⊕ {y} = {result}")
-        set_ops.log_operation(f"Symmetric difference {x} ⊕ {y}", result)
+        print(f"📊 Set '{x}': {display(anySet1)}")
+        print(f"📊 Set '{y}': {display(anySet2)}")
+        started = time.perf_counter()
+        result = set_ops.compute("symmetric", x, y)
+        elapsed = time.perf_counter() - started
+        print(f"⊕ {x} ⊕ {y} = {display(result)}")
+        set_ops.log_operation(f"Symmetric difference {x} ⊕ {y}", result, elapsed, [x, y])
     else:
         print("❌ ERROR: Invalid set name(s)")
 
@@ -283,19 +1218,255 @@ def isSubset(x: str, y: str):
     if x in set_ops.sets and y in set_ops.sets:
         anySet1 = set_ops.sets[x]
         anySet2 = set_ops.sets[y]
-        print(f"📊 Set '{x}': {anySet1}")
-        print(f"📊 Set '{y}': {anySet2}")
-        if anySet1.issubset(anySet2):
+        print(f"📊 Set '{x}': {display(anySet1)}")
+        print(f"📊 Set '{y}': {display(anySet2)}")
+        started = time.perf_counter()
+        subset = set_ops.compute("subset", x, y)
+        elapsed = time.perf_counter() - started
+        if subset:
             print(f"✓ {x} ⊆ {y} (is subset)")
             result = "Is subset"
         else:
             print(f"❌ {x} ⊄ {y} (is not subset)")
             result = "Is not subset"
-        set_ops.log_operation(f"Subset check {x} ⊆ {y}", result)
+        set_ops.log_operation(f"Subset check {x} ⊆ {y}", result, elapsed, [x, y])
     else:
         print("❌ ERROR: Invalid set name(s)")
 
-def createFile():
+def nwaySet(oper: str, specs: List[str]):
+    """Union/intersection of many sets, given by name, range (set1..set40) or pattern (set*)"""
+    try:
+        names = expand_set_names(specs, set_ops.sets)
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        return
+    symbol = "∪" if oper == "union" else "∩"
+    label = f" {symbol} ".join(names) if len(names) <= 6 else f"{symbol} of {len(names)} sets ({names[0]} … {names[-1]})"
+    with instrumented(f"{oper} (n-way)", names):
+        started = time.perf_counter()
+        result = set_ops.compute_nway(oper, names)
+        elapsed = time.perf_counter() - started
+        print(f"{symbol} {label} = {display(result)}")
+        print(f"📏 Size: {len(result)}  ⏱ {elapsed:.3f}s")
+        set_ops.log_operation(f"{oper.capitalize()} of {len(names)} sets", result, elapsed, names)
+
+def similaritySets(oper: str, specs: List[str]):
+    """Approximate Jaccard similarity of many sets (MinHash): all pairs or LSH near-duplicates"""
+    try:
+        names = expand_set_names(specs, set_ops.sets)
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        return
+    if len(names) < 2:
+        print("❌ ERROR: Similarity needs at least two sets")
+        return
+    with instrumented(oper, names):
+        minhash = set_ops.minhash
+        if oper == "near":
+            default = SETTINGS["lsh_threshold"]
+            try:
+                threshold = float(input(f"🎯 Similarity threshold t [{default}]: ").strip() or default)
+                if not 0 <= threshold <= 1:
+                    raise ValueError(threshold)
+            except ValueError:
+                print("❌ ERROR: Please enter a number between 0 and 1")
+                return
+            started = time.perf_counter()
+            pairs = set_ops.near_duplicates(names, threshold)
+            elapsed = time.perf_counter() - started
+            bands, rows = minhash.banding(threshold, SETTINGS["lsh_bands"])
+            print(f"🔍 Near-duplicate pairs among {len(names)} sets with estimated J ≥ {threshold} "
+                  f"({bands} bands × {rows} rows): {len(pairs)}")
+            label = f"Near-duplicates (J ≥ {threshold}) of {len(names)} sets"
+        else:
+            started = time.perf_counter()
+            pairs = set_ops.jaccard_estimates(names)
+            elapsed = time.perf_counter() - started
+            print(f"≈ Jaccard estimates for {len(names)} sets: {len(pairs)} pairs")
+            label = f"Jaccard estimates of {len(names)} sets"
+        print(f"📏 {minhash.permutations} permutations: ±{minhash.error:.3f} standard error  ⏱ {elapsed:.3f}s")
+        ranked = sorted(pairs.items(), key=lambda item: (-item[1], item[0]))
+        shown = ranked[:SETTINGS["display_limit"]]
+        for (x, y), estimate in shown:
+            print(f"  {x} ~ {y}: {estimate:.3f}")
+        if len(ranked) > len(shown):
+            print(f"  … (+{len(ranked) - len(shown):,} more pairs)")
+        set_ops.log_operation(label, f"{len(pairs)} pairs", elapsed, names)
+        if shown and input("➤ [v]erify the pairs shown exactly, Enter to skip: ").strip().lower() == "v":
+            started = time.perf_counter()
+            for (x, y), estimate in shown:
+                exact = set_ops.exact_jaccard(x, y)
+                print(f"  {x} ~ {y}: exact {exact:.3f} (estimate off by {estimate - exact:+.3f})")
+            set_ops.log_operation(f"Exact Jaccard of {len(shown)} pairs", "", time.perf_counter() - started, names)
+
+def unionCountSets(specs: List[str]):
+    """|A ∪ B ∪ …| of any sets without building the union (HyperLogLog), exact for small inputs"""
+    try:
+        names = expand_set_names(specs, set_ops.sets)
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        return
+    with instrumented(COUNT_OPERATION, names):
+        started = time.perf_counter()
+        value, exact = set_ops.union_cardinality(names)
+        elapsed = time.perf_counter() - started
+        label = " ∪ ".join(names) if len(names) <= 6 else f"∪ of {len(names)} sets ({names[0]} … {names[-1]})"
+        if exact:
+            print(f"📈 |{label}| = {value:,} (exact)  ⏱ {elapsed:.3f}s")
+            set_ops.log_operation(f"Union cardinality of {len(names)} sets", value, elapsed, names)
+            return
+        error = relative_error(SETTINGS["hll_precision"])
+        print(f"📈 |{label}| ≈ {value:,.0f} ± {error:.2%}  ⏱ {elapsed:.3f}s")
+        print(f"📏 95% interval: {value * (1 - 2 * error):,.0f} – {value * (1 + 2 * error):,.0f} "
+              f"(HyperLogLog, {1 << SETTINGS['hll_precision']:,} registers)")
+        set_ops.log_operation(f"Union cardinality of {len(names)} sets", f"≈ {value:,.0f}", elapsed, names)
+
+def latticeSets(args: List[str]):
+    """Containment lattice of every stored set: Hasse diagram, exportable as
+    an adjacency list or DOT"""
+    with instrumented(LATTICE_COMMAND, list(set_ops.sets)):
+        started = time.perf_counter()
+        lattice = set_ops.lattice()
+        elapsed = time.perf_counter() - started
+    stats = lattice.stats
+    if "ordered_pairs" in stats:
+        print(f"🧮 {stats['sets']} sets, {stats['ordered_pairs']:,} ordered pairs: "
+              f"{stats['skipped_by_size']:,} skipped by cardinality, {stats['skipped_by_mask']:,} by signature mask, "
+              f"{stats['exact_checks']:,} exact checks  ⏱ {elapsed:.3f}s")
+    else:
+        print(f"🧮 Updated {stats.get('updated', 0)} changed sets with {stats.get('exact_checks', 0):,} "
+              f"exact checks  ⏱ {elapsed:.3f}s")
+    edges = lattice.edges()
+    print(f"📊 {len(lattice.relation())} containments, {len(edges)} Hasse edges "
+          f"(each set → the sets directly above it):")
+    lines = lattice.to_adjacency_list().splitlines()[1:]
+    for line in lines[:SETTINGS["display_limit"]]:
+        print(f"  {line}")
+    if len(lines) > SETTINGS["display_limit"]:
+        print(f"  … {len(lines) - SETTINGS['display_limit']} more (export to see all)")
+    set_ops.log_operation("Subset lattice of all sets", f"{len(edges)} Hasse edges", elapsed, [])
+    fmt = args[0] if args else input("💾 Export as [l]ist, [d]ot or Enter to skip: ").strip().lower()
+    fmt = {"l": "list", "d": "dot"}.get(fmt, fmt)
+    if not fmt:
+        return
+    if fmt not in EXPORT_FORMATS:
+        print(f"❌ ERROR: Unknown format '{fmt}' (use: list, dot)")
+        return
+    path = os.path.join(SCRIPT_DIR, args[1] if len(args) > 1 else f"lattice.{'dot' if fmt == 'dot' else 'txt'}")
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(lattice.export(fmt))
+    except OSError as e:
+        print(f"❌ ERROR: {e}")
+        return
+    print(f"✓ Lattice written to {os.path.basename(path)}")
+
+def singleSetCommand(user_input: List[str]):
+    """Dispatch `setName operation` and the element query `contains value ...`"""
+    if len(user_input) >= 2 and user_input[0] == "contains":
+        with instrumented("contains"):
+            containsElement(user_input[1:])
+    elif len(user_input) == 2:
+        x, oper = user_input
+        one(oper, x)
+    else:
+        print("❌ Invalid format. Use: setName operation")
+
+def multiSetCommand(user_input: List[str]):
+    """Dispatch `setName1 setName2 operation`, n-ary cartesian/union/intersection
+    and range/pattern forms such as `set1..set40 intersection` or `set* union`"""
+    if user_input and user_input[0] == LATTICE_COMMAND:
+        latticeSets(user_input[1:])
+    elif len(user_input) >= 2 and user_input[-1] in SIMILARITY_OPERATIONS:
+        similaritySets(user_input[-1], user_input[:-1])
+    elif len(user_input) >= 3 and user_input[-1] == SAMPLE_OPERATION:
+        with instrumented(SAMPLE_OPERATION, user_input[:-1]):
+            sampleProduct(*user_input[:-1])
+    elif len(user_input) >= 2 and user_input[-1] == COUNT_OPERATION:
+        unionCountSets(user_input[:-1])
+    elif len(user_input) >= 2 and user_input[-1] in NWAY_OPERATIONS and (
+            len(user_input) != 3 or not all(name in set_ops.sets for name in user_input[:-1])):
+        nwaySet(user_input[-1], user_input[:-1])
+    elif len(user_input) == 3:
+        x, y, oper = user_input
+        two(oper, x, y)
+    elif len(user_input) > 3 and user_input[-1] == "cartesian":
+        cartesianSet(*user_input[:-1])
+    else:
+        print("❌ Invalid format. Use: setName1 setName2 operation")
+
+def evaluateExpression():
+    """Evaluate a nested set expression, optionally storing it as a new set"""
+    print("📐 Operators: ∪ |  ∩ &  − -  ⊕ ^  × *   (parentheses allowed, ∅ = empty set)")
+    print("👁 Views: view name = expression · view name · view drop name · view check · views")
+    text = input("➤ Enter expression ([newSet =] expression): ").strip()
+    if not text:
+        return
+    if text == "views" or text.startswith("view "):
+        viewCommand(text)
+        return
+    started = time.perf_counter()
+    try:
+        target, plan, result = set_ops.evaluate(text)
+    except ExpressionError as e:
+        print(f"❌ ERROR: {e}")
+        return
+    elapsed = time.perf_counter() - started
+    print(f"🧭 Plan: {format_node(plan)}")
+    if isinstance(result, CartesianProduct):
+        shown = result.stream(limit=SETTINGS["product_page_size"], chunk_size=SETTINGS["stream_chunk_size"])
+        if shown < result.size:
+            print(f"… ({result.size - shown} more tuples)")
+        print(f"📏 Size: {result.size}")
+    else:
+        print(f"📊 Result: {display(result)}")
+        print(f"📏 Size: {len(result)}")
+    if target is not None:
+        print(f"✓ Stored result as set '{target}'")
+    set_ops.log_operation(f"Evaluate {text}",
+                          f"Size: {result.size}" if isinstance(result, CartesianProduct) else result,
+                          elapsed, names_in(plan))
+
+def viewCommand(text: str):
+    """Define, read, drop, list or check materialized views"""
+    args = text.split()[1:]
+    started = time.perf_counter()
+    try:
+        if text == "views":
+            if not len(set_ops.views):
+                print("👁 No views defined")
+            for view in set_ops.views:
+                size = f"|{view.name}| = {len(view.members)}" if view.built else "not built yet"
+                print(f"  {view.name} = {view.expression}  ({size})")
+        elif args == ["check"]:
+            problems = set_ops.check_views()
+            for name, found in problems.items():
+                print(f"❌ View '{name}': {'; '.join(found)}")
+            if not problems:
+                print("✓ All built views match a full recompute")
+        elif len(args) == 2 and args[0] == "drop":
+            set_ops.drop_view(args[1])
+            print(f"✓ Dropped view '{args[1]}'")
+        elif len(args) == 1:
+            result = set_ops.view(args[0])
+            elapsed = time.perf_counter() - started
+            print(f"👁 {args[0]} = {set_ops.views.get(args[0]).expression}")
+            print(f"📊 Result: {display(result)}")
+            print(f"📏 Size: {len(result)}  ⏱ {elapsed * 1000:.3f} ms")
+            set_ops.log_operation(f"Read view {args[0]}", result, elapsed, set_ops.views.get(args[0]).inputs)
+        else:
+            view = set_ops.define_view(text.split(None, 1)[1])
+            elapsed = time.perf_counter() - started
+            print(f"✓ View '{view.name}' = {view.expression} built in {elapsed:.3f}s "
+                  f"(|{view.name}| = {len(view.members)}); it is updated as its sets change")
+            set_ops.log_operation(f"Define view {view.name} = {view.expression}", view.members, elapsed,
+                                  view.inputs)
+    except ExpressionError as e:
+        print(f"❌ ERROR: {e}")
+    except OSError as e:
+        print(f"❌ ERROR: could not save the view definitions: {e}")
+
+def writeReport():
     """Save sets to sets.txt file with better formatting"""
     try:
         file_path = os.path.join(SCRIPT_DIR, 'sets.txt')
@@ -304,7 +1475,7 @@ def createFile():
             f.write("=" * 40 + "\n")
             f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
             
-            for name, set_data in set_ops.sets.items():
+            for name, set_data in set_ops.sets.snapshot().items():
                 f.write(f"{name}: {set_data}\n")
                 f.write(f"Cardinality: {len(set_data)}\n")
                 f.write("-" * 20 + "\n")
@@ -314,6 +1485,56 @@ def createFile():
     except Exception as e:
         print(f"❌ Error creating file: {e}")
 
+def createFile():
+    """Export sets in chunks as lines / jsonl / varint files with a manifest
+    each (reloadable with addfile or create @file), or write the sets.txt report"""
+    formats = SET_EXPORT_FORMATS + ("report",)
+    fmt = input(f"📝 Format ({'/'.join(formats)}) [{SETTINGS['export_format']}]: ").strip().lower() \
+        or SETTINGS["export_format"]
+    if fmt == "report":
+        writeReport()
+        return
+    if fmt not in SET_EXPORT_FORMATS:
+        print(f"❌ ERROR: Unknown format '{fmt}' (use one of: {', '.join(formats)})")
+        return
+    names = input("📝 Sets to export (names, ranges or patterns; Enter for all): ").split()
+    default = "Y/n" if SETTINGS["export_compress"] else "y/N"
+    answer = input(f"📝 gzip-compress? ({default}): ").strip().lower()
+    compress = answer == "y" or (not answer and SETTINGS["export_compress"])
+    directory = input(f"📝 Directory [{SETTINGS['export_dir']}]: ").strip() or SETTINGS["export_dir"]
+    directory = os.path.join(SCRIPT_DIR, directory)
+    started = time.perf_counter()
+
+    def progress(manifest):
+        print(f"  ✓ {manifest['set']}: {manifest['cardinality']:,} members → {manifest['file']} "
+              f"({manifest['bytes']:,} bytes)")
+
+    try:
+        manifests = set_ops.export_sets(names, directory, fmt, compress, progress)
+    except (OSError, ExportError) as e:
+        print(f"❌ ERROR: {e}")
+        return
+    elapsed = time.perf_counter() - started
+    members = sum(m["cardinality"] for m in manifests)
+    written = sum(m["bytes"] for m in manifests)
+    print(f"✓ Exported {len(manifests)} sets ({members:,} members, {written:,} bytes) to "
+          f"{os.path.relpath(directory, SCRIPT_DIR)} in {elapsed:.2f}s ({written / max(elapsed, 1e-9) / 1e6:,.1f} MB/s)")
+    print("💡 Reload a set with `setName addfile` or `create @file`, giving its .manifest.json")
+    set_ops.log_operation(f"Export {len(manifests)} sets as {fmt}{' (gzip)' if compress else ''}",
+                          f"{members} members, {written} bytes", elapsed, [m["set"] for m in manifests])
+
+@contextmanager
+def instrumented(op: str, names: List[str] = ()):
+    """Track a menu command in the metrics; prints the hot paths if it was profiled"""
+    inputs = [set_ops.cardinality(name) for name in names if name in set_ops.sets]
+    profiled = set_ops.metrics.last_profile
+    with set_ops.metrics.track(op, inputs):
+        yield
+    if set_ops.metrics.last_profile is not profiled:
+        path, hot_paths = set_ops.metrics.last_profile
+        print(f"🔬 Profile of '{op}' saved to {path}")
+        print(hot_paths)
+
 # Operation handlers
 def one(oper: str, x: str):
     """Handle single-set operations"""
@@ -322,14 +1543,25 @@ def one(oper: str, x: str):
         "add": lambda: addSet(x),
         "remove": lambda: removeSet(x),
         "cardinal": lambda: cardinalitySet(x),
-        "power": lambda: print(f"🔢 Power set of '{x}': {[set(s) for s in power_set(set_ops.sets[x])]}") if x in set_ops.sets else print("❌ ERROR: Invalid set name")
+        "power": lambda: powerSet(x),
+        "unrank": lambda: unrankSet(x),
+        "rank": lambda: rankSet(x),
+        "choose": lambda: chooseSet(x),
+        "sample": lambda: sampleSet(x),
+        "supersets": lambda: supersetsSet(x),
+        "subsets": lambda: subsetsSet(x),
+        "sharing": lambda: sharingSet(x),
+        "addfile": lambda: importFile(x, ADD),
+        "removefile": lambda: importFile(x, REMOVE)
     }
     
     if oper in operations:
-        operations[oper]()
+        with instrumented(oper, [x]):
+            operations[oper]()
     else:
         print("❌ ERROR: Invalid operation name")
-        print("Available operations: print, add, remove, cardinal, power")
+        print("Available operations: print, add, remove, cardinal, power, unrank, rank, choose, sample, "
+              "supersets, subsets, sharing, addfile, removefile")
 
 def two(oper: str, x: str, y: str):
     """Handle two-set operations"""
@@ -344,11 +1576,85 @@ def two(oper: str, x: str, y: str):
     }
     
     if oper in operations:
-        operations[oper]()
+        with instrumented(oper, [x, y]):
+            operations[oper]()
     else:
         print("❌ ERROR: Invalid operation name")
         print("Available operations: equal, cartesian, difference, union, intersection, symmetric, subset")
 
+def showMetrics():
+    """Per-operation latency, cardinality and memory statistics"""
+    metrics = set_ops.metrics
+    rows = metrics.rows()
+    if not rows:
+        print("📈 No operations measured yet")
+    else:
+        print("\n📈 Performance Metrics (times in ms; compute/history = share of the time spent")
+        print("   computing results / recording them; the rest went to printing and prompts):")
+        print("-" * 117)
+        print(f"{'operation':<20} {'calls':>6} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} "
+              f"{'compute':>8} {'history':>8} {'|in|':>10} {'|out|':>10} {'alloc KiB':>10}")
+        for op, calls, mean, p50, p90, p99, peak, compute, history, size_in, size_out, alloc in rows:
+            alloc_text = "-" if alloc is None else f"{alloc / 1024:,.1f}"
+            print(f"{op:<20} {calls:>6} {mean * 1000:>9.3f} {p50 * 1000:>9.3f} {p90 * 1000:>9.3f} "
+                  f"{p99 * 1000:>9.3f} {peak * 1000:>9.3f} {compute:>8.0%} {history:>8.0%} "
+                  f"{size_in:>10,.0f} {size_out:>10,.0f} {alloc_text:>10}")
+        print("-" * 117)
+    print(f"🧠 Memory tracing: {'on' if metrics.trace_memory else 'off'}")
+    answer = input("➤ [e]xport JSON, [m]emory tracing on/off, [p]rofile next command, Enter to return: ").strip().lower()
+    if answer == "e":
+        path = os.path.join(SCRIPT_DIR, SETTINGS["metrics_file"])
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(metrics.to_dict(), f, indent=2)
+            print(f"✓ Metrics written to {SETTINGS['metrics_file']}")
+        except OSError as e:
+            print(f"❌ Error writing metrics: {e}")
+    elif answer == "m":
+        metrics.trace_memory = not metrics.trace_memory
+        print(f"✓ Memory tracing {'enabled (operations run slower)' if metrics.trace_memory else 'disabled'}")
+    elif answer == "p":
+        metrics.profile_next()
+        print("✓ The next command will run under cProfile")
+
+@lru_cache(maxsize=None)
+def read_help(file_name: str) -> str:
+    """Read an operations help file once per session"""
+    with open(os.path.join(SCRIPT_DIR, file_name), "r", encoding='utf-8') as f:
+        return f.read()
+
+def run_batch(source: str, output: str = "text") -> bool:
+    """Run commands from a file ('-' for stdin) without the interactive menu"""
+    runner = BatchRunner(set_ops, output=output)
+    try:
+        if source == "-":
+            ok = runner.run(sys.stdin)
+        else:
+            with open(source, "r", encoding='utf-8') as f:
+                ok = runner.run(f)
+    finally:
+        set_ops.close()
+    print(runner.summary(), file=sys.stderr)
+    print(set_ops.result_cache.summary(), file=sys.stderr)
+    return ok
+
+def run_server(host: str, port: int):
+    """Serve the store to network clients until interrupted"""
+    server = SetServer(set_ops, pipeline_depth=SETTINGS["server_pipeline_depth"],
+                       write_chunk=SETTINGS["server_write_chunk"],
+                       result_limit=SETTINGS["server_result_limit"],
+                       max_request_bytes=SETTINGS["server_max_request_bytes"])
+    print(f"🌐 Serving {len(set_ops.sets)} sets on {host}:{port} (JSON lines, Ctrl-C to stop)")
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        print("\n⚠ Server stopped by user")
+    finally:
+        server.close()
+        set_ops.close()
+        print("✓ All changes are saved in the journal")
+        print(server.summary())
+
 def show_main_menu():
     """Display the main menu"""
     print("\n" + "=" * 60)
@@ -357,11 +1663,13 @@ def show_main_menu():
     print("=" * 60)
     print("1️⃣  Single Set Operations")
     print("2️⃣  Two Set Operations") 
-    print("3️⃣  Save Sets to File")
+    print("3️⃣  Export Sets to Files")
     print("4️⃣  View All Sets")
     print("5️⃣  Create New Set")
     print("6️⃣  View Operation History")
-    print("7️⃣  Exit Program")
+    print("7️⃣  Evaluate Set Expression")
+    print("8️⃣  Performance Metrics")
+    print("9️⃣  Exit Program")
     print("=" * 60)
 
 # Main program
@@ -373,57 +1681,41 @@ def main():
     while True:
         try:
             show_main_menu()
-            choice = input("🎯 Select an option (1-7): ").strip()
+            choice = input("🎯 Select an option (1-9): ").strip()
             
             if choice == "1":
                 try:
-                    file_path = os.path.join(SCRIPT_DIR, "operations1.txt")
-                    with open(file_path, "r", encoding='utf-8') as f:
-                        print("\n📋 Single Set Operations:")
-                        print("-" * 40)
-                        print(f.read())
-                        print("-" * 40)
+                    help_text = read_help("operations1.txt")
+                    print("\n📋 Single Set Operations:")
+                    print("-" * 40)
+                    print(help_text)
+                    print("-" * 40)
                     
                     user_input = input("➤ Enter command (setName operation): ").strip().split()
-                    if len(user_input) == 2:
-                        x, oper = user_input
-                        one(oper, x)
-                    else:
-                        print("❌ Invalid format. Use: setName operation")
+                    singleSetCommand(user_input)
                 except FileNotFoundError:
                     print("❌ Operations help file not found. Available operations:")
-                    print("  print, add, remove, cardinal, power")
+                    print("  print, add, remove, cardinal, power, unrank, rank, choose, sample, supersets, subsets, "
+                          "sharing, contains, addfile, removefile")
                     user_input = input("➤ Enter command (setName operation): ").strip().split()
-                    if len(user_input) == 2:
-                        x, oper = user_input
-                        one(oper, x)
-                    else:
-                        print("❌ Invalid format. Use: setName operation")
+                    singleSetCommand(user_input)
                     
             elif choice == "2":
                 try:
-                    file_path = os.path.join(SCRIPT_DIR, "operations2.txt")
-                    with open(file_path, "r", encoding='utf-8') as f:
-                        print("\n📋 Two Set Operations:")
-                        print("-" * 40)
-                        print(f.read())
-                        print("-" * 40)
+                    help_text = read_help("operations2.txt")
+                    print("\n📋 Two Set Operations:")
+                    print("-" * 40)
+                    print(help_text)
+                    print("-" * 40)
                     
                     user_input = input("➤ Enter command (setName1 setName2 operation): ").strip().split()
-                    if len(user_input) == 3:
-                        x, y, oper = user_input
-                        two(oper, x, y)
-                    else:
-                        print("❌ Invalid format. Use: setName1 setName2 operation")
+                    multiSetCommand(user_input)
                 except FileNotFoundError:
                     print("❌ Operations help file not found. Available operations:")
-                    print("  equal, cartesian, difference, union, intersection, symmetric, subset")
+                    print("  equal, cartesian, difference, union, intersection, symmetric, subset, jaccard, near, count, "
+                          "sample, lattice")
                     user_input = input("➤ Enter command (setName1 setName2 operation): ").strip().split()
-                    if len(user_input) == 3:
-                        x, y, oper = user_input
-                        two(oper, x, y)
-                    else:
-                        print("❌ Invalid format. Use: setName1 setName2 operation")
+                    multiSetCommand(user_input)
                     
             elif choice == "3":
                 createFile()
@@ -438,18 +1730,27 @@ def main():
                 set_ops.show_history()
                 
             elif choice == "7":
+                with instrumented("expression"):
+                    evaluateExpression()
+                
+            elif choice == "8":
+                showMetrics()
+                
+            elif choice == "9":
                 print("💾 Saving current work...")
-                set_ops.save_sets_to_file()
+                set_ops.close()
+                print("✓ All changes are saved in the journal")
                 print("👋 Thank you for using the Set Operations Tool!")
                 break
                 
             else:
-                print("❌ Invalid option. Please select 1-7.")
+                print("❌ Invalid option. Please select 1-9.")
                 
         except KeyboardInterrupt:
             print("\n\n⚠ Program stopped by user")
             print("💾 Saving current work...")
-            set_ops.save_sets_to_file()
+            set_ops.close()
+            print("✓ All changes are saved in the journal")
             print("👋 Goodbye!")
             break
         except Exception as e:
@@ -457,4 +1758,21 @@ def main():
             print("🔄 Continuing...")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Advanced Set Operations Tool")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run commands from FILE ('-' for stdin) instead of the interactive menu")
+    parser.add_argument("--output", choices=OUTPUT_MODES, default="text",
+                        help="batch output mode (default: text)")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the sets to JSON-lines TCP clients instead of the interactive menu")
+    parser.add_argument("--host", default=SETTINGS["server_host"], help="server address")
+    parser.add_argument("--port", type=int, default=SETTINGS["server_port"], help="server port")
+    args = parser.parse_args()
+    # In batch mode status messages go to stderr, keeping stdout for results
+    start(sys.stderr if args.batch else sys.stdout)
+    if args.batch:
+        sys.exit(0 if run_batch(args.batch, args.output) else 1)
+    if args.serve:
+        run_server(args.host, args.port)
+        sys.exit(0)
     main()
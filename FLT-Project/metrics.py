@@ -0,0 +1,239 @@
+"""
+Operation Metrics
+=================
+Per-operation-type latency histograms, cardinalities, memory and profiles.
+
+Every command dispatched from the menu (and every load/save) runs inside
+Metrics.track(). It records:
+
+- wall time in a log-scaled histogram (buckets double from 1 µs), from which
+  approximate percentiles are read
+- how that time splits into computing the result and recording it in the
+  history (reported through note() by log_operation); the remainder went to
+  printing and prompts
+- total input cardinality and the output cardinality
+- optionally the peak bytes allocated during the command (tracemalloc, which
+  slows everything down while on, so it is opt-in)
+
+profile_next() arms cProfile for the next tracked command only; its stats
+are dumped to a .prof file and the hottest functions are kept as text.
+"""
+
+import cProfile
+import io
+import math
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bound of histogram bucket i is BUCKET_BASE · 2^i seconds
+BUCKET_BASE = 1e-6
+BUCKETS = 32
+
+
+class LatencyHistogram:
+    """Log-scaled latency histogram with O(1) insertion"""
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket_of(seconds: float) -> int:
+        if seconds <= BUCKET_BASE:
+            return 0
+        return min(BUCKETS - 1, math.ceil(math.log2(seconds / BUCKET_BASE)))
+
+    @staticmethod
+    def upper_bound(bucket: int) -> float:
+        return BUCKET_BASE * (1 << bucket)
+
+    def add(self, seconds: float) -> None:
+        self.counts[self.bucket_of(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (never above max)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "mean_s": self.mean, "max_s": self.max,
+                "p50_s": self.percentile(0.5), "p90_s": self.percentile(0.9),
+                "p99_s": self.percentile(0.99),
+                "buckets": [{"le_s": self.upper_bound(i), "count": c}
+                            for i, c in enumerate(self.counts) if c]}
+
+
+class Call:
+    """What one tracked command reported about itself"""
+
+    def __init__(self, inputs: Sequence[int]):
+        self.inputs = list(inputs)
+        self.output: Optional[int] = None
+        self.compute_seconds = 0.0
+        self.history_seconds = 0.0
+        self.allocated: Optional[int] = None
+        self.failed = False
+
+
+class OperationStats:
+    """Aggregates of every call of one operation type"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.compute_seconds = 0.0
+        self.history_seconds = 0.0
+        self.input_elements = 0
+        self.max_input = 0
+        self.output_elements = 0
+        self.outputs = 0
+        self.max_output = 0
+        self.allocated = 0
+        self.allocated_calls = 0
+        self.max_allocated = 0
+
+    def add(self, call: Call, seconds: float) -> None:
+        self.latency.add(seconds)
+        self.errors += call.failed
+        self.compute_seconds += call.compute_seconds
+        self.history_seconds += call.history_seconds
+        total_input = sum(call.inputs)
+        self.input_elements += total_input
+        self.max_input = max(self.max_input, total_input)
+        if call.output is not None:
+            self.outputs += 1
+            self.output_elements += call.output
+            self.max_output = max(self.max_output, call.output)
+        if call.allocated is not None:
+            self.allocated_calls += 1
+            self.allocated += call.allocated
+            self.max_allocated = max(self.max_allocated, call.allocated)
+
+    def to_dict(self) -> dict:
+        calls = self.latency.count
+        return {
+            "latency": self.latency.to_dict(),
+            "errors": self.errors,
+            "compute_s": self.compute_seconds,
+            "history_s": self.history_seconds,
+            "other_s": max(0.0, self.latency.total - self.compute_seconds - self.history_seconds),
+            "input_elements": {"mean": self.input_elements / calls if calls else 0, "max": self.max_input},
+            "output_elements": {"mean": self.output_elements / self.outputs if self.outputs else 0,
+                                "max": self.max_output},
+            "allocated_bytes": {"mean": self.allocated / self.allocated_calls if self.allocated_calls else None,
+                                "max": self.max_allocated if self.allocated_calls else None},
+        }
+
+
+class Metrics:
+    """Registry of per-operation statistics for one session"""
+
+    def __init__(self, trace_memory: bool = False, profile_dir: str = "profiles",
+                 profile_top: int = 15):
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.profile_top = profile_top
+        self.stats: Dict[str, OperationStats] = {}
+        self.current: Optional[Call] = None
+        self.last_profile: Optional[Tuple[str, str]] = None
+        self._profile_next = False
+
+    def profile_next(self) -> None:
+        """Run the next tracked command under cProfile"""
+        self._profile_next = True
+
+    @contextmanager
+    def track(self, op: str, inputs: Sequence[int] = ()) -> Iterator[Optional[Call]]:
+        """Measure a command; nested track() calls are part of the outer one"""
+        if self.current is not None:
+            yield None
+            return
+        call = self.current = Call(inputs)
+        profiler = cProfile.Profile() if self._profile_next else None
+        self._profile_next = False
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield call
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            seconds = time.perf_counter() - started
+            if tracing:
+                call.allocated = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.current = None
+            self.stats.setdefault(op, OperationStats()).add(call, seconds)
+            if profiler is not None:
+                self.last_profile = self._dump_profile(op, profiler)
+
+    def note(self, output: Optional[int] = None, compute_seconds: Optional[float] = None,
+             history_seconds: float = 0.0) -> None:
+        """Report result size and time split of the command being tracked"""
+        call = self.current
+        if call is None:
+            return
+        if output is not None:
+            call.output = output
+        if compute_seconds is not None:
+            call.compute_seconds += compute_seconds
+        call.history_seconds += history_seconds
+
+    def _dump_profile(self, op: str, profiler: cProfile.Profile) -> Tuple[str, str]:
+        """Write the profile to <profile_dir>/<op>-<time>.prof; returns (path, hot paths)"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        safe = "".join(ch if ch.isalnum() else "_" for ch in op)
+        path = os.path.join(self.profile_dir, f"{safe}-{stamp}.prof")
+        profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(self.profile_top)
+        return path, text.getvalue()
+
+    def to_dict(self) -> dict:
+        """Machine-readable export of every operation's statistics"""
+        return {"created": datetime.now().isoformat(timespec="seconds"),
+                "trace_memory": self.trace_memory,
+                "operations": {op: stats.to_dict() for op, stats in sorted(self.stats.items())}}
+
+    def rows(self) -> List[Tuple]:
+        """(op, calls, mean, p50, p90, p99, max, compute share, history share,
+        mean in, mean out, mean alloc) per operation type"""
+        rows = []
+        for op, stats in sorted(self.stats.items()):
+            h = stats.latency
+            data = stats.to_dict()
+            compute = stats.compute_seconds / h.total if h.total else 0.0
+            history = stats.history_seconds / h.total if h.total else 0.0
+            rows.append((op, h.count, h.mean, h.percentile(0.5), h.percentile(0.9), h.percentile(0.99),
+                         h.max, compute, history, data["input_elements"]["mean"],
+                         data["output_elements"]["mean"], data["allocated_bytes"]["mean"]))
+        return rows
@@ -0,0 +1,236 @@
+"""
+MinHash Similarity
+==================
+Approximate Jaccard similarity J = |A ∩ B| / |A ∪ B| from fixed-size signatures.
+
+A signature holds, for each of `permutations` hash functions
+h(x) = (a·x + b) mod p, the smallest hash of any member. Two sets agree on a
+position with probability J, so the share of equal positions estimates J
+with a standard error of sqrt(J(1 - J) / permutations): at most ±0.044 with
+128 permutations, ±0.022 with 512.
+
+With NumPy a signature is computed in one vectorized pass over the set
+(pure Python otherwise). Adding members only lowers minimums, so a signature
+is updated by merging in the new members' signature. Removing members cannot
+be undone on a minimum; the signature is then rebuilt on its next use.
+
+all_pairs() compares every pair of signatures: O(N² · permutations) instead
+of O(N² · |S|) for exact intersections. near_duplicates() uses LSH banding.
+The signature is cut into `bands` bands of `rows` rows, and only sets that
+agree on a whole band are compared. A pair with similarity s becomes a
+candidate with probability 1 - (1 - s^rows)^bands. That S-curve is steepest
+near (1 / bands)^(1 / rows), which choose_bands() places at the threshold.
+"""
+
+import math
+import random
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from bitmap import CompactIntSet
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+SIMILARITY_OPERATIONS = ("jaccard", "near")
+# Hashes live in [0, p); p itself marks "no member" (empty sets)
+PRIME = (1 << 31) - 1
+MASK64 = (1 << 64) - 1
+# Hash matrix cells computed per vectorized block (permutations × members)
+BLOCK_CELLS = 1 << 20
+
+Pair = Tuple[str, str]
+
+
+def _mix(x: int) -> int:
+    """MurmurHash3's 64-bit finalizer: spreads runs of nearby integers, on which
+    the linear hash functions alone are far from min-wise independent"""
+    x ^= x >> 33
+    x = (x * 0xFF51AFD7ED558CCD) & MASK64
+    x ^= x >> 33
+    x = (x * 0xC4CEB9FE1A85EC53) & MASK64
+    return x ^ (x >> 33)
+
+
+def _mix_array(x):
+    """_mix() over a uint64 array (multiplication wraps modulo 2^64)"""
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xFF51AFD7ED558CCD)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xC4CEB9FE1A85EC53)
+    x ^= x >> np.uint64(33)
+    return x
+
+
+def hash64(x) -> int:
+    """Stable 64-bit hash of a member, the same in every process: integers
+    are mixed directly, anything else through CRC-32 of its repr"""
+    if isinstance(x, float) and x.is_integer():
+        x = int(x)  # 2.0 == 2 in a set
+    if not isinstance(x, int):
+        x = zlib.crc32(repr(x).encode("utf-8"))
+    return _mix(x & MASK64)
+
+
+def hash64_array(values):
+    """hash64() of every member as a uint64 array (NumPy only); integer sets
+    and int64 blocks are hashed without a Python call per member"""
+    members = None
+    if isinstance(values, (memoryview, array)) and getattr(values, "format", getattr(values, "typecode", "")) == "q":
+        members = np.frombuffer(values, dtype=np.int64)
+    else:
+        try:
+            # array("q") rejects floats, strings and ints beyond 64 bits in C,
+            # without a type check per member
+            members = np.frombuffer(array("q", values), dtype=np.int64)
+        except (TypeError, OverflowError):
+            pass
+    if members is not None:
+        # astype copies; its two's complement view equals x & MASK64 for negative x
+        return _mix_array(members.astype(np.uint64))
+    return np.fromiter((hash64(x) for x in values), dtype=np.uint64, count=len(values))
+
+
+def element_hash(x) -> int:
+    """Stable hash of a member in [0, PRIME)"""
+    return hash64(x) % PRIME
+
+
+def choose_bands(permutations: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands · rows ≤ permutations whose S-curve is steepest
+    closest to the threshold"""
+    best = (permutations, 1)
+    best_distance = math.inf
+    for rows in range(1, permutations + 1):
+        bands = permutations // rows
+        distance = abs((1 / bands) ** (1 / rows) - threshold)
+        if distance < best_distance:
+            best, best_distance = (bands, rows), distance
+    return best
+
+
+class MinHasher:
+    """A seeded family of hash functions and the signatures built from it"""
+
+    def __init__(self, permutations: int = 128, seed: int = 1):
+        if permutations < 1:
+            raise ValueError("permutations must be at least 1")
+        self.permutations = permutations
+        rng = random.Random(seed)
+        a = [rng.randrange(1, PRIME) for _ in range(permutations)]
+        b = [rng.randrange(0, PRIME) for _ in range(permutations)]
+        if np is not None:
+            self._a = np.array(a, dtype=np.int64)
+            self._b = np.array(b, dtype=np.int64)
+        else:
+            self._a, self._b = a, b
+
+    @property
+    def error(self) -> float:
+        """Worst-case standard error of an estimate (at J = 0.5)"""
+        return 0.5 / math.sqrt(self.permutations)
+
+    # --- signatures ---------------------------------------------------------
+    def empty(self):
+        if np is not None:
+            return np.full(self.permutations, PRIME, dtype=np.int64)
+        return [PRIME] * self.permutations
+
+    @staticmethod
+    def _hashes(values):
+        """element_hash() of every member as an int64 array"""
+        return (hash64_array(values) % np.uint64(PRIME)).astype(np.int64)
+
+    def signature(self, values: Iterable):
+        """MinHash signature of a collection of members"""
+        if np is None:
+            hashes = [element_hash(x) for x in values]
+            if not hashes:
+                return self.empty()
+            return [min((a * x + b) % PRIME for x in hashes) for a, b in zip(self._a, self._b)]
+        if not isinstance(values, (set, frozenset, CompactIntSet, memoryview, array)):
+            values = list(values)
+        signature = self.empty()
+        if not len(values):
+            return signature
+        hashes = self._hashes(values)
+        step = max(1, BLOCK_CELLS // self.permutations)
+        b = self._b[:, None]
+        for start in range(0, hashes.size, step):
+            # a, x < 2^31: a·x + b stays below 2^63
+            block = np.multiply.outer(self._a, hashes[start:start + step])
+            block += b
+            block %= PRIME
+            np.minimum(signature, block.min(axis=1), out=signature)
+        return signature
+
+    def merge(self, signature, values: Iterable):
+        """Signature of the set after `values` were added to it"""
+        added = self.signature(values)
+        if np is not None:
+            return np.minimum(signature, added)
+        return [min(x, y) for x, y in zip(signature, added)]
+
+    def similarity(self, first, second) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        if np is not None:
+            return int(np.count_nonzero(first == second)) / self.permutations
+        return sum(x == y for x, y in zip(first, second)) / self.permutations
+
+    # --- queries --------------------------------------------------------------
+    def all_pairs(self, signatures: Mapping[str, Any], min_similarity: float = 0.0) -> Dict[Pair, float]:
+        """Estimated similarity of every pair of named signatures (those ≥ min_similarity)"""
+        names = list(signatures)
+        estimates: Dict[Pair, float] = {}
+        if np is not None and names:
+            matrix = np.stack([signatures[name] for name in names])
+            for i, name in enumerate(names[:-1]):
+                agree = np.count_nonzero(matrix[i + 1:] == matrix[i], axis=1) / self.permutations
+                for offset in np.flatnonzero(agree >= min_similarity).tolist():
+                    estimates[(name, names[i + 1 + offset])] = float(agree[offset])
+            return estimates
+        for i, name in enumerate(names):
+            for other in names[i + 1:]:
+                estimate = self.similarity(signatures[name], signatures[other])
+                if estimate >= min_similarity:
+                    estimates[(name, other)] = estimate
+        return estimates
+
+    def candidates(self, signatures: Mapping[str, Any], bands: int, rows: int) -> List[Pair]:
+        """Pairs agreeing on at least one whole band (in signature order)"""
+        order = {name: i for i, name in enumerate(signatures)}
+        pairs: Dict[Pair, None] = {}
+        for band in range(bands):
+            start, stop = band * rows, (band + 1) * rows
+            buckets = defaultdict(list)
+            for name, signature in signatures.items():
+                key = signature[start:stop]
+                buckets[key.tobytes() if np is not None else tuple(key)].append(name)
+            for bucket in buckets.values():
+                for i, name in enumerate(bucket):
+                    for other in bucket[i + 1:]:
+                        pairs[(name, other) if order[name] < order[other] else (other, name)] = None
+        return list(pairs)
+
+    def banding(self, threshold: float, bands: int = 0) -> Tuple[int, int]:
+        """(bands, rows) used for a threshold; bands=0 picks them from the threshold"""
+        if bands > 0:
+            bands = min(bands, self.permutations)
+            return bands, self.permutations // bands
+        return choose_bands(self.permutations, threshold)
+
+    def near_duplicates(self, signatures: Mapping[str, Any], threshold: float,
+                        bands: int = 0) -> Dict[Pair, float]:
+        """Pairs with estimated similarity ≥ threshold among the LSH candidates.
+        bands=0 picks the banding from the threshold."""
+        bands, rows = self.banding(threshold, bands)
+        estimates = {}
+        for first, second in self.candidates(signatures, bands, rows):
+            estimate = self.similarity(signatures[first], signatures[second])
+            if estimate >= threshold:
+                estimates[(first, second)] = estimate
+        return estimates
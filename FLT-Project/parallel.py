@@ -0,0 +1,252 @@
+"""
+Parallel N-way Operations
+=========================
+Union and intersection of many integer sets on all CPU cores.
+
+Each input is a sorted int64 block (cached per set, or read zero-copy from the
+binary snapshot). The blocks are copied once into a shared memory segment and
+split into shards by value: shard boundaries are quantiles of one input, and
+every block is cut at them with a binary search, so sharding costs
+O(shards · log n) instead of a pass over every member. Worker processes
+attach to the segment by name, so no set is ever pickled. Each combines its
+slice of every input and writes the sorted shard result into the output area
+of the same segment. Shards cover disjoint value ranges, so merging is plain
+concatenation.
+
+check_subsets() uses the same segment layout for many exact A ⊆ B tests at
+once (the subset lattice): the pairs are split into batches, and each worker
+tests its batch against the blocks in shared memory.
+"""
+
+import fnmatch
+import os
+import re
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python 3.7: n-way operations run in-process
+    shared_memory = None
+
+UNION = "union"
+INTERSECTION = "intersection"
+NWAY_OPERATIONS = (UNION, INTERSECTION)
+
+_ITEM = array("q").itemsize
+_RANGE_RE = re.compile(r"([A-Za-z_]\w*?)(\d+)\.\.(?:\1)?(\d+)")
+
+
+def expand_set_names(specs: Iterable[str], available: Iterable[str]) -> List[str]:
+    """Resolve set names, ranges (set1..set40) and glob patterns (set*, s?) in order"""
+    available = list(available)
+    known = set(available)
+    names = {}
+    for spec in specs:
+        if spec in known:
+            names[spec] = None
+            continue
+        match = _RANGE_RE.fullmatch(spec)
+        if match:
+            prefix, first, last = match.group(1), int(match.group(2)), int(match.group(3))
+            step = 1 if last >= first else -1
+            for i in range(first, last + step, step):
+                name = f"{prefix}{i}"
+                if name not in known:
+                    raise ValueError(f"Invalid set name '{name}' (in range {spec})")
+                names[name] = None
+        elif any(ch in spec for ch in "*?["):
+            matched = fnmatch.filter(available, spec)
+            if not matched:
+                raise ValueError(f"No set matches '{spec}'")
+            names.update(dict.fromkeys(matched))
+        else:
+            raise ValueError(f"Invalid set name '{spec}'")
+    return list(names)
+
+
+def sorted_int64_block(values) -> Optional[array]:
+    """Members as a sorted array('q'), or None if any is not an int64"""
+    try:
+        block = array("q", values)
+    except (TypeError, OverflowError):
+        return None
+    return array("q", sorted(block))  # already-sorted input (CompactIntSet) sorts in O(n)
+
+
+def combine(op: str, sets: Sequence) -> object:
+    """In-process n-way union/intersection (smallest-first for intersection)"""
+    ordered = sorted(sets, key=len)
+    if op == INTERSECTION:
+        return ordered[0].intersection(*ordered[1:])
+    return ordered[-1].union(*ordered[:-1])
+
+
+def _combine_blocks(op: str, blocks: List) -> array:
+    """Union/intersection of sorted int64 slices (unordered members)"""
+    blocks = sorted(blocks, key=len)
+    if op == INTERSECTION:
+        result = set(blocks[0])
+        for block in blocks[1:]:
+            if not result:
+                break
+            # Only the part of block inside [min, max] of the candidates matters
+            lo = bisect_left(block, min(result))
+            hi = bisect_left(block, max(result) + 1)
+            result.intersection_update(block[lo:hi])
+    else:
+        result = set()
+        for block in blocks:
+            result.update(block)
+    return array("q", result)
+
+
+def _local_copy(view, start: int, end: int) -> array:
+    # A local copy (memcpy) iterates much faster than the shared view
+    block = array("q")
+    block.frombytes(view[start:end].cast("B"))
+    return block
+
+
+def _run_subset_checks(segment: str, spans: List[Tuple[int, int]], pairs: List[Tuple[int, int]]) -> List[bool]:
+    """Worker: test blocks[i] ⊆ blocks[j] for each pair, blocks in shared memory.
+    Each superset is turned into a set once; issuperset() stops at the first
+    member it misses."""
+    shm = shared_memory.SharedMemory(name=segment)
+    try:
+        view = shm.buf.cast("q")
+        try:
+            supersets: Dict[int, set] = {}
+            results = []
+            for i, j in pairs:
+                (start, end), (other_start, other_end) = spans[i], spans[j]
+                if end - start > other_end - other_start:
+                    results.append(False)
+                    continue
+                if j not in supersets:
+                    supersets = {j: set(_local_copy(view, other_start, other_end))}  # pairs come grouped by j
+                results.append(supersets[j].issuperset(_local_copy(view, start, end)))
+            return results
+        finally:
+            view.release()
+    finally:
+        shm.close()
+
+
+def _run_shard(segment: str, op: str, slices: List[Tuple[int, int]], out_start: int) -> int:
+    """Worker: combine one shard in shared memory, returns the result length"""
+    shm = shared_memory.SharedMemory(name=segment)
+    try:
+        view = shm.buf.cast("q")
+        try:
+            result = _combine_blocks(op, [_local_copy(view, start, end) for start, end in slices])
+            view[out_start:out_start + len(result)] = result
+        finally:
+            view.release()
+    finally:
+        shm.close()
+    return len(result)
+
+
+class ShardedExecutor:
+    """Process pool for n-way operations over range-partitioned shards"""
+
+    def __init__(self, workers: int = 0, shards: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = shards or self.workers * 4
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        """Shared memory exists and there is more than one worker; one worker
+        process would only add the copy and IPC costs to the same serial work"""
+        return shared_memory is not None and self.workers > 1
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _boundaries(self, op: str, blocks: List) -> List[int]:
+        """Shard boundary values: quantiles of the smallest (∩) or largest (∪) block"""
+        pivot = min(blocks, key=len) if op == INTERSECTION else max(blocks, key=len)
+        n = len(pivot)
+        return sorted({pivot[n * i // self.shards] for i in range(1, self.shards)})
+
+    def compute(self, op: str, blocks: List) -> array:
+        """Union/intersection of sorted int64 blocks (array('q') or memoryview).
+        Members come back grouped by shard, not sorted."""
+        if op == INTERSECTION and not all(len(block) for block in blocks):
+            return array("q")
+        bounds = self._boundaries(op, blocks)
+        cuts = [[0] + [bisect_left(block, b) for b in bounds] + [len(block)] for block in blocks]
+        offsets = []
+        pos = 0
+        for block in blocks:
+            offsets.append(pos)
+            pos += len(block)
+        shards = []
+        for i in range(len(bounds) + 1):
+            slices = [(offset + cut[i], offset + cut[i + 1]) for offset, cut in zip(offsets, cuts)]
+            sizes = [end - start for start, end in slices]
+            capacity = min(sizes) if op == INTERSECTION else sum(sizes)
+            if capacity:
+                shards.append((slices, pos, capacity))
+                pos += capacity
+        shm = shared_memory.SharedMemory(create=True, size=max(pos, 1) * _ITEM)
+        try:
+            view = shm.buf.cast("q")
+            try:
+                for offset, block in zip(offsets, blocks):
+                    view[offset:offset + len(block)] = block
+                pool = self._executor()
+                futures = [(pool.submit(_run_shard, shm.name, op, slices, out_start), out_start)
+                           for slices, out_start, _ in shards]
+                result = array("q")
+                for future, out_start in futures:
+                    result.frombytes(view[out_start:out_start + future.result()].cast("B"))
+            finally:
+                view.release()
+        finally:
+            shm.close()
+            shm.unlink()
+        return result
+
+    def check_subsets(self, blocks: List, pairs: List[Tuple[int, int]]) -> List[bool]:
+        """blocks[i] ⊆ blocks[j] for every (i, j) pair, tested by the workers in
+        batches; blocks are sorted int64 blocks as for compute()"""
+        spans = []
+        pos = 0
+        for block in blocks:
+            spans.append((pos, pos + len(block)))
+            pos += len(block)
+        shm = shared_memory.SharedMemory(create=True, size=max(pos, 1) * _ITEM)
+        try:
+            view = shm.buf.cast("q")
+            try:
+                for (start, end), block in zip(spans, blocks):
+                    view[start:end] = block
+                # Pairs sharing their superset land in the same batch, next to each other
+                order = sorted(range(len(pairs)), key=lambda k: (pairs[k][1], pairs[k][0]))
+                size = -(-len(order) // self.shards) if order else 1
+                pool = self._executor()
+                futures = [(pool.submit(_run_subset_checks, shm.name, spans,
+                                        [pairs[k] for k in order[start:start + size]]), start)
+                           for start in range(0, len(order), size)]
+                results = [False] * len(pairs)
+                for future, start in futures:
+                    for k, contained in zip(order[start:start + size], future.result()):
+                        results[k] = contained
+            finally:
+                view.release()
+        finally:
+            shm.close()
+            shm.unlink()
+        return results
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
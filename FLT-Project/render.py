@@ -0,0 +1,91 @@
+"""
+Set Rendering
+=============
+Bounded previews and paged, streamed output of large sets.
+
+Printing a set with str() builds one string of every member, which for
+millions of members takes longer than the operation that produced it. A
+preview reads only the first `limit` members and reports how many were left
+out:
+
+    {1, 2, 3, … (+999,997 more)}
+
+The full contents are written page by page (or all at once) in chunks of
+`chunk_size` members, so no string larger than one chunk is ever built.
+With sort=True members come in ascending order when they are comparable; a
+preview then takes the smallest `limit` members without sorting the rest.
+"""
+
+import heapq
+import sys
+from itertools import islice
+from typing import Callable, Collection, Iterable, Iterator, Optional, Sequence, TextIO
+
+from combinatorics import canonical_order
+
+DEFAULT_LIMIT = 20
+DEFAULT_CHUNK_SIZE = 256
+
+
+def format_members(sample: Sequence, total: int) -> str:
+    """{a, b, c, … (+N more)} for the first members of a collection of `total`"""
+    members = ", ".join(repr(x) for x in sample)
+    if total > len(sample):
+        return f"{{{members}, … (+{total - len(sample):,} more)}}"
+    return f"{{{members}}}"
+
+
+def members(values: Iterable, sort: bool = False) -> Iterator:
+    """Iterate members, in ascending order if sort and they are comparable"""
+    return iter(canonical_order(values)) if sort else iter(values)
+
+
+def preview(values: Collection, limit: int = DEFAULT_LIMIT, sort: bool = False) -> str:
+    """Bounded rendering of a set: at most `limit` members plus the total count"""
+    total = len(values)
+    if sort and total > limit:
+        try:
+            sample = heapq.nsmallest(limit, values)
+        except TypeError:
+            sample = list(islice(values, limit))
+    else:
+        sample = list(islice(members(values, sort), limit))
+    return format_members(sample, total)
+
+
+def stream_members(items: Iterator, out: Optional[TextIO] = None, limit: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write up to `limit` members of an iterator, one comma-separated line per chunk.
+    `out` defaults to the current sys.stdout. Returns the number of members written."""
+    out = out or sys.stdout
+    written = 0
+    while limit is None or written < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - written)
+        chunk = [repr(x) for x in islice(items, size)]
+        if not chunk:
+            break
+        out.write(", ".join(chunk) + "\n")
+        written += len(chunk)
+    out.flush()
+    return written
+
+
+def page_members(values: Collection, page_size: int, offset: int = 0, sort: bool = False,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, out: Optional[TextIO] = None,
+                 ask: Callable[[str], str] = input) -> int:
+    """Interactively page through members from `offset`: [n]ext page, [a]ll
+    (streamed), anything else stops. `out` defaults to the current sys.stdout.
+    Returns how many members were shown."""
+    out = out or sys.stdout
+    total = len(values)
+    items = islice(members(values, sort), offset, None)
+    shown = offset
+    while shown < total:
+        answer = ask(f"➤ Shown {shown:,}/{total:,}. [n]ext page, [a]ll, Enter to stop: ").strip().lower()
+        if answer == "n":
+            shown += stream_members(items, out, page_size, chunk_size)
+        elif answer == "a":
+            shown += stream_members(items, out, None, chunk_size)
+        else:
+            break
+    return shown
@@ -0,0 +1,117 @@
+"""
+Result Cache
+============
+Memoization of two-set operation results, keyed by the operation and the
+version of each input set.
+
+Every mutation of a set bumps its version (SetOperations.mark_changed), which
+drops the cached results computed from the old contents. Commutative
+operations share one entry regardless of argument order. Entries are evicted
+least-recently-used first once their estimated size exceeds a memory budget.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+COMMUTATIVE_OPERATIONS = frozenset(("union", "intersection", "symmetric", "equal"))
+
+# Estimated cost of one member on top of the container (an int object)
+_ELEMENT_BYTES = sys.getsizeof(1 << 40)
+
+CacheKey = Tuple[str, Tuple[str, int], Tuple[str, int]]
+
+
+def result_bytes(result: Any) -> int:
+    """Estimated memory held by a cached result"""
+    nbytes = getattr(result, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    try:
+        return sys.getsizeof(result) + len(result) * _ELEMENT_BYTES
+    except TypeError:
+        return sys.getsizeof(result)
+
+
+class ResultCache:
+    """Version-aware LRU cache with a memory budget (max_bytes=0 disables it)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, int]]" = OrderedDict()
+        self._keys_by_set: Dict[str, Set[CacheKey]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()  # concurrent readers share the cache
+
+    def key(self, op: str, x: str, y: str) -> CacheKey:
+        """Cache key of `x op y` at the sets' current versions"""
+        if op in COMMUTATIVE_OPERATIONS and y < x:
+            x, y = y, x
+        return op, (x, self.versions.get(x, 0)), (y, self.versions.get(y, 0))
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Cached result or None; a hit makes the entry most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: CacheKey, result: Any) -> None:
+        """Cache a result (never mutate it afterwards), evicting LRU entries"""
+        size = result_bytes(result)
+        with self._lock:
+            if size > self.max_bytes or key in self._entries:
+                return
+            if any(self.versions.get(name, 0) != version for name, version in key[1:]):
+                return  # an input changed while this was computed: nobody will ask again
+            self._entries[key] = (result, size)
+            self.bytes += size
+            for name, _ in key[1:]:
+                self._keys_by_set.setdefault(name, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        _, size = self._entries.pop(key)
+        self.bytes -= size
+        for name, _ in key[1:]:
+            keys = self._keys_by_set.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_set[name]
+
+    def bump(self, name: str) -> None:
+        """New version of a set: results computed from it are dropped"""
+        with self._lock:
+            self.versions[name] = self.versions.get(name, 0) + 1
+            for key in list(self._keys_by_set.get(name, ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        """One-line hit/miss and memory statistics"""
+        lookups = self.hits + self.misses
+        rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return (f"🗄 Result cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), "
+                f"{len(self)} entries, {self.bytes / 1024:.1f}/{self.max_bytes / 1024:.0f} KiB, "
+                f"{self.evictions} evicted, {self.invalidations} invalidated")
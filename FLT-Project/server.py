@@ -0,0 +1,167 @@
+"""
+Set Server
+==========
+asyncio TCP server that shares one in-memory SetOperations store between
+many clients over a JSON-lines protocol:
+
+    → {"id": 1, "command": "set1 set2 union"}
+    ← {"id": 1, "op": "union", "ok": true, "size": 4, "result": [1, 2, 3, 41], "ms": 0.021}
+    → {"id": 2, "command": "evens create 2 4 6"}
+    → {"id": 3, "command": "set* intersection", "limit": 0}
+
+Commands are the batch mode commands (see batch.py), so every operation goes
+through the same SetOperations code paths as the menu. "limit" caps how many
+members are returned (default: server_result_limit); bigger results report
+their size only. Commands that read or write files on the server (addfile,
+removefile, create @file, lattice FORMAT PATH, export) are refused.
+
+Requests on one connection are pipelined: up to `pipeline_depth` of them are
+read ahead and queued for execution while earlier responses are still being
+written, and responses always come back in request order. Commands run on a
+single store thread, in arrival order, so the event loop never executes set
+operations and commands from different clients never interleave. Responses
+are written in slices of `write_chunk` bytes, waiting for the socket to drain
+after each; a client that stops reading fills its pipeline and the server
+stops reading its requests until it catches up.
+"""
+
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from batch import BatchRunner, result_record
+
+
+class SetServer:
+    """JSON-lines TCP front end for a SetOperations instance"""
+
+    def __init__(self, set_ops, pipeline_depth: int = 32, write_chunk: int = 65536,
+                 result_limit: int = 100000, max_request_bytes: int = 1 << 20):
+        self.runner = BatchRunner(set_ops, output="quiet", out=io.StringIO(),
+                                  result_limit=result_limit, allow_files=False)
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.write_chunk = max(1, write_chunk)
+        self.max_request_bytes = max_request_bytes
+        self.connections = 0
+        self._store = ThreadPoolExecutor(max_workers=1, thread_name_prefix="set-store")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.Task] = set()
+        self._started = time.perf_counter()
+
+    # --- request handling (store thread) -----------------------------------
+    def handle(self, line: bytes) -> bytes:
+        """Execute one request line; returns the encoded response line"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or not isinstance(request.get("command"), str):
+                raise ValueError('expected {"command": "..."}')
+        except ValueError as e:
+            return self._encode({"id": None, "ok": False, "error": f"Invalid request: {e}"})
+        limit = request.get("limit", self.runner.result_limit)
+        try:
+            op, result, seconds, error = self.runner.execute_line(request["command"])
+        except Exception as e:  # a failing command must not take the connection down
+            op, result, seconds, error = "invalid", None, 0.0, f"Internal error: {e!r}"
+        if error is not None:
+            record = {"id": request.get("id"), "op": op, "ok": False, "error": error}
+        else:
+            record = {"id": request.get("id")}
+            record.update(result_record(op, result, limit if isinstance(limit, int) else 0))
+            record["ms"] = round(seconds * 1000, 3)
+        return self._encode(record)
+
+    @staticmethod
+    def _encode(record) -> bytes:
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    # --- connections (event loop) -----------------------------------------
+    async def _respond(self, writer: asyncio.StreamWriter, pending: asyncio.Queue):
+        """Write responses in request order, draining after every slice"""
+        broken = False
+        while True:
+            future = await pending.get()
+            if future is None:
+                return
+            data = await future
+            if broken:
+                continue  # keep consuming so the reader never blocks on a full pipeline
+            try:
+                for start in range(0, len(data), self.write_chunk):
+                    writer.write(data[start:start + self.write_chunk])
+                    await writer.drain()
+            except ConnectionError:
+                broken = True
+                writer.close()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients.add(task)
+        loop = asyncio.get_running_loop()
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_depth)
+        responder = loop.create_task(self._respond(writer, pending))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than the stream limit: answer once and hang up
+                    rejected = loop.create_future()
+                    rejected.set_result(self._encode({"id": None, "ok": False, "error":
+                                                      f"Request exceeds {self.max_request_bytes} bytes"}))
+                    await pending.put(rejected)
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await pending.put(loop.run_in_executor(self._store, self.handle, line))
+            await pending.put(None)
+            await responder
+        except asyncio.CancelledError:
+            responder.cancel()  # server shutting down; nothing is waiting on this handler
+        finally:
+            self._clients.discard(task)
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> int:
+        """Start listening; returns the bound port (useful with port=0)"""
+        self._server = await asyncio.start_server(self._serve_client, host, port,
+                                                  limit=self.max_request_bytes)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self, grace: float = 1.0) -> None:
+        """Stop listening; open connections get `grace` seconds to finish"""
+        if self._server is None:
+            return
+        self._server.close()
+        if self._clients:
+            _, lingering = await asyncio.wait(set(self._clients), timeout=grace)
+            for task in lingering:
+                task.cancel()
+            await asyncio.gather(*lingering, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def close(self) -> None:
+        """Finish queued commands and stop the store thread"""
+        self._store.shutdown(wait=True)
+
+    def summary(self) -> str:
+        """Per-operation timings since the server was created"""
+        self.runner.elapsed = time.perf_counter() - self._started
+        return self.runner.summary("Server summary")
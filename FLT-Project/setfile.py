@@ -0,0 +1,269 @@
+"""
+Set File Parser
+===============
+Incremental, safe parser for the set definition file format (a.txt):
+
+    # comment
+    set1 = {1, 2, 3}
+    empty = set()
+
+The file is read in fixed-size chunks and decoded incrementally, so memory is
+bounded by the largest chunk rather than the file. Integer-only literals (the
+common case) are split and converted in bulk with str.split + int, which keeps
+loading close to I/O speed. Literals containing quoted strings or nested
+values (the tuples write_set_file() writes for Cartesian products) fall back
+to ast.literal_eval on that one literal, as do single elements that are not
+plain numbers. Nothing is ever executed as code.
+"""
+
+import ast
+import codecs
+import os
+import re
+from typing import Callable, Dict, Iterator, Mapping, Optional, Set, Tuple
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+FILE_HEADER = "#Define your sets like this --> set1 = {1, 2, 3}, set2 = {99, 22, 12125}, ...\n\n"
+
+# Whitespace and comment lines between definitions
+_SKIP_RE = re.compile(r"(?:[ \t\r\n]+|#[^\n]*)*")
+_HEADER_RE = re.compile(r"([A-Za-z_]\w*)[ \t]*=[ \t]*(\{|set\([ \t]*\))")
+# Optional trailing comment after a closing brace
+_TRAILER_RE = re.compile(r"[ \t\r]*(?:#[^\n]*)?")
+# Characters that only occur in literals needing ast.literal_eval
+_NESTED_CHARS = ("'", '"', "(", "[", "{")
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class SetFileError(ValueError):
+    """Syntax error in a set definition file, with 1-based line and column"""
+
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"{message} (line {line}, column {column})")
+        self.line = line
+        self.column = column
+
+
+def _parse_token(token: str):
+    """Convert one literal element that is not a plain int"""
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(token)
+        hash(value)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise ValueError(token) from None
+    return value
+
+
+class _Reader:
+    """Chunked text buffer that remembers the line/column of its first char"""
+
+    def __init__(self, stream, total: int, chunk_size: int,
+                 progress: Optional[ProgressCallback]):
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self.total = total
+        self.bytes_read = 0
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._line = 1
+        self._column = 1
+
+    def fill(self) -> bool:
+        """Drop consumed text and append the next chunk; False at EOF"""
+        if self.eof:
+            return False
+        consumed = self.buf[:self.pos]
+        newlines = consumed.count("\n")
+        if newlines:
+            self._line += newlines
+            self._column = len(consumed) - consumed.rfind("\n")
+        else:
+            self._column += len(consumed)
+        raw = self._stream.read(self._chunk_size)
+        self.bytes_read += len(raw)
+        self.buf = self.buf[self.pos:] + self._decoder.decode(raw, final=not raw)
+        self.pos = 0
+        if not raw:
+            self.eof = True
+        if self._progress is not None:
+            self._progress(self.bytes_read, self.total)
+        return True
+
+    def location(self, offset: int) -> Tuple[int, int]:
+        """Line and column of a buffer offset"""
+        newlines = self.buf.count("\n", 0, offset)
+        if newlines:
+            return self._line + newlines, offset - self.buf.rfind("\n", 0, offset)
+        return self._line, self._column + offset
+
+    def error(self, message: str, offset: int) -> SetFileError:
+        line, column = self.location(offset)
+        return SetFileError(message, line, column)
+
+
+def _add_ints(reader: _Reader, elements: Set, start: int, end: int, final: bool) -> None:
+    """Add the comma separated elements in buf[start:end] to elements.
+
+    final=True means the text runs up to the closing brace, where a single
+    trailing comma (an empty last token) is allowed.
+    """
+    parts = reader.buf[start:end].split(",")
+    try:
+        elements.update(map(int, parts))
+        return
+    except ValueError:
+        pass
+    # Slow path: floats, a trailing comma or empty literal, or a syntax error
+    offset = start
+    last = len(parts) - 1
+    for i, part in enumerate(parts):
+        token = part.strip()
+        if token:
+            try:
+                elements.add(_parse_token(token))
+            except ValueError:
+                bad = offset + len(part) - len(part.lstrip())
+                raise reader.error(f"Invalid set element {token!r}", bad) from None
+        elif not (final and i == last):
+            raise reader.error("Empty set element", offset)
+        offset += len(part) + 1
+
+
+def _find_literal_end(reader: _Reader, start: int) -> int:
+    """Offset of the '}' closing a literal that contains quoted strings or
+    nested tuples, lists and sets"""
+    quote = None
+    depth = 0
+    i = start
+    while True:
+        buf = reader.buf
+        while i < len(buf):
+            ch = buf[i]
+            if quote:
+                if ch == "\\":
+                    i += 1
+                elif ch == quote:
+                    quote = None
+            elif ch in "'\"":
+                quote = ch
+            elif ch in "([{":
+                depth += 1
+            elif ch in ")]":
+                depth -= 1
+            elif ch == "}":
+                if not depth:
+                    return i
+                depth -= 1
+            i += 1
+        # Keep the whole literal in the buffer: remember offsets relative to pos
+        pos = reader.pos
+        if not reader.fill():
+            raise reader.error("Unterminated set literal", start)
+        i, start = i - pos, start - pos
+
+
+def iter_set_file(stream, total: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  progress: Optional[ProgressCallback] = None) -> Iterator[Tuple[str, Set]]:
+    """Yield (name, elements) for each definition in a binary stream"""
+    reader = _Reader(stream, total, chunk_size, progress)
+    reader.fill()
+    while True:
+        # Between definitions: skip blanks/comments, then read `name = {` or `name = set()`
+        while True:
+            skipped = _SKIP_RE.match(reader.buf, reader.pos).end()
+            if skipped == len(reader.buf) and not reader.eof:
+                reader.fill()  # a comment may continue in the next chunk
+                continue
+            reader.pos = skipped
+            header = _HEADER_RE.match(reader.buf, reader.pos)
+            if (header and header.end() < len(reader.buf)) or reader.eof \
+                    or reader.buf.find("\n", reader.pos) != -1:
+                break
+            reader.fill()
+        if reader.pos >= len(reader.buf):
+            return
+        if not header:
+            raise reader.error("Expected 'name = {...}' definition", reader.pos)
+        name = header.group(1)
+        reader.pos = header.end()
+        elements: Set = set()
+
+        if header.group(2) == "{":
+            while True:
+                buf = reader.buf
+                close = buf.find("}", reader.pos)
+                chunk_end = close if close != -1 else len(buf)
+                segment = buf[reader.pos:chunk_end]
+                if any(ch in segment for ch in _NESTED_CHARS):
+                    start = reader.pos
+                    close = _find_literal_end(reader, start)
+                    start = reader.pos
+                    try:
+                        elements.update(ast.literal_eval("{" + reader.buf[start:close] + "}"))
+                    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                        raise reader.error("Invalid set literal", start) from None
+                    reader.pos = close + 1
+                    break
+                if close != -1:
+                    _add_ints(reader, elements, reader.pos, close, final=True)
+                    reader.pos = close + 1
+                    break
+                # No closing brace yet: consume up to the last complete element
+                comma = buf.rfind(",", reader.pos)
+                if comma != -1:
+                    _add_ints(reader, elements, reader.pos, comma, final=False)
+                    reader.pos = comma + 1
+                if not reader.fill():
+                    raise reader.error("Unterminated set literal", reader.pos)
+
+        while True:
+            end = _TRAILER_RE.match(reader.buf, reader.pos).end()
+            if end < len(reader.buf) or reader.eof:
+                break
+            reader.fill()
+        reader.pos = end
+        if reader.pos < len(reader.buf) and reader.buf[reader.pos] != "\n":
+            raise reader.error("Unexpected text after set definition", reader.pos)
+        yield name, elements
+
+
+def iter_set_file_path(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       progress: Optional[ProgressCallback] = None) -> Iterator[Tuple[str, Set]]:
+    """Yield (name, elements) for each definition in a set file on disk"""
+    total = os.path.getsize(file_path)
+    with open(file_path, "rb") as stream:
+        yield from iter_set_file(stream, total, chunk_size, progress)
+
+
+def load_set_file(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  progress: Optional[ProgressCallback] = None) -> Dict[str, Set]:
+    """Parse a whole set definition file into {name: elements}"""
+    return dict(iter_set_file_path(file_path, chunk_size, progress))
+
+
+def write_set_file(file_path: str, sets: Mapping[str, Set]) -> None:
+    """Atomically replace file_path with a snapshot of sets.
+
+    The snapshot is written to a temporary file, fsynced and renamed over the
+    old one, so readers only ever see a complete file.
+    """
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(FILE_HEADER)
+        for name, set_data in sets.items():
+            f.write(f"{name} = {set_data}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
@@ -0,0 +1,209 @@
+"""
+Binary Snapshot Store
+=====================
+Memory-mapped binary snapshot format with lazy, per-set loading.
+
+Layout (little-endian):
+
+    header   b"SETSNAP1", u32 set count, u32 reserved
+    index    per set: u16 name length, name (UTF-8), u8 kind, 7 pad bytes,
+             u64 cardinality, u64 data offset, u64 data length
+    data     8-byte aligned blocks, one per set
+
+Integer sets (kind 0) are stored as sorted int64 blocks that are exposed
+through mmap as zero-copy memoryviews. Any other set (kind 1) is stored as
+a set literal and read back with the safe set file parser. Only the index is
+read when a snapshot is opened, so startup time does not depend on the data
+size, and LazySets loads each set on first access.
+"""
+
+import io
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Mapping, NamedTuple, Optional, Set, Union
+
+from setfile import iter_set_file
+
+MAGIC = b"SETSNAP1"
+_HEADER = struct.Struct("<8sII")
+_NAME_LEN = struct.Struct("<H")
+_ENTRY = struct.Struct("<B7xQQQ")
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+KIND_INT64 = 0
+KIND_LITERAL = 1
+
+_LITTLE_ENDIAN = array("H", [1]).tobytes() == b"\x01\x00"
+
+
+class SnapshotError(ValueError):
+    """The file is not a valid binary snapshot"""
+
+
+class SnapshotEntry(NamedTuple):
+    """Index record of one set inside a snapshot"""
+    kind: int
+    cardinality: int
+    offset: int
+    length: int
+
+
+def _encode(set_data: Set):
+    """Pick the block kind for a set and return (kind, payload bytes)"""
+    if all(type(x) is int and _INT64_MIN <= x <= _INT64_MAX for x in set_data):
+        block = array("q", sorted(set_data))
+        if not _LITTLE_ENDIAN:
+            block.byteswap()
+        return KIND_INT64, block.tobytes()
+    return KIND_LITERAL, f"_ = {set_data}\n".encode("utf-8")
+
+
+class SnapshotReader:
+    """Read-only view of a snapshot file; data blocks stay in the page cache"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise SnapshotError(f"{path} is too small to be a snapshot")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"{path} is not a binary set snapshot")
+        self.entries: Dict[str, SnapshotEntry] = {}
+        pos = _HEADER.size
+        for _ in range(count):
+            (name_len,) = _NAME_LEN.unpack_from(self._map, pos)
+            pos += _NAME_LEN.size
+            name = bytes(self._map[pos:pos + name_len]).decode("utf-8")
+            pos += name_len
+            self.entries[name] = SnapshotEntry(*_ENTRY.unpack_from(self._map, pos))
+            pos += _ENTRY.size
+
+    def raw(self, name: str) -> memoryview:
+        """Zero-copy bytes of a set's data block"""
+        entry = self.entries[name]
+        return memoryview(self._map)[entry.offset:entry.offset + entry.length]
+
+    def block(self, name: str) -> Union[memoryview, array]:
+        """Sorted int64 members of an integer set (zero-copy on little-endian hosts)"""
+        raw = self.raw(name)
+        if _LITTLE_ENDIAN:
+            return raw.cast("q")
+        block = array("q", raw.tobytes())
+        block.byteswap()
+        return block
+
+    def load(self, name: str):
+        """Members of a set as an iterable with len() (int64 view or a set)"""
+        entry = self.entries[name]
+        if entry.kind == KIND_INT64:
+            return self.block(name)
+        stream = io.BytesIO(self.raw(name).tobytes())
+        for _, elements in iter_set_file(stream):
+            return elements
+        return set()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def write_snapshot(path: str, sets: Mapping[str, object],
+                   source: Optional[SnapshotReader] = None) -> None:
+    """Atomically write a snapshot of sets to path.
+
+    A value may also be a SnapshotEntry of `source`, in which case its block is
+    copied byte for byte without decoding it (used for sets never loaded).
+    """
+    names = list(sets)
+    encoded_names = [name.encode("utf-8") for name in names]
+    index_size = _HEADER.size + sum(_NAME_LEN.size + len(n) + _ENTRY.size for n in encoded_names)
+    tmp_path = path + ".tmp"
+    entries = []
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * index_size)
+        pos = index_size
+        for name in names:
+            value = sets[name]
+            padding = -pos % 8
+            f.write(b"\0" * padding)
+            pos += padding
+            if isinstance(value, SnapshotEntry):
+                payload = source.raw(name)
+                kind, cardinality = value.kind, value.cardinality
+            else:
+                kind, payload = _encode(value)
+                cardinality = len(value)
+            f.write(payload)
+            entries.append((kind, cardinality, pos, len(payload)))
+            pos += len(payload)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, len(names), 0))
+        for encoded, entry in zip(encoded_names, entries):
+            f.write(_NAME_LEN.pack(len(encoded)))
+            f.write(encoded)
+            f.write(_ENTRY.pack(*entry))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class LazySets(MutableMapping):
+    """Name -> set mapping backed by a snapshot; sets load on first access"""
+
+    def __init__(self, reader: SnapshotReader, make_set: Callable = set):
+        self.reader = reader
+        self._make_set = make_set
+        self._loaded: Dict[str, object] = {}
+        # Insertion order: snapshot names first, then newly created sets
+        self._names: Dict[str, None] = dict.fromkeys(reader.entries)
+
+    def __getitem__(self, name: str):
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        if name not in self._names:
+            raise KeyError(name)
+        value = self._make_set(self.reader.load(name))
+        self._loaded[name] = value
+        return value
+
+    def __setitem__(self, name: str, value) -> None:
+        self._loaded[name] = value
+        self._names[name] = None
+
+    def __delitem__(self, name: str) -> None:
+        del self._names[name]
+        self._loaded.pop(name, None)
+
+    def __contains__(self, name) -> bool:
+        return name in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def cardinality(self, name: str) -> int:
+        """|name| from the snapshot index, without loading the set"""
+        if name in self._loaded:
+            return len(self._loaded[name])
+        return self.reader.entries[name].cardinality
+
+    def snapshot_items(self) -> Dict[str, object]:
+        """Copies of loaded sets plus index entries of untouched ones,
+        ready for write_snapshot(..., source=self.reader)"""
+        return {name: self._loaded[name].copy() if name in self._loaded else self.reader.entries[name]
+                for name in self._names}
@@ -0,0 +1,143 @@
+"""
+Versioned Set Store
+===================
+Snapshot-isolated name → set mapping for concurrent readers and writers.
+
+Published sets are never modified. A writer copies the set it changes,
+applies the change to the copy and publishes a new version of the whole
+name → set table with a single reference swap (copy-on-write). Readers take
+no lock: a set can never change size while it is being iterated, and
+snapshot() pins one committed version so several sets can be read
+consistently. Writers are serialized by `write_lock`, which readers never
+touch, and commit() replaces several sets in one atomic step.
+
+The store wraps the mapping the sets were loaded into: a dict, or LazySets
+backed by the binary snapshot. Sets the base has not loaded yet are loaded on
+first read. The base is never written after wrapping, so what it loads is the
+committed content of every version that has not replaced that set.
+"""
+
+import threading
+from collections.abc import Mapping, MutableMapping
+from typing import Callable, Dict, Iterator, Optional
+
+from snapshot import LazySets, SnapshotEntry, SnapshotReader
+
+# Table value of a set that is still only in the base's snapshot file
+_UNLOADED = object()
+
+
+class SetsView(Mapping):
+    """One committed version of the store (read-only, never changes)"""
+
+    def __init__(self, table: Dict[str, object], base: Mapping, version: int):
+        self._table = table
+        self._base = base
+        self.version = version
+
+    def __getitem__(self, name: str):
+        value = self._table[name]
+        if value is _UNLOADED:
+            value = self._base[name]
+        return value
+
+    def __contains__(self, name) -> bool:
+        return name in self._table
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+class VersionedSets(MutableMapping):
+    """Copy-on-write name → set store with lock-free, snapshot-isolated reads"""
+
+    def __init__(self, base: MutableMapping):
+        self._base = base
+        lazy = isinstance(base, LazySets)
+        table = {name: _UNLOADED if lazy and not base.is_loaded(name) else base[name] for name in base}
+        self._view = SetsView(table, base, 0)
+        self.write_lock = threading.RLock()
+
+    # --- reads (lock-free) ------------------------------------------------
+    def snapshot(self) -> SetsView:
+        """The current committed version; later commits do not affect it"""
+        return self._view
+
+    @property
+    def version(self) -> int:
+        return self._view.version
+
+    def __getitem__(self, name: str):
+        return self._view[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._view
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._view)
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    # --- writes (serialized) ----------------------------------------------
+    def _publish(self, table: Dict[str, object]) -> None:
+        self._view = SetsView(table, self._base, self._view.version + 1)
+
+    def commit(self, changes: Mapping) -> int:
+        """Atomically replace (or add) several sets; returns the new version"""
+        with self.write_lock:
+            table = dict(self._view._table)
+            table.update(changes)
+            self._publish(table)
+            return self._view.version
+
+    def modify(self, name: str, change: Callable[[object], None]):
+        """Apply change() to a copy of a set and publish it; returns the new set.
+        A CompactIntSet copy shares its containers, so a small change costs
+        its chunk table and the chunks it touches; a plain set is copied whole."""
+        with self.write_lock:
+            updated = self._view[name].copy()
+            change(updated)
+            self.commit({name: updated})
+            return updated
+
+    def __setitem__(self, name: str, value) -> None:
+        self.commit({name: value})
+
+    def __delitem__(self, name: str) -> None:
+        with self.write_lock:
+            table = dict(self._view._table)
+            del table[name]
+            self._publish(table)
+
+    # --- snapshot-file integration ----------------------------------------
+    @property
+    def reader(self) -> Optional[SnapshotReader]:
+        """The binary snapshot the base was opened from, if any"""
+        return getattr(self._base, "reader", None)
+
+    def unloaded_entry(self, name: str, view: Optional[SetsView] = None) -> Optional[SnapshotEntry]:
+        """Snapshot index entry of a set that has never been loaded, else None"""
+        if view is None:
+            view = self._view
+        if view._table[name] is _UNLOADED and not self._base.is_loaded(name):
+            return self._base.reader.entries[name]
+        return None
+
+    def is_loaded(self, name: str) -> bool:
+        return self.unloaded_entry(name) is None
+
+    def cardinality(self, name: str) -> int:
+        """|name| without loading a set that is still in the snapshot file"""
+        entry = self.unloaded_entry(name)
+        return entry.cardinality if entry is not None else len(self._view[name])
+
+    def snapshot_items(self) -> Dict[str, object]:
+        """Sets of the current version for a snapshot writer; never-loaded sets
+        are passed as index entries so write_snapshot copies their blocks.
+        Published sets are immutable, so no copies are needed."""
+        view = self._view
+        return {name: self.unloaded_entry(name, view) or view[name] for name in view}
@@ -110,17 +110,2104 @@ def run_edge_case_tests():
     print(f"\n📊 Edge Case Results: {passed}/{total} tests passed")
     return passed == total
 
+def run_power_set_tests():
+    """Test the lazy power set engine"""
+    print(f"\n🔢 POWER SET TESTS")
+    print("=" * 20)
+    
+    import io
+    from contextlib import redirect_stdout
+    from combinatorics import iter_power_set, power_set_size, stream_power_set
+    
+    A = {1, 2, 3, 4}
+    gray = list(iter_power_set(A))
+    binary = list(iter_power_set(A, order="binary"))
+    out = io.StringIO()
+    written = stream_power_set(A, out=out, offset=5, limit=4, chunk_size=3)
+    with redirect_stdout(io.StringIO()) as redirected:
+        stream_power_set(A, limit=2)
+    
+    ps_tests = [
+        ("Gray order covers all subsets", sorted(map(sorted, gray)), sorted(map(sorted, binary))),
+        ("Gray order size", len(gray), power_set_size(A)),
+        ("Gray steps flip one element", all(len(a ^ b) == 1 for a, b in zip(gray, gray[1:])), True),
+        ("Paged start matches full run", list(iter_power_set(A, start=5, stop=9)), gray[5:9]),
+        ("Stream writes one page", (written, len(out.getvalue().splitlines())), (4, 4)),
+        ("Stream defaults to current stdout", len(redirected.getvalue().splitlines()), 2),
+        ("Empty set power set", list(iter_power_set(set())), [set()]),
+    ]
+    
+    passed = 0
+    total = len(ps_tests)
+    
+    for test_name, result, expected in ps_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Power Set Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_cartesian_tests():
+    """Test the lazy Cartesian product engine"""
+    print(f"\n🔗 CARTESIAN PRODUCT TESTS")
+    print("=" * 26)
+    
+    import io
+    from contextlib import redirect_stdout
+    from combinatorics import CartesianProduct
+    
+    A, B, C = {1, 2, 3}, {"x", "y"}, {7, 8}
+    product = CartesianProduct(A, B)
+    triple = CartesianProduct(A, B, C)
+    expected_pairs = [(a, b) for a in sorted(A) for b in sorted(B)]
+    out = io.StringIO()
+    written = triple.stream(out=out, offset=4, limit=5, chunk_size=2)
+    with redirect_stdout(io.StringIO()) as redirected:
+        triple.stream(limit=3)
+    
+    cart_tests = [
+        ("Size without materializing", CartesianProduct(range(100000), range(100000)).size, 10 ** 10),
+        ("Pairs in lexicographic order", list(product), expected_pairs),
+        ("Random access by index", product[3], expected_pairs[3]),
+        ("Page matches full run", triple.page(4, 5), list(triple)[4:9]),
+        ("Stream writes one page", (written, len(out.getvalue().splitlines())), (5, 5)),
+        ("Stream defaults to current stdout", len(redirected.getvalue().splitlines()), 3),
+        ("Empty factor gives empty product", (CartesianProduct(A, set()).size, list(CartesianProduct(A, set()))), (0, [])),
+    ]
+    
+    passed = 0
+    total = len(cart_tests)
+    
+    for test_name, result, expected in cart_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Cartesian Product Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_bitmap_tests():
+    """Test the compact bitmap backend against built-in sets"""
+    print(f"\n🧮 COMPACT BITMAP TESTS")
+    print("=" * 23)
+    
+    from bitmap import CompactIntSet, prefers_compact
+    
+    # Dense range (bitmap containers), sparse values (array containers), negatives
+    a = set(range(0, 200000, 3)) | {-5, 10 ** 9}
+    b = set(range(100000, 300000, 2)) | {7, -5}
+    A, B = CompactIntSet(a), CompactIntSet(b)
+    grown = CompactIntSet(a)
+    grown.add(1)
+    grown.remove(0)
+    # Copies share containers: changing one must leave the other untouched
+    original = CompactIntSet(a)
+    copied = original.copy()
+    for x in (-6, 3, 10 ** 9 + 1, 70001):
+        copied.add(x)
+    for x in (-5, 0, 10 ** 9):
+        copied.discard(x)
+    merged = A.union({-7, 10 ** 9 + 2})
+    merged.discard(-5)
+    
+    bitmap_tests = [
+        ("Union A ∪ B", A.union(B), a | b),
+        ("Intersection A ∩ B", A.intersection(B), a & b),
+        ("Difference A - B", A - B, a - b),
+        ("Difference with plain set", a - B, a - b),
+        ("Symmetric Diff A ⊕ B", A.symmetric_difference(B), a ^ b),
+        ("(A ∩ B) ⊆ A", CompactIntSet(a & b).issubset(A), True),
+        ("A ⊆ B", A.issubset(B), False),
+        ("Equal to source set", (A == a, len(A)), (True, len(a))),
+        ("Add/remove", grown, (a | {1}) - {0}),
+        ("Changing a copy keeps the original",
+         (set(original) == a, set(copied) == (a | {-6, 3, 10 ** 9 + 1, 70001}) - {-5, 0, 10 ** 9}), (True, True)),
+        ("Changing a result keeps its inputs", (set(A) == a, set(merged) == (a | {-7, 10 ** 9 + 2}) - {-5}),
+         (True, True)),
+        ("Sorted iteration", list(CompactIntSet({5, -1, 70000})), [-1, 5, 70000]),
+        ("Repr round-trips", eval(repr(A)) == a, True),
+        ("Backend choice: dense ints", prefers_compact(set(range(5000)), 1024, 32), True),
+        ("Backend choice: strings", prefers_compact({str(i) for i in range(5000)}, 1024, 32), False),
+    ]
+    
+    passed = 0
+    total = len(bitmap_tests)
+    
+    for test_name, result, expected in bitmap_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED")
+    
+    print(f"\n📊 Compact Bitmap Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_array_engine_tests():
+    """Test that the NumPy engine matches the regular set backend"""
+    print(f"\n🚀 ARRAY ENGINE TESTS")
+    print("=" * 21)
+    
+    from arrayengine import ArrayEngine
+    
+    engine = ArrayEngine()
+    if not engine.available:
+        print("⚠ NumPy not installed, skipping array engine tests")
+        return True
+    
+    sets = {
+        'A': set(range(0, 20000, 2)) | {-7, 2 ** 40},
+        'B': set(range(0, 30000, 3)),
+        'C': {4, 6, 8},
+        'F': {1.5, 2},
+    }
+    operations = {
+        "union": lambda a, b: a.union(b),
+        "intersection": lambda a, b: a.intersection(b),
+        "difference": lambda a, b: a - b,
+        "symmetric": lambda a, b: a.symmetric_difference(b),
+        "subset": lambda a, b: a.issubset(b),
+        "equal": lambda a, b: a == b,
+    }
+    
+    engine_tests = []
+    for x, y in [('A', 'B'), ('B', 'A'), ('C', 'A'), ('A', 'C')]:
+        for op, func in operations.items():
+            engine_tests.append((f"{x} {op} {y}", engine.compute(op, x, sets[x], y, sets[y]), func(sets[x], sets[y])))
+    engine_tests.append(("Non-integer set is ineligible", engine.compute("union", 'F', sets['F'], 'C', sets['C']), None))
+    sets['C'].add(10)
+    engine.invalidate('C')
+    engine_tests.append(("Cache invalidated after change", engine.compute("subset", 'C', sets['C'], 'A', sets['A']), True))
+    
+    passed = 0
+    total = len(engine_tests)
+    
+    for test_name, result, expected in engine_tests:
+        if result == expected:
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED")
+    
+    print(f"✅ {passed} engine results identical to the set backend")
+    print(f"\n📊 Array Engine Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_set_file_tests():
+    """Test the incremental set file parser"""
+    print(f"\n📄 SET FILE PARSER TESTS")
+    print("=" * 24)
+    
+    import io
+    import os
+    import tempfile
+    from setfile import SetFileError, iter_set_file, load_set_file, write_set_file
+    
+    def parse(text, chunk_size=5):
+        return dict(iter_set_file(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size))
+    
+    def error_location(text):
+        try:
+            parse(text)
+        except SetFileError as e:
+            return (e.line, e.column)
+        return None
+    
+    sample = ("#Define your sets like this --> set1 = {1, 2, 3}\n\n"
+              "set1 = {1, 2, 3}\nset2 = {10, -20,\n  30}  # comment\n"
+              "empty = set()\nmixed = {'a,}', 2.5}\n")
+    expected = {'set1': {1, 2, 3}, 'set2': {10, -20, 30}, 'empty': set(), 'mixed': {'a,}', 2.5}}
+    progress = []
+    list(iter_set_file(io.BytesIO(sample.encode('utf-8')), total=len(sample), chunk_size=16,
+                       progress=lambda done, total: progress.append(done)))
+    
+    # Cartesian products are stored as sets of tuples
+    saved = {'p': {(1, 2), (3, 4)}, 'q': {(1, 'x'), (2, 'y}')}, 'n': {5, 6}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'a.txt')
+        write_set_file(path, saved)
+        reloaded = load_set_file(path, chunk_size=4)
+    
+    parser_tests = [
+        ("Parses all definitions", parse(sample), expected),
+        ("Tuples survive save and reload", reloaded, saved),
+        ("Other literals", parse("a = {True, None, (1, (2, 3))}\n"), {'a': {True, None, (1, (2, 3))}}),
+        ("Chunk size does not matter", parse(sample, chunk_size=1), expected),
+        ("Large literal", parse(f"big = {set(range(5000))}\n", chunk_size=64), {'big': set(range(5000))}),
+        ("Progress reaches file size", progress[-1], len(sample)),
+        ("Bad element location", error_location("a = {1, 2}\nb = {3, x}\n"), (2, 9)),
+        ("Code is rejected", error_location("import os\n"), (1, 1)),
+        ("Unterminated literal", error_location("a = {1, 2\n") is not None, True),
+    ]
+    
+    passed = 0
+    total = len(parser_tests)
+    
+    for test_name, result, expected_result in parser_tests:
+        if result == expected_result:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected_result}, Got: {result})")
+    
+    print(f"\n📊 Set File Parser Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_journal_tests():
+    """Test journal append, replay and rotation"""
+    print(f"\n📝 JOURNAL TESTS")
+    print("=" * 16)
+    
+    import io
+    import tempfile
+    import time
+    from contextlib import redirect_stdout
+    import main as app
+    from journal import ADD, CREATE, REMOVE, Journal, JournalError
+    
+    def replay(journal, base=""):
+        state = {}
+        def apply(op, name, elements):
+            if op == CREATE:
+                state[name] = set(elements)
+            elif op == ADD:
+                state.setdefault(name, set()).update(elements)
+            elif op == REMOVE and name in state:
+                state[name].difference_update(elements)
+        try:
+            count = journal.replay(apply, base)
+        except JournalError:
+            return "refused", state
+        return count, state
+    
+    def restart(edit):
+        """Binary snapshots: create `big` and save it to a.snap, journal set1 + 777,
+        run edit(dir), then start again; returns (big, set1) or the load error"""
+        script_dir, settings = app.SCRIPT_DIR, dict(app.SETTINGS)
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()):
+            app.SCRIPT_DIR = tmp
+            app.SETTINGS.update(snapshot_format="binary", history_file="", views_file="")
+            try:
+                with open(os.path.join(tmp, "a.txt"), "w", encoding="utf-8") as f:
+                    f.write("set1 = {1, 2, 3}\n")
+                ops = app.SetOperations()
+                ops.replace_set("big", {5, 6})
+                ops.save_sets_to_file()
+                ops.add_elements("set1", [777])
+                ops.close()
+                edit(tmp)
+                try:
+                    fresh = app.SetOperations()
+                except SystemExit:
+                    return "refused"
+                fresh.close()
+                return set(fresh.sets["big"]), set(fresh.sets["set1"])
+            finally:
+                app.SCRIPT_DIR = script_dir
+                app.SETTINGS.clear()
+                app.SETTINGS.update(settings)
+    
+    def touch_text(tmp):
+        later = time.time() + 5
+        with open(os.path.join(tmp, "a.txt"), "a", encoding="utf-8") as f:
+            f.write("set4 = {9}\n")
+        os.utime(os.path.join(tmp, "a.txt"), (later, later))
+    
+    def snapshot_deleted(tmp):
+        os.remove(os.path.join(tmp, "a.snap"))
+    
+    def text_moved(tmp):
+        os.remove(os.path.join(tmp, "a.txt"))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'a.journal')
+        journal = Journal(path, fsync_batch=2)
+        journal.append(CREATE, 'A', [1, 2, 3])
+        journal.append(ADD, 'A', [4])
+        journal.rotate()
+        journal.append(REMOVE, 'A', [1])
+        journal.close()
+        after_rotation = replay(journal)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('["add","A",[9')  # torn write from a crash
+        after_crash = replay(journal)
+        journal.discard_rotated()
+        after_discard = replay(journal)
+        journal.reset()
+        after_reset = replay(journal)
+        
+        based = Journal(os.path.join(tmp, 'b.journal'), base='a.snap')
+        based.append(ADD, 'A', [1])
+        based.close()
+        own_base = replay(based, 'a.snap')
+        other_base = replay(based, 'a.txt')
+        # Interrupted compaction of a.txt into a.snap: the rotated journal is
+        # still a.txt's, the live one already a.snap's
+        based.base = 'a.txt'
+        based.reset()
+        based.append(ADD, 'A', [2])
+        based.rotate()
+        based.base = 'a.snap'
+        based.append(ADD, 'A', [3])
+        based.close()
+        compaction_pending = (replay(based, 'a.txt'), replay(based, 'a.snap'), replay(based, 'b.snap'))
+    
+    stale_text = restart(touch_text)
+
+    journal_tests = [
+        ("Replay covers rotated and live journal", after_rotation, (3, {'A': {2, 3, 4}})),
+        ("Torn last record is ignored", after_crash, (3, {'A': {2, 3, 4}})),
+        ("Discarded rotation drops its records", after_discard[0], 1),
+        ("Reset empties the journal", after_reset, (0, {})),
+        ("Header names the base and is not replayed", own_base, (1, {'A': {1}})),
+        ("Journal of another base refused", other_base, ("refused", {})),
+        ("Interrupted compaction replays onto either base", compaction_pending,
+         ((2, {'A': {2, 3}}), (2, {'A': {2, 3}}), ("refused", {}))),
+        ("Unchanged restart keeps snapshot and journal", restart(lambda tmp: None), ({5, 6}, {1, 2, 3, 777})),
+        ("Edited a.txt is refused, not loaded", stale_text, "refused"),
+        ("Journal is not replayed onto a.txt", restart(snapshot_deleted), "refused"),
+        ("Snapshot used without a.txt", restart(text_moved), ({5, 6}, {1, 2, 3, 777})),
+    ]
+    
+    passed = 0
+    total = len(journal_tests)
+    
+    for test_name, result, expected in journal_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Journal Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_snapshot_tests():
+    """Test the binary snapshot format and lazy loading"""
+    print(f"\n💽 SNAPSHOT TESTS")
+    print("=" * 17)
+    
+    import tempfile
+    from snapshot import LazySets, SnapshotReader, write_snapshot
+    
+    sets = {
+        'ints': set(range(-5, 1000, 7)) | {2 ** 62},
+        'words': {'alpha', 'beta gamma'},
+        'empty': set(),
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'a.snap')
+        write_snapshot(path, sets)
+        reader = SnapshotReader(path)
+        lazy = LazySets(reader)
+        header_only = ({name: lazy.cardinality(name) for name in lazy}, lazy.is_loaded('ints'))
+        block = reader.block('ints')
+        loaded = {name: lazy[name] for name in lazy}
+        lazy['extra'] = {1}
+        # Untouched sets are copied block for block into a new snapshot
+        lazy2 = LazySets(SnapshotReader(path))
+        lazy2['words'].add('delta')
+        copy_path = os.path.join(tmp, 'b.snap')
+        write_snapshot(copy_path, lazy2.snapshot_items(), source=lazy2.reader)
+        copy_reader = SnapshotReader(copy_path)
+        copied = {name: set(value) for name, value in LazySets(copy_reader).items()}
+        del block
+        for r in (reader, lazy2.reader, copy_reader):
+            r.close()
+    
+    snapshot_tests = [
+        ("Cardinalities from header only", header_only,
+         ({'ints': len(sets['ints']), 'words': 2, 'empty': 0}, False)),
+        ("Lazy loads round-trip", {name: set(value) for name, value in loaded.items()}, sets),
+        ("New sets are added to the mapping", list(lazy), ['ints', 'words', 'empty', 'extra']),
+        ("Unloaded blocks copied into new snapshot", copied,
+         dict(sets, words={'alpha', 'beta gamma', 'delta'})),
+    ]
+    
+    passed = 0
+    total = len(snapshot_tests)
+    
+    for test_name, result, expected in snapshot_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Snapshot Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_batch_tests():
+    """Test non-interactive batch execution"""
+    print(f"\n📦 BATCH MODE TESTS")
+    print("=" * 19)
+    
+    import io
+    import json
+    from batch import BatchRunner
+    
+    class RecordingSetOps:
+        """Minimal SetOperations stand-in that records journaled changes"""
+        def __init__(self):
+            self.sets = {'A': {1, 2, 3, 4}, 'B': {3, 4, 5, 6}}
+            self.changes = []
+        def add_elements(self, name, values):
+            self.sets[name] = self.sets[name] | set(values)
+            self.changes.append(("add", name, list(values)))
+            return self.sets[name]
+        def remove_elements(self, name, values):
+            self.sets[name] = self.sets[name] - set(values)
+            self.changes.append(("remove", name, list(values)))
+            return self.sets[name]
+        def replace_set(self, name, elements):
+            self.sets[name] = set(elements)
+            self.changes.append(("create", name, sorted(elements)))
+            return self.sets[name]
+        def compute(self, op, x, y):
+            a, b = self.sets[x], self.sets[y]
+            return {"union": a | b, "intersection": a & b, "difference": a - b,
+                    "symmetric": a ^ b, "subset": a <= b, "equal": a == b}[op]
+    
+    commands = ["# comment", "A B union", "A add 7 8,9", "A remove 1", "C create 1 2",
+                "C A subset", "A B C cartesian", "A power", "missing print", "A B bogus", ""]
+    set_ops = RecordingSetOps()
+    out = io.StringIO()
+    runner = BatchRunner(set_ops, output="jsonl", out=out)
+    ok = runner.run(commands)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    counts_out = io.StringIO()
+    BatchRunner(RecordingSetOps(), output="counts", out=counts_out).run(["A B intersection", "A cardinal"])
+    
+    batch_tests = [
+        ("Union result", records[0]["result"], [1, 2, 3, 4, 5, 6]),
+        ("Add with several values", records[1]["result"], [1, 2, 3, 4, 7, 8, 9]),
+        ("Mutations are journaled", set_ops.changes,
+         [("add", "A", [7, 8, 9]), ("remove", "A", [1]), ("create", "C", [1, 2])]),
+        ("Subset check", records[4]["result"], False),
+        ("N-ary cartesian is only counted", records[5]["size"], 6 * 4 * 2),
+        ("Power set size", records[6]["result"], 2 ** 6),
+        ("Errors are reported, not raised", [r["ok"] for r in records[7:]], [False, False]),
+        ("Run reports failure", (ok, runner.commands, runner.errors), (False, 9, 2)),
+        ("Counts output", counts_out.getvalue(), "1\tintersection\t2\n2\tcardinal\t4\n"),
+        ("Summary lists operations", "union" in runner.summary() and "invalid" in runner.summary(), True),
+    ]
+    
+    passed = 0
+    total = len(batch_tests)
+    
+    for test_name, result, expected in batch_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Batch Mode Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_expression_tests():
+    """Test the set expression parser, planner and evaluator"""
+    print(f"\n📐 EXPRESSION TESTS")
+    print("=" * 19)
+    
+    from expression import (ExpressionError, INTERSECTION, Operation, SetRef,
+                            format_node, optimize, parse, parse_statement, run)
+    
+    sets = {'A': {1, 2, 3, 4}, 'B': {3, 4, 5, 6}, 'C': {2, 3, 4, 8}, 'D': {4}, 'E': set(),
+            'big': set(range(1000)), 'small': {5, 999}}
+    probed = []
+    def lookup(name):
+        probed.append(name)
+        return sets[name]
+    def evaluate(text):
+        del probed[:]
+        return run(text, lookup, lambda name: len(sets[name]), sets.__contains__)[2]
+    
+    def raises(text):
+        try:
+            parse(text)
+        except ExpressionError:
+            return True
+        return False
+    
+    def unknown_name():
+        try:
+            evaluate("A ∪ nope")
+        except ExpressionError as e:
+            return "nope" in str(e)
+        return False
+    
+    ordered = optimize(parse("big ∩ A ∩ small"), lambda name: len(sets[name]))
+    pushed = optimize(parse("(big ∩ small) − D"), lambda name: len(sets[name]))
+    short = evaluate("E ∩ (big ∪ A)")
+    short_probes = list(probed)
+    product = evaluate("A × D")
+    
+    expression_tests = [
+        ("Unicode operators", evaluate("(A ∪ B) ∩ (C − D)"), {2, 3}),
+        ("ASCII operators", evaluate("(A | B) & (C - D)"), {2, 3}),
+        ("Symmetric difference", evaluate("A ⊕ B"), {1, 2, 5, 6}),
+        ("Difference binds tighter than union", evaluate("A ∪ B − C"), {1, 2, 3, 4, 5, 6}),
+        ("Left-associative difference", evaluate("A - C - D"), {1}),
+        ("Intersections ordered smallest first", format_node(ordered), "small ∩ A ∩ big"),
+        ("Difference pushed into smallest operand", pushed,
+         Operation(INTERSECTION, [Operation("difference", [SetRef('small'), SetRef('D')]), SetRef('big')])),
+        ("Empty operand short-circuits", (short, short_probes), (set(), [])),
+        ("X ⊕ X cancels", evaluate("A ⊕ B ⊕ A"), sets['B']),
+        ("Composite operands filter without materializing", evaluate("small ∩ (B ∪ big)"), {5, 999}),
+        ("Top-level product is lazy", (product.size, sorted(product)), (4, [(1, 4), (2, 4), (3, 4), (4, 4)])),
+        ("Nested product is a set of tuples", evaluate("(A × D) ∩ (B × D)"), {(3, 4), (4, 4)}),
+        ("Assignment target", parse_statement("X = A ∩ B")[0], "X"),
+        ("Syntax errors", [raises(t) for t in ("A ∪", "(A ∩ B", "A B", "A # B")], [True] * 4),
+        ("Unknown set names", unknown_name(), True),
+    ]
+    
+    passed = 0
+    total = len(expression_tests)
+    
+    for test_name, result, expected in expression_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Expression Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_result_cache_tests():
+    """Test the version-aware result cache"""
+    print(f"\n🗄 RESULT CACHE TESTS")
+    print("=" * 21)
+    
+    from resultcache import ResultCache, result_bytes
+    
+    cache = ResultCache(max_bytes=1 << 20)
+    union = {1, 2, 3}
+    cache.put(cache.key("union", "A", "B"), union)
+    shared = cache.get(cache.key("union", "B", "A"))
+    cache.put(cache.key("difference", "A", "B"), {1})
+    ordered = cache.get(cache.key("difference", "B", "A"))
+    cache.put(cache.key("subset", "C", "D"), True)
+    cache.bump("A")
+    after_bump = (cache.get(cache.key("union", "A", "B")), len(cache), cache.invalidations)
+    
+    small = ResultCache(max_bytes=3 * result_bytes(set(range(10))))
+    for i in range(4):
+        small.put(small.key("union", f"S{i}", "T"), set(range(10)))
+        small.get(small.key("union", "S0", "T"))  # keep S0 recently used
+    survivors = [small.get(small.key("union", f"S{i}", "T")) is not None for i in range(4)]
+    disabled = ResultCache(max_bytes=0)
+    disabled.put(disabled.key("union", "A", "B"), {1})
+    
+    cache_tests = [
+        ("Commutative operations share entries", shared is union, True),
+        ("Non-commutative operations keep order", ordered, None),
+        ("Bump invalidates dependent results", after_bump, (None, 1, 2)),
+        ("Unrelated entries survive a bump", cache.get(cache.key("subset", "C", "D")), True),
+        ("LRU eviction under the memory budget", (survivors, small.evictions), ([True, False, True, True], 1)),
+        ("Budget is respected", small.bytes <= small.max_bytes, True),
+        ("Zero budget disables caching", len(disabled), 0),
+        ("Hit/miss statistics", (cache.hits, cache.misses), (2, 2)),
+        ("Summary line", "hit rate" in cache.summary(), True),
+    ]
+    
+    passed = 0
+    total = len(cache_tests)
+    
+    for test_name, result, expected in cache_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Result Cache Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_parallel_tests():
+    """Test sharded multi-process n-way operations"""
+    print(f"\n⚙ PARALLEL N-WAY TESTS")
+    print("=" * 22)
+    
+    import random
+    from parallel import ShardedExecutor, combine, expand_set_names, sorted_int64_block
+    
+    rng = random.Random(7)
+    sets = [set(rng.sample(range(-5000, 20000), 8000)) for _ in range(5)]
+    blocks = [sorted_int64_block(s) for s in sets]
+    executor = ShardedExecutor(workers=2, shards=7)
+    if executor.available:
+        union = executor.compute("union", blocks)
+        intersection = executor.compute("intersection", blocks)
+        disjoint = executor.compute("intersection", blocks + [sorted_int64_block({10 ** 9})])
+        executor.close()
+        sharded = ((sorted(union), len(union)), sorted(intersection), len(disjoint))
+    else:
+        sharded = None  # no shared memory (Python 3.7): nothing to shard
+    reference = ((sorted(combine("union", sets)), len(combine("union", sets))),
+                 sorted(combine("intersection", sets)), 0)
+    names = ['set1', 'set2', 'set3', 'set10', 'other']
+    
+    def rejects(specs):
+        try:
+            expand_set_names(specs, names)
+        except ValueError:
+            return True
+        return False
+    
+    parallel_tests = [
+        ("Sharded results match in-process ones", sharded in (reference, None), True),
+        ("Intersection starts from the smallest set", combine("intersection", [{1, 2, 3}, {2, 3}, {3, 9}]), {3}),
+        ("Ranges", expand_set_names(["set1..set3"], names), ['set1', 'set2', 'set3']),
+        ("Patterns keep set order", expand_set_names(["set?", "other"], names), ['set1', 'set2', 'set3', 'other']),
+        ("Duplicates are merged", expand_set_names(["set1", "set*"], names), ['set1', 'set2', 'set3', 'set10']),
+        ("Unknown names are rejected", [rejects(["set1..set5"]), rejects(["x*"]), rejects(["nope"])], [True] * 3),
+        ("Non-int sets are not encoded", sorted_int64_block({1, "a"}), None),
+        ("One worker runs in-process", ShardedExecutor(workers=1).available, False),
+    ]
+    
+    passed = 0
+    total = len(parallel_tests)
+    
+    for test_name, result, expected in parallel_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Parallel N-way Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_server_tests():
+    """Test the JSON-lines TCP server on loopback"""
+    print(f"\n🌐 SERVER TESTS")
+    print("=" * 15)
+    
+    import asyncio
+    import json
+    from server import SetServer
+    
+    class StoreSetOps:
+        """Minimal SetOperations stand-in shared by every client"""
+        def __init__(self):
+            self.sets = {'A': set(range(5000)), 'B': {1, 2, 3}}
+        def replace_set(self, name, elements):
+            self.sets[name] = set(elements)
+            return self.sets[name]
+        def compute(self, op, x, y):
+            a, b = self.sets[x], self.sets[y]
+            return {"union": a | b, "intersection": a & b, "difference": a - b,
+                    "symmetric": a ^ b, "subset": a <= b, "equal": a == b}[op]
+    
+    async def scenario():
+        server = SetServer(StoreSetOps(), pipeline_depth=4, write_chunk=1024, result_limit=10)
+        port = await server.start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        other_reader, other_writer = await asyncio.open_connection("127.0.0.1", port)
+        # 20 requests written at once, more than the pipeline depth
+        requests = [{"id": i, "command": "B cardinal" if i % 2 else "A B intersection"} for i in range(20)]
+        requests.append({"id": "big", "command": "A B union", "limit": 10000})
+        requests.append({"id": "capped", "command": "A B union"})
+        writer.write(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+        writer.write(b"not json\n" + json.dumps({"id": "c", "command": "C create 7 8"}).encode() + b"\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(len(requests) + 2)]
+        other_writer.write(json.dumps({"id": 0, "command": "C print"}).encode() + b"\n")
+        await other_writer.drain()
+        shared = json.loads(await other_reader.readline())
+        for w in (writer, other_writer):
+            w.close()
+        await server.stop()
+        server.close()
+        return responses, shared, server.runner.commands
+    
+    responses, shared, commands = asyncio.run(scenario())
+    
+    file_server = SetServer(StoreSetOps())
+    file_commands = ["B addfile /etc/passwd", "B removefile ids.csv user_id", "D create @/etc/passwd",
+                     "lattice dot /tmp/lattice.dot", "export lines /tmp/export"]
+    file_errors = [json.loads(file_server.handle(json.dumps({"command": c}).encode())) for c in file_commands]
+    file_server.close()
+    
+    server_tests = [
+        ("Pipelined responses keep request order", [r["id"] for r in responses[:22]],
+         list(range(20)) + ["big", "capped"]),
+        ("Operation results", (responses[0]["result"], responses[1]["result"]), ([1, 2, 3], 3)),
+        ("Large result streamed in slices", responses[20]["size"] == len(responses[20]["result"]) == 5000, True),
+        ("Default limit reports size only", (responses[21]["size"], "result" in responses[21]), (5000, False)),
+        ("Bad requests get an error", (responses[22]["ok"], "Invalid request" in responses[22]["error"]), (False, True)),
+        ("One store shared by all clients", shared["result"], [7, 8]),
+        ("Commands counted", commands, 24),
+        ("File commands refused", [(r["ok"], "cannot read or write files" in r["error"]) for r in file_errors],
+         [(False, True)] * len(file_commands)),
+        ("Nothing created from a file", "D" in file_server.runner.set_ops.sets, False),
+    ]
+    
+    passed = 0
+    total = len(server_tests)
+    
+    for test_name, result, expected in server_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Server Results: {passed}/{total} tests passed")
+    return passed == total
+
+def benchmark_store(duration=0.5, readers=4, size=2000):
+    """Reads/s and writes/s of the copy-on-write store against a plain lock"""
+    import threading
+    import time
+    from store import VersionedSets
+    
+    class LockedSets:
+        """Baseline: one lock around every read and in-place write"""
+        def __init__(self, sets):
+            self.sets = sets
+            self.lock = threading.Lock()
+        def read(self):
+            with self.lock:
+                return len(self.sets['A'] & self.sets['B'])
+        def write(self, x):
+            with self.lock:
+                self.sets['A'].add(x)
+    
+    class CowSets:
+        def __init__(self, sets):
+            self.sets = VersionedSets(sets)
+        def read(self):
+            view = self.sets.snapshot()
+            return len(view['A'] & view['B'])
+        def write(self, x):
+            self.sets.modify('A', lambda s: s.add(x))
+    
+    results = {}
+    for label, store in (("plain lock", LockedSets), ("copy-on-write", CowSets)):
+        store = store({'A': set(range(size)), 'B': set(range(0, 2 * size, 2))})
+        counts = [0] * (readers + 1)
+        stop = time.perf_counter() + duration
+        def reader(i):
+            while time.perf_counter() < stop:
+                store.read()
+                counts[i] += 1
+        def writer():
+            x = size
+            while time.perf_counter() < stop:
+                store.write(x)
+                x += 1
+                counts[readers] += 1
+                time.sleep(0)  # let readers run between commits
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results[label] = (sum(counts[:readers]) / duration, counts[readers] / duration)
+    return results
+
+def run_store_tests():
+    """Test snapshot isolation of the copy-on-write set store under threads"""
+    print(f"\n🔒 CONCURRENT STORE TESTS")
+    print("=" * 25)
+    
+    import threading
+    from store import VersionedSets
+    
+    total = 500
+    store = VersionedSets({'A': set(range(total)), 'B': set(), 'C': set()})
+    errors = []
+    violations = []
+    done = threading.Event()
+    
+    def mover():
+        # Move every member from A to B, one atomic two-set commit at a time
+        for x in range(total):
+            with store.write_lock:
+                view = store.snapshot()
+                store.commit({'A': view['A'] - {x}, 'B': view['B'] | {x}})
+            store.modify('C', lambda s, x=x: s.add(x))
+        done.set()
+    
+    def reader():
+        try:
+            while not done.is_set():
+                view = store.snapshot()
+                a, b = view['A'], view['B']
+                if sum(1 for _ in a) + sum(1 for _ in b) != total or not a.isdisjoint(b):
+                    violations.append(view.version)
+                for name in store:  # names may change while iterating the live store
+                    len(store[name])
+        except Exception as e:
+            errors.append(repr(e))
+    
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    writer = threading.Thread(target=mover)
+    for t in readers + [writer]:
+        t.start()
+    for t in readers + [writer]:
+        t.join()
+    
+    pinned = store.snapshot()
+    store['D'] = {1}
+    store.modify('C', lambda s: s.clear())
+    
+    bench = benchmark_store()
+    for label, (reads, writes) in bench.items():
+        print(f"⏱ {label:<14} {reads:>10,.0f} reads/s {writes:>10,.0f} writes/s")
+    
+    store_tests = [
+        ("Readers never fail mid-iteration", errors, []),
+        ("Every snapshot is a consistent version", violations, []),
+        ("All commits applied", (len(store['A']), len(store['B'])), (0, total)),
+        ("Version counts every commit", pinned.version, 2 * total),
+        ("Pinned snapshots do not change", ('D' in pinned, len(pinned['C'])), (False, total)),
+        ("Live store sees new commits", ('D' in store, len(store['C'])), (True, 0)),
+        ("Benchmark ran for both stores", sorted(bench), ["copy-on-write", "plain lock"]),
+    ]
+    
+    passed = 0
+    total_tests = len(store_tests)
+    
+    for test_name, result, expected in store_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Concurrent Store Results: {passed}/{total_tests} tests passed")
+    return passed == total_tests
+
+def run_history_tests():
+    """Test the bounded, lazily formatted operation history"""
+    print(f"\n📜 HISTORY TESTS")
+    print("=" * 16)
+    
+    import os
+    import tempfile
+    from history import HistoryLog, OperationHistory, summarize
+    
+    class HugeSet:
+        """Sized result that counts how many members are read and refuses to render"""
+        def __init__(self, size):
+            self.size = size
+            self.read = 0
+        def __len__(self):
+            return self.size
+        def __iter__(self):
+            for i in range(self.size):
+                self.read += 1
+                yield i
+        def __repr__(self):
+            raise AssertionError("history rendered the whole result")
+    
+    huge = HugeSet(10 ** 9)
+    sample = summarize(huge, 4).sample
+    read = huge.read
+    history = OperationHistory(limit=3, samples=4)
+    history.record("Union A ∪ B", huge, 0.25, (("A", 10 ** 9), ("B", 5)))
+    for i in range(4):
+        history.record(f"Print set S{i}", {i})
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.log")
+        spilled = OperationHistory(limit=2, log=HistoryLog(path, max_bytes=300, backups=2))
+        for i in range(20):
+            spilled.record(f"Union S{i} ∪ T", set(range(i)), 0.001, ((f"S{i}", i),))
+        spilled.close()
+        log_files = sorted(os.listdir(tmp))
+        sizes_ok = all(os.path.getsize(os.path.join(tmp, name)) <= 300 for name in log_files)
+        with open(path, encoding="utf-8") as f:
+            last = f.read().splitlines()[-1]
+    
+    history_tests = [
+        ("Summary reads only the sample", (sample, read), ((0, 1, 2, 3), 4)),
+        ("Summary keeps the full size", summarize(huge).size, 10 ** 9),
+        ("Lazy formatting", summarize(huge, 3).format(), "{0, 1, 2, … (+999,999,997 more)}"),
+        ("Small results are shown whole", summarize({7}).format(), "{7}"),
+        ("Text results are truncated", len(summarize("x" * 500).format()), 100),
+        ("Ring buffer keeps the last entries", [e.operation for e in history], ["Print set S1", "Print set S2", "Print set S3"]),
+        ("Dropped entries are counted", (len(history), history.dropped), (3, 2)),
+        ("Log rotates with bounded backups", log_files, ["history.log", "history.log.1", "history.log.2"]),
+        ("Rotated files stay under the limit", sizes_ok, True),
+        ("Log records duration and inputs", '"inputs": {"S19": 19}' in last and '"seconds": 0.001' in last, True),
+    ]
+    
+    passed = 0
+    total = len(history_tests)
+    
+    for test_name, result, expected in history_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 History Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_render_tests():
+    """Test bounded previews and paged output of large sets"""
+    print(f"\n🖨 RENDER TESTS")
+    print("=" * 15)
+    
+    import io
+    import time
+    from contextlib import redirect_stdout
+    from render import format_members, page_members, preview, stream_members
+    
+    big = set(range(1000000))
+    started = time.perf_counter()
+    shown = preview(big, 3)
+    preview_ms = (time.perf_counter() - started) * 1000
+    mixed = {3, (1, 2), "a"}
+    
+    out = io.StringIO()
+    answers = iter(["n", "n", ""])
+    pages = page_members(list(range(10)), page_size=3, offset=2, out=out, ask=lambda _: next(answers))
+    streamed = io.StringIO()
+    everything = page_members([5, 3, 1, 4, 2], page_size=1, sort=True, chunk_size=2,
+                              out=streamed, ask=lambda _: "a")
+    chunks = io.StringIO()
+    written = stream_members(iter(range(7)), chunks, limit=5, chunk_size=2)
+    with redirect_stdout(io.StringIO()) as redirected:
+        page_members([1, 2], page_size=1, ask=lambda _: "a")
+    
+    render_tests = [
+        ("Preview shows count of the rest", shown, "{0, 1, 2, … (+999,997 more)}"),
+        ("Preview of a huge set is fast", preview_ms < 50, True),
+        ("Small sets are shown whole", preview({1, 2}, 5), "{1, 2}"),
+        ("Empty set", preview(set(), 5), "{}"),
+        ("Sorted preview takes the smallest", preview({9, 4, 7, 1, 8}, 2, sort=True), "{1, 4, … (+3 more)}"),
+        ("Unsortable members still preview", preview(mixed, 1, sort=True).endswith("(+2 more)}"), True),
+        ("Format members", format_members((1,), 1), "{1}"),
+        ("Paging continues after the offset", (pages, out.getvalue()), (8, "2, 3, 4\n5, 6, 7\n")),
+        ("All streams sorted chunks", (everything, streamed.getvalue()), (5, "1, 2\n3, 4\n5\n")),
+        ("Stream stops at the limit", (written, chunks.getvalue()), (5, "0, 1\n2, 3\n4\n")),
+        ("Output defaults to current stdout", redirected.getvalue(), "1, 2\n"),
+    ]
+    
+    passed = 0
+    total = len(render_tests)
+    
+    for test_name, result, expected in render_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Render Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_benchmark_tests():
+    """Test the benchmark harness: datasets, measurement and baseline checks"""
+    print(f"\n⏱ BENCHMARK HARNESS TESTS")
+    print("=" * 26)
+    
+    from bench import MIN_COMPARE_REPEAT, compare, generate, run_suite
+    
+    dense_a, dense_b = generate("dense", 1000)
+    sparse_a, sparse_b = generate("sparse", 1000)
+    skewed_a, skewed_b = generate("skewed", 1000)
+    report = run_suite([10], benchmarks=["union", "power_set", "save_binary", "load_text"],
+                       repeat=2, warmup=0)
+    results = report["results"]
+    
+    def run_of(median_s, peak_bytes, repeat=5):
+        return {"results": {"op/dense/10": {"median_s": median_s, "peak_bytes": peak_bytes, "repeat": repeat}}}
+    
+    def too_few_rounds(current, baseline):
+        try:
+            compare(current, baseline)
+        except ValueError:
+            return True
+        return False
+    
+    steady = run_suite([10], benchmarks=["union"], datasets=["dense"], repeat=MIN_COMPARE_REPEAT, warmup=0)
+    
+    benchmark_tests = [
+        ("Datasets are reproducible", generate("sparse", 1000) == (sparse_a, sparse_b), True),
+        ("Dense overlap is half", (len(dense_a), len(dense_a & dense_b)), (1000, 500)),
+        ("Sparse sets barely overlap", len(sparse_a) == 1000 and len(sparse_a & sparse_b) < 20, True),
+        ("Skewed overlap is 90%", (len(skewed_b), len(skewed_a & skewed_b)), (100, 90)),
+        ("Every benchmark on every dataset", len(results), 12),
+        ("Results carry time and memory",
+         all({"median_s", "min_s", "peak_bytes"} <= set(r) for r in results.values()), True),
+        ("Same run has no regressions", compare(steady, steady), []),
+        ("Too few rounds cannot be compared", (too_few_rounds(report, report),
+                                               too_few_rounds(run_of(0.5, 100), run_of(0.5, 100, repeat=1))),
+         (True, True)),
+        ("Slowdown beyond tolerance fails", compare(run_of(1.0, 100), run_of(0.5, 100)),
+         [("op/dense/10", "median_s", 0.5, 1.0)]),
+        ("Slowdown within tolerance passes", compare(run_of(0.6, 100), run_of(0.5, 100)), []),
+        ("Timer noise is ignored", compare(run_of(0.0002, 100), run_of(0.0001, 100)), []),
+        ("Memory growth fails", [r[1] for r in compare(run_of(0.5, 10 ** 6), run_of(0.5, 10 ** 5))], ["peak_bytes"]),
+        ("Benchmarks missing from the baseline are skipped", compare(run_of(1.0, 100), {"results": {}}), []),
+    ]
+    
+    passed = 0
+    total = len(benchmark_tests)
+    
+    for test_name, result, expected in benchmark_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Benchmark Harness Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_metrics_tests():
+    """Test latency histograms, per-operation stats and profiling hooks"""
+    print(f"\n📈 METRICS TESTS")
+    print("=" * 16)
+    
+    import json
+    import os
+    import tempfile
+    from metrics import LatencyHistogram, Metrics
+    
+    histogram = LatencyHistogram()
+    for seconds in [0.001] * 90 + [0.1] * 10:
+        histogram.add(seconds)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics = Metrics(profile_dir=tmp)
+        with metrics.track("union", [3, 4]):
+            with metrics.track("nested"):
+                pass
+            metrics.note(output=5, compute_seconds=0.0, history_seconds=0.0)
+        try:
+            with metrics.track("union", [1, 1]):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        metrics.note(output=99)  # outside any command: ignored
+        metrics.trace_memory = True
+        with metrics.track("load"):
+            held = list(range(100000))
+        metrics.trace_memory = False
+        metrics.profile_next()
+        with metrics.track("power"):
+            sum(range(1000))
+        with metrics.track("power"):
+            pass
+        profiles = os.listdir(tmp)
+        hot_paths = metrics.last_profile[1]
+        exported = json.loads(json.dumps(metrics.to_dict()))
+    union = exported["operations"]["union"]
+    
+    metrics_tests = [
+        ("Histogram percentiles", (histogram.percentile(0.5), histogram.percentile(0.99)), (0.001024, 0.1)),
+        ("Histogram mean", round(histogram.mean, 4), 0.0109),
+        ("Nested commands count once", sorted(exported["operations"]), ["load", "power", "union"]),
+        ("Calls and errors", (union["latency"]["count"], union["errors"]), (2, 1)),
+        ("Input cardinalities", union["input_elements"], {"mean": 4.5, "max": 7}),
+        ("Output cardinalities", union["output_elements"], {"mean": 5.0, "max": 5}),
+        ("Memory tracing is opt-in", union["allocated_bytes"]["max"], None),
+        ("Traced allocations", exported["operations"]["load"]["allocated_bytes"]["max"] >= 800000, True),
+        ("Profile covers one command", (len(profiles), profiles[0].endswith(".prof")), (1, True)),
+        ("Profile lists hot paths", "cumulative" in hot_paths, True),
+        ("Rows for the menu table", [row[0] for row in metrics.rows()], ["load", "power", "union"]),
+    ]
+    
+    passed = 0
+    total = len(metrics_tests)
+    
+    for test_name, result, expected in metrics_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Metrics Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_index_tests():
+    """Test the inverted element → sets index against brute-force scans"""
+    print(f"\n🗂 INVERTED INDEX TESTS")
+    print("=" * 23)
+    
+    import io
+    import json
+    import random
+    from batch import BatchRunner
+    from index import SetIndex
+    
+    sets = {'A': {1, 2, 3}, 'B': {1, 2}, 'C': {2, 3, 4, 5}, 'D': {1, 2, 3, 4}, 'E': set()}
+    index = SetIndex.build(sets)
+    
+    # Random add/remove/replace deltas, applied the way SetOperations applies them
+    rng = random.Random(7)
+    live = {name: set(values) for name, values in sets.items()}
+    for _ in range(2000):
+        name = rng.choice(sorted(live))
+        values = [rng.randrange(12) for _ in range(rng.randrange(1, 4))]
+        action = rng.random()
+        if action < 0.45:
+            index.add(name, [v for v in dict.fromkeys(values) if v not in live[name]])
+            live[name].update(values)
+        elif action < 0.9:
+            index.discard(name, [v for v in dict.fromkeys(values) if v in live[name]])
+            live[name].difference_update(values)
+        else:
+            index.replace(name, live[name], set(values))
+            live[name] = set(values)
+    
+    def brute(kind, name, k=0):
+        a = live[name]
+        others = [n for n in live if n != name]
+        if kind == "supersets":
+            return {n for n in others if a <= live[n]}
+        if kind == "subsets":
+            return {n for n in others if live[n] <= a}
+        return {n: len(a & live[n]) for n in others if len(a & live[n]) >= k}
+    
+    consistent = all(
+        index.supersets(n, live[n]) == brute("supersets", n)
+        and index.subsets(n, live[n]) == brute("subsets", n)
+        and index.sharing(n, live[n], 2) == brute("sharing", n, 2)
+        for n in live)
+    containing_ok = all(index.containing([x]) == {n for n in live if x in live[n]} for x in range(13))
+    
+    class IndexedSetOps:
+        """SetOperations stand-in answering index queries"""
+        def __init__(self):
+            self.sets = {name: set(values) for name, values in sets.items()}
+        def containing(self, values):
+            return SetIndex.build(self.sets).containing(values)
+        def supersets(self, name):
+            return SetIndex.build(self.sets).supersets(name, self.sets[name])
+        def subsets(self, name):
+            return SetIndex.build(self.sets).subsets(name, self.sets[name])
+        def sharing(self, name, k):
+            return SetIndex.build(self.sets).sharing(name, self.sets[name], k)
+    
+    out = io.StringIO()
+    BatchRunner(IndexedSetOps(), output="jsonl", out=out).run(
+        ["contains 3", "contains 1 4", "A supersets", "A subsets", "A sharing 2", "A sharing", "X supersets"])
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    
+    fresh = SetIndex.build(sets)
+    index_tests = [
+        ("Sets containing an element", fresh.containing([2]), {'A', 'B', 'C', 'D'}),
+        ("Sets containing several elements", fresh.containing([1, 3]), {'A', 'D'}),
+        ("Unknown element", fresh.containing([99]), set()),
+        ("Supersets", fresh.supersets('A', sets['A']), {'D'}),
+        ("Subsets include empty sets", fresh.subsets('A', sets['A']), {'B', 'E'}),
+        ("Sharing at least k", fresh.sharing('A', sets['A'], 2), {'B': 2, 'C': 2, 'D': 3}),
+        ("Single-owner postings stay compact", isinstance(fresh._postings[5], str), True),
+        ("Incremental updates match brute force", consistent, True),
+        ("Incremental containing matches", containing_ok, True),
+        ("Batch index queries", [r.get("result") for r in records[:5]],
+         [["A", "C", "D"], ["D"], ["D"], ["B", "E"], ["B", "C", "D"]]),
+        ("Batch argument errors", [r["ok"] for r in records[5:]], [False, False]),
+    ]
+    
+    passed = 0
+    total = len(index_tests)
+    
+    for test_name, result, expected in index_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Inverted Index Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_minhash_tests():
+    """Test MinHash signatures, Jaccard estimates and LSH near-duplicate search"""
+    print(f"\n≈ MINHASH SIMILARITY TESTS")
+    print("=" * 26)
+    
+    import io
+    import json
+    import random
+    import minhash
+    from batch import BatchRunner
+    from minhash import MinHasher, choose_bands, element_hash
+    
+    hasher = MinHasher(256, seed=3)
+    rng = random.Random(11)
+    base = rng.sample(range(-10**6, 10**6), 4000)
+    sets = {
+        'A': set(base),
+        'B': set(base[:3600]) | set(rng.sample(range(2 * 10**6, 3 * 10**6), 400)),  # J ≈ 0.82
+        'C': set(base[:2000]) | set(range(5 * 10**6, 5 * 10**6 + 2000)),           # J = 1/3
+        'D': set(range(9 * 10**6, 9 * 10**6 + 3000)),                               # J = 0
+        'E': set(),
+        'F': set(),
+    }
+    signatures = {name: hasher.signature(values) for name, values in sets.items()}
+    
+    def exact(x, y):
+        union = len(sets[x] | sets[y])
+        return len(sets[x] & sets[y]) / union if union else 1.0
+    
+    estimates = hasher.all_pairs(signatures)
+    worst = max(abs(estimates[pair] - exact(*pair)) for pair in estimates)
+    
+    # Adding members merges into the signature; the result is the rebuilt one
+    merged = hasher.merge(hasher.signature(base[:1000]), base[1000:])
+    mixed = {'x', (1, 2), 3, -4, 2.0, 2 ** 70}
+    
+    # The pure-Python fallback computes the same signatures as the NumPy path
+    numpy_module = minhash.np
+    minhash.np = None
+    try:
+        plain = MinHasher(256, seed=3)
+        plain_same = (plain.signature(mixed) == list(hasher.signature(mixed))
+                      and plain.all_pairs({n: plain.signature(sets[n]) for n in 'ACE'})
+                      == hasher.all_pairs({n: signatures[n] for n in 'ACE'}))
+    finally:
+        minhash.np = numpy_module
+    
+    bands, rows = choose_bands(128, 0.8)
+    near = hasher.near_duplicates(signatures, 0.7)
+    
+    class SimilaritySetOps:
+        """SetOperations stand-in answering similarity queries"""
+        def __init__(self):
+            self.sets = sets
+        def jaccard_estimates(self, names):
+            return hasher.all_pairs({name: signatures[name] for name in names})
+        def near_duplicates(self, names, threshold=None):
+            return hasher.near_duplicates({name: signatures[name] for name in names}, threshold or 0.8)
+    
+    out = io.StringIO()
+    BatchRunner(SimilaritySetOps(), output="jsonl", out=out).run(
+        ["A B C jaccard", "A B C D near", "A B C D near 0.2", "A near", "A B near x",
+         "A B near 1.5", "A B near -0.1", "A B near nan", "A B near 1"])
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    # NumPy is optional: without it there is no vectorized path to compare
+    numpy_hashes = [int(h) for h in MinHasher._hashes([-5, 7, 2 ** 40])] if minhash.np is not None else None
+    
+    minhash_tests = [
+        ("Integer hashes (NumPy path) match element_hash",
+         numpy_hashes in ([element_hash(x) for x in (-5, 7, 2 ** 40)], None), True),
+        ("Equal members hash equally", element_hash(2.0) == element_hash(2), True),
+        ("Estimates within 4 standard errors", worst <= 4 * hasher.error, True),
+        ("Identical signatures for equal sets", hasher.similarity(signatures['A'], hasher.signature(list(base))), 1.0),
+        ("Disjoint sets", estimates[('A', 'D')] <= 0.02, True),
+        ("Two empty sets", estimates[('E', 'F')], 1.0),
+        ("Empty vs non-empty set", estimates[('A', 'E')], 0.0),
+        ("Merged signature equals rebuilt", list(merged) == list(hasher.signature(set(base))), True),
+        ("Pure-Python fallback agrees", plain_same, True),
+        ("Bands × rows fit the permutations", bands * rows <= 128, True),
+        ("S-curve steepest near threshold", abs((1 / bands) ** (1 / rows) - 0.8) < 0.05, True),
+        ("LSH finds the near-duplicate pair", ('A', 'B') in near, True),
+        ("LSH skips dissimilar pairs", [pair for pair in near if pair not in (('A', 'B'), ('E', 'F'))], []),
+        ("Batch jaccard rows", [r[:2] for r in records[0]["result"]], [['A', 'B'], ['A', 'C'], ['B', 'C']]),
+        ("Batch near with default/explicit threshold", [records[1]["size"], records[2]["size"]], [1, 3]),
+        ("Batch similarity errors", [r["ok"] for r in records[3:7]], [False, False, False, False]),
+        ("Thresholds outside [0, 1] rejected", (records[7]["ok"], "between 0 and 1" in records[6]["error"], records[8]["ok"]),
+         (False, True, True)),
+    ]
+    
+    passed = 0
+    total = len(minhash_tests)
+    
+    for test_name, result, expected in minhash_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 MinHash Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_hyperloglog_tests():
+    """Test HyperLogLog sketches, union estimates and the sketch file"""
+    print(f"\n📈 HYPERLOGLOG TESTS")
+    print("=" * 19)
+    
+    import io
+    import os
+    import random
+    import tempfile
+    import hyperloglog
+    from batch import BatchRunner
+    from hyperloglog import HyperLogLog, SketchError, read_sketches, union_sketch, write_sketches
+    
+    def within(sketch, exact, sigmas=4):
+        return abs(sketch.estimate() - exact) <= sigmas * sketch.relative_error * max(exact, 1)
+    
+    sizes = (0, 1, 1000, 50000, 300000)
+    accurate = all(within(HyperLogLog.of(range(-n, n, 2)), n) for n in sizes)
+    
+    rng = random.Random(5)
+    parts = [set(rng.sample(range(10**6), 40000)) for _ in range(8)]
+    merged = union_sketch((HyperLogLog.of(part) for part in parts), 14)
+    whole = HyperLogLog.of(set().union(*parts))
+    
+    mixed = ['x', (1, 2), 3.5, 2 ** 70, -7, 12]
+    numpy_module = hyperloglog.np
+    hyperloglog.np = None
+    try:
+        plain = HyperLogLog.of(mixed + list(range(5000)), 10)
+        plain_registers = bytes(plain.registers)
+        plain_estimate = plain.estimate()
+    finally:
+        hyperloglog.np = numpy_module
+    vectorized = HyperLogLog.of(mixed + list(range(5000)), 10)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "a.hll")
+        write_sketches(path, {'A': (len(parts[0]), HyperLogLog.of(parts[0])), 'Ω': (0, HyperLogLog())}, 14)
+        loaded = read_sketches(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:-10])
+        try:
+            read_sketches(path)
+            truncated = "read"
+        except SketchError:
+            truncated = "rejected"
+    
+    try:
+        HyperLogLog(30)
+        bad_precision = "accepted"
+    except ValueError:
+        bad_precision = "rejected"
+    
+    class CountingSetOps:
+        """SetOperations stand-in answering union cardinalities from sketches"""
+        def __init__(self):
+            self.sets = {f"p{i}": part for i, part in enumerate(parts)}
+        def union_cardinality(self, names):
+            return union_sketch(HyperLogLog.of(self.sets[name]) for name in names).estimate(), False
+    
+    out = io.StringIO()
+    BatchRunner(CountingSetOps(), output="counts", out=out).run(["p* count", "p0 count", "q* count"])
+    counts = [line.split("\t") for line in out.getvalue().splitlines()]
+    
+    hll_tests = [
+        ("Estimates within 4 standard errors", accurate, True),
+        ("Union of sketches equals sketch of union", merged.to_bytes() == whole.to_bytes(), True),
+        ("Union estimate", within(merged, len(set().union(*parts))), True),
+        ("Duplicates do not count", HyperLogLog.of([1, 1, 1, 2.0, 2]).estimate() < 2.01, True),
+        ("Pure-Python fallback agrees", (plain_registers, round(plain_estimate, 6)),
+         (vectorized.to_bytes(), round(vectorized.estimate(), 6))),
+        ("Sketch file round trip", {name: (card, sk.to_bytes()) for name, (card, sk) in loaded.items()},
+         {'A': (len(parts[0]), HyperLogLog.of(parts[0]).to_bytes()), 'Ω': (0, bytes(1 << 14))}),
+        ("Truncated sketch file", truncated, "rejected"),
+        ("Precision out of range", bad_precision, "rejected"),
+        ("Batch count of a pattern", counts[0][1] == "count" and within(whole, int(counts[0][2])), True),
+        ("Batch count of one set", within(HyperLogLog.of(parts[0]), int(counts[1][2])), True),
+        ("Batch count error", counts[2][1], "error"),
+    ]
+    
+    passed = 0
+    total = len(hll_tests)
+    
+    for test_name, result, expected in hll_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 HyperLogLog Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_bulkimport_tests():
+    """Test streaming bulk import of member files"""
+    print(f"\n📂 BULK IMPORT TESTS")
+    print("=" * 19)
+    
+    import gzip
+    import io
+    import os
+    import tempfile
+    from array import array
+    import bulkimport
+    from batch import BatchRunner
+    from bulkimport import BulkImportError, detect_format, read_members
+    
+    def members(path, **kwargs):
+        return [x for chunk in read_members(path, **kwargs) for x in chunk]
+    
+    def failure(path, **kwargs):
+        try:
+            members(path, **kwargs)
+            return "read"
+        except BulkImportError as e:
+            return str(e)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        def write(name, data, compress=False):
+            path = os.path.join(tmp, name)
+            with (gzip.open if compress else open)(path, "wb") as f:
+                f.write(data)
+            return path
+        
+        numbers = list(range(-500, 20000, 7))
+        text = "\n".join(map(str, numbers)).encode()
+        lines = write("ids.txt", text + b"\n")
+        gz = write("ids.txt.gz", text, compress=True)
+        csv_path = write("users.csv", b"name,user_id\nann,3\nbob,-4\n\ncid,5\n")
+        tsv_path = write("users.tsv.gz", b"1\t10\n2\t20\n", compress=True)
+        binary = write("ids.bin", array("q", numbers).tobytes())
+        odd = write("odd.bin", b"\x00" * 12)
+        big = write("big.txt", f"{2 ** 63 - 1}\n{-2 ** 63}\n{2 ** 70}\n".encode())
+        bad = write("bad.txt", b"1\n2\n\n3 4\nx5\n6\n")
+        secret = write("secret.txt", b"7\n8 root:x:0:0\n")
+        
+        chunk_sizes = {len(chunk) for chunk in read_members(lines, chunk_bytes=1000)}
+        progress_calls = []
+        members(lines, chunk_bytes=4096, progress=lambda done, total, n: progress_calls.append((done, total, n)))
+        
+        numpy_module = bulkimport.np
+        bulkimport.np = None
+        try:
+            plain = (members(lines, chunk_bytes=999), members(binary, chunk_bytes=100),
+                     failure(bad, chunk_bytes=3))
+        finally:
+            bulkimport.np = numpy_module
+        
+        class ImportingSetOps:
+            """SetOperations stand-in applying imported chunks to plain sets"""
+            def __init__(self):
+                self.sets = {"s": {1, 2, 3}}
+            def import_file(self, op, name, path, column=0, progress=None):
+                target = self.sets.setdefault(name, set())
+                read = 0
+                for chunk in read_members(path, column=column, chunk_bytes=64):
+                    (target.update if op == "add" else target.difference_update)(chunk)
+                    read += len(chunk)
+                return target, read
+        
+        stub = ImportingSetOps()
+        out = io.StringIO()
+        BatchRunner(stub, output="counts", out=out).run([
+            f"s addfile {csv_path} user_id", f"s removefile {csv_path} 1", f"t create @{tsv_path}",
+            f"s addfile {bad}", f"s addfile {os.path.join(tmp, 'missing.txt')}", f"u addfile {lines}",
+            f"s addfile {secret}"])
+        rows = [line.split("\t") for line in out.getvalue().splitlines()]
+        
+        bulk_tests = [
+            ("Format from file name", [detect_format(p) for p in ("a.txt", "a.CSV", "a.tsv.gz", "a.i64", "a")],
+             ["lines", "csv", "csv", "int64", "lines"]),
+            ("Newline-delimited file", members(lines), numbers),
+            ("gzip file", members(gz), numbers),
+            ("Chunks end at line breaks", members(lines, chunk_bytes=1000), numbers),
+            ("Chunks are bounded", max(chunk_sizes) < 1000, True),
+            ("CSV column by header name", members(csv_path, column="user_id"), [3, -4, 5]),
+            ("CSV header skipped", members(csv_path, column=1), [3, -4, 5]),
+            ("TSV column of gzip file", members(tsv_path, column=1), [10, 20]),
+            ("Unknown CSV column", failure(csv_path, column="id"), "no column named 'id' in the header"),
+            ("Raw int64 file", members(binary, chunk_bytes=100), numbers),
+            ("Truncated int64 file", failure(odd), "file size is not a multiple of 8 bytes (int64)"),
+            ("Integers beyond int64 stay exact", members(big), [2 ** 63 - 1, -2 ** 63, 2 ** 70]),
+            ("Invalid line is named", failure(bad, chunk_bytes=4), "line 5, column 1: not an integer"),
+            ("File contents are not quoted", failure(secret), "line 2, column 3: not an integer"),
+            ("Progress reaches the file size", progress_calls[-1], (len(text) + 1, len(text) + 1, len(numbers))),
+            ("Pure-Python fallback", plain, (numbers, numbers, "line 5, column 1: not an integer")),
+            ("Batch addfile / removefile", stub.sets["s"], {1, 2}),
+            ("Batch create from file", stub.sets.get("t"), {1, 2}),
+            ("Batch import errors", [row[1] for row in rows[3:]], ["error", "error", "error", "error"]),
+            ("Batch errors do not quote the file", any("root" in field or "x5" in field for row in rows for field in row),
+             False),
+        ]
+    
+    passed = 0
+    total = len(bulk_tests)
+    
+    for test_name, result, expected in bulk_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Bulk Import Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_view_tests():
+    """Test incrementally maintained materialized views"""
+    print(f"\n👁 MATERIALIZED VIEW TESTS")
+    print("=" * 25)
+    
+    import io
+    import os
+    import random
+    import tempfile
+    from batch import BatchRunner
+    from expression import ExpressionError
+    from views import MaterializedView, ViewRegistry
+    
+    rng = random.Random(11)
+    sets = {name: set(rng.sample(range(300), 80)) for name in ("a", "b", "c", "d", "e")}
+    lookup, exists = sets.__getitem__, sets.__contains__
+    
+    definitions = [
+        "union = a ∪ b ∪ c",
+        "active = a − b",
+        "nested = (a ∪ b) ∩ (c − d)",
+        "twice = a ⊕ b ⊕ a ⊕ e",
+        "chain = (a − b) − (c ∪ (d ∩ a))",
+        "copy = a",
+        "empty = ∅ ∪ a ∪ (b ∩ ∅)",
+        "mixed = (a | b) & (a | c) - (e ^ d)",
+    ]
+    registry = ViewRegistry()
+    for definition in definitions:
+        registry.define(definition, lookup, exists)
+    first_reads = {view.name: registry.read(view.name, lookup, exists) for view in registry}
+    frozen = {name: set(members) for name, members in first_reads.items()}
+    
+    def change(name, values, adding):
+        if adding:
+            delta = [v for v in dict.fromkeys(values) if v not in sets[name]]
+            sets[name] = sets[name] | set(values)
+            registry.changed(name, delta, (), lookup)
+        else:
+            delta = [v for v in dict.fromkeys(values) if v in sets[name]]
+            sets[name] = sets[name] - set(values)
+            registry.changed(name, (), delta, lookup)
+    
+    for _ in range(2000):
+        change(rng.choice("abcde"), [rng.randrange(320) for _ in range(rng.randrange(1, 6))], rng.random() < 0.5)
+    consistent = registry.check(lookup)
+    
+    union = registry.get("union")
+    counts_match = all(union.root.counts[x] == sum(x in sets[n] for n in "abc")
+                       for x in set().union(sets["a"], sets["b"], sets["c"]))
+    
+    # A corrupted view is reported by the checker
+    registry.get("active").members.add(-1)
+    corrupted = sorted(registry.check(lookup))
+    
+    def error(action):
+        try:
+            action()
+            return "accepted"
+        except ExpressionError as e:
+            return str(e)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "a.views")
+        saved = ViewRegistry(path)
+        saved.define("reach = a ∪ b", lookup, exists)
+        saved.define("gone = a - b", lookup, exists)
+        saved.drop("gone")
+        reloaded = ViewRegistry(path)
+        reloaded_state = [(view.name, view.expression, view.built) for view in reloaded]
+        reloaded_result = reloaded.read("reach", lookup, exists) == sets["a"] | sets["b"]
+    
+    class ViewSetOps:
+        """SetOperations stand-in keeping views over plain sets"""
+        def __init__(self):
+            self.sets = {"s": {1, 2, 3}, "t": {2}}
+            self.views = ViewRegistry()
+        def define_view(self, statement):
+            return self.views.define(statement, self.sets.__getitem__, self.sets.__contains__)
+        def view(self, name):
+            return self.views.read(name, self.sets.__getitem__, self.sets.__contains__)
+        def drop_view(self, name):
+            self.views.drop(name)
+        def check_views(self):
+            return self.views.check(self.sets.__getitem__)
+        def add_elements(self, name, values):
+            added = [v for v in dict.fromkeys(values) if v not in self.sets[name]]
+            self.sets[name] = self.sets[name] | set(values)
+            self.views.changed(name, added, (), self.sets.__getitem__)
+            return self.sets[name]
+    
+    out = io.StringIO()
+    BatchRunner(ViewSetOps(), output="counts", out=out).run([
+        "view only = s − t", "t add 3 4", "view only", "view check", "view drop only", "view only",
+        "view s = t"])
+    rows = [line.split("\t") for line in out.getvalue().splitlines()]
+    
+    view_tests = [
+        ("Views match a full recompute after 2000 deltas", consistent, {}),
+        ("Union reference counts", counts_match, True),
+        ("Checker reports a corrupted view", corrupted, ["active"]),
+        ("Reads never change afterwards", first_reads == frozen, True),
+        ("Reads are O(1) (the same object)",
+         registry.read("union", lookup, exists) is registry.read("union", lookup, exists), True),
+        ("Cartesian products rejected", error(lambda: registry.define("p = a × b", lookup, exists)),
+         "A Cartesian product (×) cannot be materialized as a view"),
+        ("Unknown input set", error(lambda: registry.define("v = a ∪ zz", lookup, exists)),
+         "Invalid set name 'zz'"),
+        ("View named like a set", error(lambda: registry.define("a = b", lookup, exists)),
+         "'a' is a set; views need a name of their own"),
+        ("Definitions saved, built on first read", reloaded_state, [("reach", "a ∪ b", False)]),
+        ("Reloaded view result", reloaded_result, True),
+        ("Flattened difference", MaterializedView("v", "(a - b) - c").root.children[2].name, "c"),
+        ("Batch view maintained", rows[2][2], "1"),
+        ("Batch view check", rows[3][2], "0"),
+        ("Batch dropped view", rows[5][1], "error"),
+        ("Batch view over a set name", rows[6][1], "error"),
+    ]
+    
+    passed = 0
+    total = len(view_tests)
+    
+    for test_name, result, expected in view_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Materialized View Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_lattice_tests():
+    """Test the subset lattice, its Hasse diagram and exports"""
+    print(f"\n🕸 SUBSET LATTICE TESTS")
+    print("=" * 22)
+    
+    import io
+    import random
+    from array import array
+    import lattice
+    from batch import BatchRunner
+    from lattice import SubsetLattice, is_subset, mask_bits_for, signature_mask
+    from parallel import ShardedExecutor
+    from bitmap import CompactIntSet
+    
+    rng = random.Random(17)
+    
+    def random_sets(count):
+        sets = {}
+        for i in range(count):
+            if i > 3 and rng.random() < 0.5:
+                grown = set(sets[f"s{rng.randrange(i)}"])
+                grown.update(rng.sample(range(400), rng.randrange(3)))
+                sets[f"s{i}"] = grown
+            else:
+                sets[f"s{i}"] = set(rng.sample(range(400), rng.randrange(30)))
+        return sets
+    
+    def brute_force(sets):
+        return sorted((a, b) for a in sets for b in sets if a != b and sets[a] <= sets[b])
+    
+    def covers(sets, built):
+        representative = {name: rep for rep, names in built.classes().items() for name in names}
+        strict = {(representative[a], representative[b]) for a, b in brute_force(sets)
+                  if representative[a] != representative[b]}
+        middle = set(representative.values())
+        return {(a, b) for a, b in strict if not any((a, c) in strict and (c, b) in strict for c in middle)}
+    
+    results = {}
+    numpy_module = lattice.np
+    for label, module in (("vectorized", numpy_module), ("pure", None)):
+        lattice.np = module
+        try:
+            sets = random_sets(120)
+            built = SubsetLattice.build(sets)
+            relation_ok = built.relation() == brute_force(sets)
+            for _ in range(40):
+                name = rng.choice(sorted(sets))
+                sets[name] = sets[name] | {rng.randrange(400)} if rng.random() < 0.5 else set(list(sets[name])[1:])
+                built.stale.add(name)
+                if rng.random() < 0.3:
+                    built.refresh(sets)
+            sets["fresh"] = set()
+            built.stale.add("fresh")
+            built.refresh(sets)
+            results[label] = (relation_ok, built.relation() == brute_force(sets),
+                              set(built.edges()) == covers(sets, built))
+        finally:
+            lattice.np = numpy_module
+    
+    small = {"a": {1}, "b": {1, 2}, "c": {1, 2}, "d": {1, 2, 3}, "e": set(), 'q"x': {9}}
+    diagram = SubsetLattice.build(small)
+    stats = SubsetLattice.build({f"n{i}": {i} for i in range(10)}).stats
+    
+    blocks = [array("q", sorted(rng.sample(range(300), rng.randrange(0, 40)))) for _ in range(12)]
+    blocks.append(array("q", sorted(set(blocks[2]) | {1000})))
+    pairs = [(i, j) for i in range(len(blocks)) for j in range(len(blocks))]
+    executor = ShardedExecutor(2)
+    try:
+        parallel = executor.check_subsets(blocks, pairs) if executor.available else None
+    finally:
+        executor.close()
+    
+    class LatticeSetOps:
+        """SetOperations stand-in with a lattice over plain sets"""
+        def __init__(self):
+            self.sets = dict(small)
+        def lattice(self):
+            return SubsetLattice.build(self.sets)
+    
+    out = io.StringIO()
+    BatchRunner(LatticeSetOps(), output="jsonl", out=out).run(["lattice", "lattice svg x.svg"])
+    rows = out.getvalue().splitlines()
+    
+    lattice_tests = [
+        ("Relation matches brute force", results["vectorized"][0], True),
+        ("Incremental refresh matches brute force", results["vectorized"][1], True),
+        ("Hasse diagram is the transitive reduction", results["vectorized"][2], True),
+        ("Pure-Python path", results["pure"], (True, True, True)),
+        ("Equal sets share a node", diagram.classes()["b"], ["b", "c"]),
+        ("Hasse edges", diagram.edges(), [("e", "a"), ("e", 'q"x'), ("a", "b"), ("b", "d")]),
+        ("Adjacency list", diagram.to_adjacency_list().splitlines()[1:4], ["e (|0|): a q\"x", "a (|1|): b", 'q"x (|1|):']),
+        ("DOT export", ('"b" [label="b = c |2|"];' in diagram.to_dot(), '"q\\"x"' in diagram.to_dot(),
+                        diagram.to_dot().count("->")), (True, True, 4)),
+        ("Half the pairs skipped by cardinality order", stats["skipped_by_size"], 45),
+        ("Disjoint sets pruned by masks", stats["skipped_by_mask"] >= 40 and stats["relations"] == 0, True),
+        ("Mask of a subset is a subset", all(not signature_mask(sorted(s)[:5], 256) & ~signature_mask(s, 256)
+                                             for s in small.values()), True),
+        ("Mask size follows the largest set", (mask_bits_for(0), mask_bits_for(1000), mask_bits_for(10 ** 9)),
+         (256, 2048, 1 << 18)),
+        ("Mixed backends", (is_subset(CompactIntSet({1, 2}), {1, 2, 3}), is_subset({1, 4}, CompactIntSet({1, 2, 3}))),
+         (True, False)),
+        ("Parallel exact checks", parallel in (None, [set(blocks[i]) <= set(blocks[j]) for i, j in pairs]), True),
+        ("Batch lattice edges", rows[0].count('"b", "d"'), 1),
+        ("Batch bad export format", '"ok": false' in rows[1], True),
+    ]
+    
+    passed = 0
+    total = len(lattice_tests)
+    
+    for test_name, result, expected in lattice_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Subset Lattice Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_ranking_tests():
+    """Test ranking, unranking and uniform sampling of combinatorial objects"""
+    print(f"\n🎲 RANKING AND SAMPLING TESTS")
+    print("=" * 29)
+    
+    import io
+    import random
+    from collections import Counter
+    from itertools import combinations
+    from batch import BatchRunner
+    from combinatorics import (CartesianProduct, KSubsets, PowerSet, binomial, gray_code, gray_rank,
+                               iter_power_set, sample_indices)
+    
+    A = set(range(6))
+    lex, colex = KSubsets(A, 3), KSubsets(A, 3, order="colex")
+    expected_lex = [set(c) for c in combinations(sorted(A), 3)]
+    expected_colex = sorted(expected_lex, key=lambda s: sorted(s, reverse=True))
+    big = KSubsets(range(10 ** 6), 4)
+    huge = PowerSet(range(5000))
+    product = CartesianProduct(range(10 ** 6), range(10 ** 6))
+    
+    def rejected(call):
+        try:
+            call()
+        except ValueError:
+            return True
+        return False
+    
+    # Draws of one 2-subset of 4 elements should hit each of the 6 about equally
+    draws = Counter(frozenset(s) for s in KSubsets(range(4), 2).sample(6000, seed=5))
+    
+    class SampleSetOps:
+        """SetOperations stand-in with plain sets"""
+        def __init__(self):
+            self.sets = {"s": {1, 2, 3, 4, 5}, "t": {10, 20}}
+    
+    out = io.StringIO()
+    BatchRunner(SampleSetOps(), output="counts", out=out).run([
+        "s unrank 7", "s rank 3", "s choose 2 colex 1 2", "s sample 4 2 seed=1",
+        "s t sample 3 seed=1", "s t sample 11 unique", "s unrank 32"])
+    counts = [line.split("\t")[1 if "\terror\t" in line else 2] for line in out.getvalue().splitlines()]
+    
+    ranking_tests = [
+        ("Power set unranking matches listing (Gray)",
+         [PowerSet(A)[i] for i in range(64)], list(iter_power_set(sorted(A)))),
+        ("Power set unranking matches listing (binary)",
+         [PowerSet(A, "binary")[i] for i in range(64)], list(iter_power_set(sorted(A), order="binary"))),
+        ("Power set rank inverts unrank", all(PowerSet(A, order).index_of(PowerSet(A, order)[i]) == i
+                                             for order in ("gray", "binary") for i in range(64)), True),
+        ("Gray rank inverts Gray code", all(gray_rank(gray_code(i)) == i for i in range(1000)), True),
+        ("Huge power set random access", huge.index_of(huge.subset_at(3 ** 3000)), 3 ** 3000),
+        ("k-subsets in lex order", list(lex), expected_lex),
+        ("k-subsets in colex order", list(colex), expected_colex),
+        ("k-subset ranks", [lex.index_of(s) for s in expected_lex] + [colex.index_of(s) for s in expected_colex],
+         list(range(20)) * 2),
+        ("k-subset page from any rank", list(colex.iter_range(7, 12)), expected_colex[7:12]),
+        ("Edge k values", (list(KSubsets(A, 0)), KSubsets(A, 7).size, list(KSubsets(A, 6))), ([set()], 0, [A])),
+        ("Large k-subset random access", big.index_of(big[10 ** 20]), 10 ** 20),
+        ("Binomial coefficients", (binomial(10 ** 6, 4), binomial(5, 7)),
+         (10 ** 6 * (10 ** 6 - 1) * (10 ** 6 - 2) * (10 ** 6 - 3) // 24, 0)),
+        ("Product rank inverts unrank", product.index_of(product[123456789012]), 123456789012),
+        ("Seeded samples repeat", product.sample(5, seed=9), product.sample(5, seed=9)),
+        ("Random generator accepted", PowerSet(A).sample(3, random.Random(4)), PowerSet(A).sample(3, seed=4)),
+        ("Unique samples are distinct", len(set(sample_indices(product.size, 10000, seed=1, unique=True))), 10000),
+        ("Sampling is uniform", (len(draws), all(900 < n < 1100 for n in draws.values())), (6, True)),
+        ("Wrong subset size rejected", rejected(lambda: lex.index_of({1, 2})), True),
+        ("Foreign element rejected", rejected(lambda: PowerSet(A).index_of({99})), True),
+        ("Too many unique samples rejected", rejected(lambda: sample_indices(5, 6, unique=True)), True),
+        ("Batch rank, choose and sample", counts, ["1", "7", "2", "4", "3", "error", "error"]),
+    ]
+    
+    passed = 0
+    total = len(ranking_tests)
+    
+    for test_name, result, expected in ranking_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Ranking and Sampling Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_export_tests():
+    """Test chunked set export, manifests and reloading through the import path"""
+    print(f"\n📤 SET EXPORT TESTS")
+    print("=" * 18)
+    
+    import io
+    import json
+    import os
+    import random
+    import tempfile
+    import bulkimport
+    import export
+    from batch import BatchRunner
+    from bitmap import CompactIntSet
+    from bulkimport import BulkImportError, decode_varints, read_members
+    from export import ExportError, encode_varints, export_set, export_sets, file_stem
+    
+    rng = random.Random(25)
+    sets = {
+        "dense": set(range(-300, 20000, 3)),
+        "sparse": {rng.randrange(-2 ** 63, 2 ** 63) for _ in range(3000)},
+        "edges": {-2 ** 63, 2 ** 63 - 1, 0, -1, 1},
+        "empty": set(),
+        "bitmap": CompactIntSet(range(5000, 9000)),
+        "a/b c": {7},
+    }
+    
+    def members(path):
+        return {x for chunk in read_members(path) for x in chunk}
+    
+    def failure(path):
+        try:
+            members(path)
+            return "read"
+        except BulkImportError as e:
+            return str(e)
+    
+    def raises(call):
+        try:
+            call()
+        except ExportError:
+            return True
+        return False
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        reloaded = {}
+        numpy_module = export.np
+        for label, module in (("vectorized", numpy_module), ("pure", None)):
+            export.np = bulkimport.np = module
+            try:
+                for fmt in export.EXPORT_FORMATS:
+                    for compress in (False, True):
+                        directory = os.path.join(tmp, f"{label}-{fmt}-{compress}")
+                        manifests = export_sets(sets, directory, fmt, compress, chunk_size=1000, workers=3)
+                        reloaded[label, fmt, compress] = all(
+                            members(os.path.join(directory, file_stem(m["set"]) + ".manifest.json")) == set(sets[m["set"]])
+                            for m in manifests)
+            finally:
+                export.np = bulkimport.np = numpy_module
+        
+        dense = export_set("dense", sets["dense"], tmp, "varint", chunk_size=1000)
+        again = export_set("dense", sets["dense"], tmp, "varint", chunk_size=1000)
+        gz = export_set("dense", sets["dense"], tmp, "lines", compress=True)
+        manifest_path = os.path.join(tmp, "dense.manifest.json")
+        with open(os.path.join(tmp, "dense.txt.gz"), "r+b") as f:
+            f.seek(30)
+            f.write(b"\xff")
+        tampered = failure(manifest_path)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(dict(dense, cardinality=1), f)
+        wrong_count = failure(manifest_path)
+        
+        wide = [-2 ** 70, -5, 3, 2 ** 64, 2 ** 80]
+        wide_block = encode_varints(wide)
+        
+        mixed = {"b", "a", 2.5, True, None, (1, 2), ((1, "x"), 3)}
+        export_set("mixed", mixed, tmp, "jsonl", chunk_size=3)
+        mixed_reloaded = members(os.path.join(tmp, "mixed.manifest.json"))
+        with open(os.path.join(tmp, "objects.jsonl"), "w", encoding="utf-8") as f:
+            f.write('[1, 2]\n[{"a": 1}]\n')
+        
+        class ExportingSetOps:
+            """SetOperations stand-in exporting plain sets"""
+            def __init__(self):
+                self.sets = {"s": {3, 1, 2}, "t": {10}}
+            def export_sets(self, names, directory, fmt, compress, progress=None):
+                return export_sets({n: self.sets[n] for n in names or self.sets}, directory, fmt, compress)
+        
+        out = io.StringIO()
+        batch_dir = os.path.join(tmp, "batch")
+        BatchRunner(ExportingSetOps(), output="counts", out=out).run([
+            f"export jsonl {batch_dir}", f"export lines {batch_dir} gz s", f"export xml {batch_dir}"])
+        counts = [line.split("\t")[1:] for line in out.getvalue().splitlines()]
+        with open(os.path.join(batch_dir, "s.jsonl"), encoding="utf-8") as f:
+            jsonl_text = f.read()
+        
+        export_tests = [
+            ("Round trip, vectorized", all(v for k, v in reloaded.items() if k[0] == "vectorized"), True),
+            ("Round trip, pure Python", all(v for k, v in reloaded.items() if k[0] == "pure"), True),
+            ("Manifest describes the file", (dense["cardinality"], dense["chunks"], dense["format"],
+                                             dense["bytes"] == os.path.getsize(os.path.join(tmp, "dense.vint"))),
+             (len(sets["dense"]), 7, "varint", True)),
+            ("Varint is compact", dense["bytes"] < 2 * len(sets["dense"]) + 100, True),
+            ("Exports are reproducible", (again["sha256"], gz["compression"]), (dense["sha256"], "gzip")),
+            ("Checksum mismatch rejected", tampered.startswith("checksum mismatch"), True),
+            ("Cardinality mismatch rejected", "manifest says 1" in wrong_count, True),
+            ("Members beyond int64", decode_varints(wide_block[9:], len(wide), wide=True), wide),
+            ("Set names made file-safe", (file_stem("a/b c"), file_stem("..x")), ("a_b_c", "x")),
+            ("Unknown format rejected", raises(lambda: export_set("s", {1}, tmp, "xml")), True),
+            ("Non-integers only as jsonl", (raises(lambda: export_set("w", {"a"}, tmp, "lines")),
+                                            raises(lambda: export_set("w", {(1, 2)}, tmp, "varint"))), (True, True)),
+            ("Non-integer jsonl round trip", mixed_reloaded, mixed),
+            ("JSON objects rejected", failure(os.path.join(tmp, "objects.jsonl")),
+             "line 2: members cannot be JSON objects"),
+            ("Members JSON cannot hold rejected", raises(lambda: export_set("w", {b"x"}, tmp, "jsonl")), True),
+            ("Colliding file names rejected", raises(lambda: export_sets({"a b": {1}, "a_b": {2}}, tmp)), True),
+            ("JSON Lines content", jsonl_text, "[1,2,3]\n"),
+            ("Batch export", counts, [["export", "2"], ["export", "1"], ["error", counts[2][1]]]),
+        ]
+    
+    passed = 0
+    total = len(export_tests)
+    
+    for test_name, result, expected in export_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Set Export Results: {passed}/{total} tests passed")
+    return passed == total
+
+def run_saved_product_tests():
+    """Test that products stored by expressions survive a save and a restart"""
+    print(f"\n💾 SAVED PRODUCT TESTS")
+    print("=" * 21)
+    
+    import io
+    import os
+    import tempfile
+    from contextlib import redirect_stdout
+    import main as app
+    
+    def restart(snapshot_format, save=True):
+        """Store p = set1 × set2 and q = p × set1, save them (or leave them in
+        the journal), and read them back in a new SetOperations"""
+        script_dir, settings = app.SCRIPT_DIR, dict(app.SETTINGS)
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()) as log:
+            app.SCRIPT_DIR = tmp
+            app.SETTINGS.update(snapshot_format=snapshot_format, history_file="", views_file="")
+            try:
+                with open(os.path.join(tmp, "a.txt"), "w", encoding="utf-8") as f:
+                    f.write("set1 = {1, 2, 3}\nset2 = {1, 2, 41}\n")
+                ops = app.SetOperations()
+                ops.evaluate("p = set1 × set2")
+                ops.evaluate("q = p × set1")
+                if save:
+                    ops.save_sets_to_file()
+                ops.close()
+                fresh = app.SetOperations()
+                try:
+                    return set(fresh.sets["p"]), set(fresh.sets["q"]), "⚠" in log.getvalue()
+                finally:
+                    fresh.close()
+            except (ValueError, SystemExit) as e:
+                return f"{type(e).__name__}: {e}"
+            finally:
+                app.SCRIPT_DIR = script_dir
+                app.SETTINGS.clear()
+                app.SETTINGS.update(settings)
+    
+    product = {(x, y) for x in (1, 2, 3) for y in (1, 2, 41)}
+    nested = {(pair, z) for pair in product for z in (1, 2, 3)}
+    
+    product_tests = [
+        ("Binary snapshot", restart("binary"), (product, nested, False)),
+        ("Text snapshot", restart("text"), (product, nested, False)),
+        ("Journal replay", restart("text", save=False), (product, nested, False)),
+    ]
+    
+    passed = 0
+    total = len(product_tests)
+    
+    for test_name, result, expected in product_tests:
+        if result == expected:
+            print(f"✅ {test_name}: PASSED")
+            passed += 1
+        else:
+            print(f"❌ {test_name}: FAILED (Expected: {expected}, Got: {result})")
+    
+    print(f"\n📊 Saved Product Results: {passed}/{total} tests passed")
+    return passed == total
+
 def main():
     """Run all tests"""
     print("🚀 ADVANCED SET OPERATIONS TOOL - TEST SUITE")
     print("=" * 50)
     
-    basic_passed = run_basic_tests()
-    edge_passed = run_edge_case_tests()
+    results = [
+        run_basic_tests(),
+        run_edge_case_tests(),
+        run_power_set_tests(),
+        run_cartesian_tests(),
+        run_bitmap_tests(),
+        run_array_engine_tests(),
+        run_set_file_tests(),
+        run_journal_tests(),
+        run_snapshot_tests(),
+        run_batch_tests(),
+        run_expression_tests(),
+        run_result_cache_tests(),
+        run_parallel_tests(),
+        run_server_tests(),
+        run_store_tests(),
+        run_history_tests(),
+        run_render_tests(),
+        run_benchmark_tests(),
+        run_metrics_tests(),
+        run_index_tests(),
+        run_minhash_tests(),
+        run_hyperloglog_tests(),
+        run_bulkimport_tests(),
+        run_view_tests(),
+        run_lattice_tests(),
+        run_ranking_tests(),
+        run_export_tests(),
+        run_saved_product_tests(),
+    ]
     
     print(f"\n🎯 OVERALL RESULTS:")
     print("=" * 20)
-    if basic_passed and edge_passed:
+    if all(results):
         print("✅ ALL TESTS PASSED! The tool is ready for use.")
     else:
         print("❌ SOME TESTS FAILED! Please check the implementation.")
@@ -0,0 +1,306 @@
+"""
+Materialized Views
+==================
+Named set expressions over the stored sets whose result is kept up to date
+as the sets change, so reading a view is O(1):
+
+    active = signups − churned        reach = campaignA ∪ campaignB
+
+A view is built once with a full evaluation. After that every change to an
+input set is applied as a delta. Only the members that really entered or
+left the input are looked at, and each of them is re-derived bottom-up
+through the view's operator tree:
+
+    ∪  keeps a reference count per element (how many operands hold it), so
+       an element leaves the union only when its last operand loses it
+    ∩  −  ⊕  recompute membership of the element from the operands (set
+       lookups, or the reference counts of nested unions)
+
+An update therefore costs O(|delta| · tree size), however large the view and
+its inputs are. Cartesian products cannot be materialized. Views read only
+stored sets; a view's name cannot be used in another expression.
+
+check() compares every built view, and the reference counts of its unions,
+with a full recompute. Definitions (not results) are saved to the views
+file as {"name": "expression"}.
+"""
+
+import json
+import os
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+from expression import (CARTESIAN, DIFFERENCE, INTERSECTION, SYMMETRIC, UNION, Empty, ExpressionError, SetRef,
+                        evaluate, format_node, names_in, parse, parse_statement)
+
+Lookup = Callable[[str], object]
+
+_SET = "set"
+_EMPTY = "empty"
+
+
+class _Term:
+    """A node of a view's operator tree; unions carry their reference counts"""
+    __slots__ = ("op", "children", "name", "names", "counts")
+
+    def __init__(self, op: str, children: List["_Term"] = (), name: Optional[str] = None):
+        self.op = op
+        self.children = list(children)
+        self.name = name
+        self.names = frozenset([name]) if name is not None else frozenset().union(
+            *(child.names for child in self.children))
+        self.counts: Optional[Counter] = Counter() if op == UNION else None
+
+
+def _compile(node) -> _Term:
+    """Operator tree → terms, with associative operators flattened (the
+    planner's size-based rewrites are not used: sizes change, the view stays)"""
+    if isinstance(node, SetRef):
+        return _Term(_SET, name=node.name)
+    if isinstance(node, Empty):
+        return _Term(_EMPTY)
+    if node.op == CARTESIAN:
+        raise ExpressionError("A Cartesian product (×) cannot be materialized as a view")
+    children = [_compile(child) for child in node.children]
+    if node.op in (UNION, INTERSECTION, SYMMETRIC):
+        flat = []
+        for child in children:
+            flat.extend(child.children if child.op == node.op else [child])
+        children = flat
+    elif children[0].op == DIFFERENCE:
+        # (A − B) − C  →  A − B − C
+        children = children[0].children + children[1:]
+    return _Term(node.op, children)
+
+
+def _build(term: _Term, lookup: Lookup):
+    """Full evaluation of a term, (re)initializing union reference counts.
+    The result may be an input set itself: never mutate it."""
+    if term.op == _SET:
+        return lookup(term.name)
+    if term.op == _EMPTY:
+        return set()
+    parts = [_build(child, lookup) for child in term.children]
+    if term.op == UNION:
+        term.counts = Counter()
+        for part in parts:
+            term.counts.update(part)
+        return set(term.counts)
+    if term.op == INTERSECTION:
+        parts.sort(key=len)
+        return set(parts[0]).intersection(*parts[1:])
+    if term.op == DIFFERENCE:
+        return set(parts[0]).difference(*parts[1:])
+    result = set(parts[0])
+    for part in parts[1:]:
+        result.symmetric_difference_update(part)
+    return result
+
+
+def _member(term: _Term, x, lookup: Lookup) -> bool:
+    """Whether x belongs to a term's current result"""
+    op = term.op
+    if op == _SET:
+        return x in lookup(term.name)
+    if op == _EMPTY:
+        return False
+    if op == UNION:
+        return x in term.counts
+    if op == INTERSECTION:
+        return all(_member(child, x, lookup) for child in term.children)
+    if op == DIFFERENCE:
+        first, rest = term.children[0], term.children[1:]
+        return _member(first, x, lookup) and not any(_member(child, x, lookup) for child in rest)
+    return sum(_member(child, x, lookup) for child in term.children) % 2 == 1
+
+
+def _step(term: _Term, x, source: str, present: bool, lookup: Lookup):
+    """(was, is) membership of x in a term after x entered (present=True) or
+    left the set `source`; updates union reference counts on the way"""
+    if source not in term.names:
+        member = _member(term, x, lookup)
+        return member, member
+    if term.op == _SET:
+        return not present, present
+    steps = [_step(child, x, source, present, lookup) for child in term.children]
+    op = term.op
+    if op == UNION:
+        was = x in term.counts
+        count = term.counts[x] + sum(now for _, now in steps) - sum(before for before, _ in steps)
+        if count > 0:
+            term.counts[x] = count
+        else:
+            term.counts.pop(x, None)
+        return was, count > 0
+    if op == INTERSECTION:
+        return all(before for before, _ in steps), all(now for _, now in steps)
+    if op == DIFFERENCE:
+        (first_was, first_now), rest = steps[0], steps[1:]
+        return (first_was and not any(before for before, _ in rest),
+                first_now and not any(now for _, now in rest))
+    return sum(before for before, _ in steps) % 2 == 1, sum(now for _, now in steps) % 2 == 1
+
+
+def _unions(term: _Term) -> Iterable[_Term]:
+    if term.op == UNION:
+        yield term
+    for child in term.children:
+        yield from _unions(child)
+
+
+class MaterializedView:
+    """One named expression and, once built, its maintained result"""
+
+    def __init__(self, name: str, expression: str):
+        self.name = name
+        self.tree = parse(expression)
+        self.expression = format_node(self.tree)
+        self.root = _compile(self.tree)
+        self.members: Optional[set] = None
+        # Set once the current members were handed to a reader: copy before changing
+        self._shared = False
+
+    @property
+    def inputs(self) -> List[str]:
+        return names_in(self.tree)
+
+    @property
+    def built(self) -> bool:
+        return self.members is not None
+
+    def build(self, lookup: Lookup) -> set:
+        """Evaluate the expression in full and start maintaining it"""
+        result = _build(self.root, lookup)
+        self.members = result if self.root.op != _SET else set(result)
+        self._shared = False
+        return self.members
+
+    def read(self, lookup: Lookup) -> set:
+        """The current result (built on first use). It never changes after it
+        is returned: later deltas go to a copy."""
+        if self.members is None:
+            self.build(lookup)
+        self._shared = True
+        return self.members
+
+    def apply(self, source: str, added: Iterable, removed: Iterable, lookup: Lookup) -> None:
+        """Fold in the members that entered (added) and left (removed) the set
+        `source`; lookup must already return every set's new contents"""
+        for delta, present in ((added, True), (removed, False)):
+            for x in delta:
+                was, now = _step(self.root, x, source, present, lookup)
+                if was != now:
+                    if self._shared:
+                        self.members, self._shared = set(self.members), False
+                    if now:
+                        self.members.add(x)
+                    else:
+                        self.members.discard(x)
+
+    def verify(self, lookup: Lookup) -> List[str]:
+        """Differences between the maintained result and a full recompute
+        (an empty list when the view is consistent)"""
+        if self.members is None:
+            return []
+        problems = []
+        expected = set(evaluate(self.tree, lookup))
+        missing, extra = len(expected - self.members), len(self.members - expected)
+        if missing or extra:
+            problems.append(f"{missing} members missing, {extra} unexpected")
+        for union in _unions(self.root):
+            counts = Counter()
+            for child in union.children:
+                counts.update(_build(_copy(child), lookup))
+            if counts != union.counts:
+                problems.append(f"reference counts of a union differ for "
+                                f"{len(set(counts.items()) ^ set(union.counts.items()))} entries")
+        return problems
+
+
+def _copy(term: _Term) -> _Term:
+    """Fresh terms of the same shape (so a recompute leaves the live counts alone)"""
+    return _Term(term.op, [_copy(child) for child in term.children], term.name)
+
+
+class ViewRegistry:
+    """The named views, their definitions file and delta propagation"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._views: Dict[str, MaterializedView] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for name, expression in json.load(f).items():
+                    self._views[name] = MaterializedView(name, expression)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._views
+
+    def __iter__(self):
+        return iter(self._views.values())
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def define(self, statement: str, lookup: Lookup, exists: Callable[[str], bool]) -> MaterializedView:
+        """Create or redefine a view from `name = expression` and build it"""
+        name, tree = parse_statement(statement)
+        if name is None:
+            raise ExpressionError("A view needs a name: view name = expression")
+        if exists(name):
+            raise ExpressionError(f"'{name}' is a set; views need a name of their own")
+        for input_name in names_in(tree):
+            if not exists(input_name):
+                raise ExpressionError(f"Invalid set name '{input_name}'")
+        view = MaterializedView(name, format_node(tree))
+        view.build(lookup)
+        self._views[name] = view
+        self.save()
+        return view
+
+    def drop(self, name: str) -> None:
+        del self._views[self.get(name).name]
+        self.save()
+
+    def get(self, name: str) -> MaterializedView:
+        view = self._views.get(name)
+        if view is None:
+            raise ExpressionError(f"No view named '{name}'")
+        return view
+
+    def read(self, name: str, lookup: Lookup, exists: Callable[[str], bool]) -> set:
+        view = self.get(name)
+        if not view.built:
+            for input_name in view.inputs:
+                if not exists(input_name):
+                    raise ExpressionError(f"View '{name}' reads the missing set '{input_name}'")
+        return view.read(lookup)
+
+    def watching(self, name: str) -> bool:
+        """Whether a built view reads the set, so its changes need deltas"""
+        return any(view.built and name in view.root.names for view in self._views.values())
+
+    def changed(self, name: str, added: Iterable, removed: Iterable, lookup: Lookup) -> None:
+        """Propagate the real changes of one set to the views that read it"""
+        for view in self._views.values():
+            if view.built and name in view.root.names:
+                view.apply(name, added, removed, lookup)
+
+    def check(self, lookup: Lookup) -> Dict[str, List[str]]:
+        """view name → problems, for the built views that disagree with a full recompute"""
+        problems = {}
+        for view in self._views.values():
+            found = view.verify(lookup)
+            if found:
+                problems[view.name] = found
+        return problems
+
+    def save(self) -> None:
+        """Atomically write the view definitions"""
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({view.name: view.expression for view in self._views.values()}, f,
+                      ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)